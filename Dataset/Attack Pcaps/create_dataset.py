@@ -4,6 +4,13 @@ import pyshark
 import tempfile
 import os
 
+TSHARK_REASSEMBLY_PREFS = {
+    'tcp.desegment_tcp_streams': 'TRUE',
+    'tcp.reassemble_out_of_order': 'TRUE',
+    'http.desegment_headers': 'TRUE',
+    'http.desegment_body': 'TRUE',
+}
+
 def process_pcap_to_dataframe(uploaded_file):
     """
     Reads all packets from an uploaded PCAP file, correctly captures packet details,
@@ -17,7 +24,9 @@ def process_pcap_to_dataframe(uploaded_file):
             tmp_file.write(uploaded_file.getvalue())
             temp_pcap_path = tmp_file.name
 
-        capture = pyshark.FileCapture(temp_pcap_path)
+        # Force TCP/HTTP reassembly so a request URI or response code split across
+        # segments is reported once, on the packet that completes the message.
+        capture = pyshark.FileCapture(temp_pcap_path, override_prefs=TSHARK_REASSEMBLY_PREFS)
         
         for packet in capture:
             # Initialize dictionary with default None values for each packet
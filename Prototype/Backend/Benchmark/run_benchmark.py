@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ..Detector.detection_engine import run_hybrid_detection
+from ..Detector.ml_detector import run_ml_phase
+from ..Detector.model_registry import model_version, warm_up
+from ..Detector.regex_detector import run_regex_phase
+from ..Detector.rule_engine import rules_version
+from ..Monitoring.instrumentation import current_rss
+from ..Parser.csv_parser import pair_transactions_from_csv
+from ..Parser.pcap_parser import parse_pcap_to_df
+from .traffic_generator import generate_transactions, parse_size, transactions_for_size, write_ipdr_csv, write_pcap
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_BATCH_SIZE = 5_000
+REGRESSION_THRESHOLD = 0.10
+
+
+class RssSampler:
+    """Tracks the peak resident set size of this process while the block runs, by sampling /proc."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_bytes = self.peak_bytes = current_rss()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss())
+
+
+def _phase_result(latencies, rows_in, rows_out, sampler, bytes_in=None, runs: int = 1) -> dict:
+    """Summarises one phase; `runs` > 1 means every latency sample processed all `rows_in` rows again."""
+    latencies = np.array(latencies, dtype=float)
+    total = float(latencies.sum())
+    result = {
+        'seconds': total,
+        'rows_in': int(rows_in),
+        'rows_out': int(rows_out),
+        'rows_per_second': rows_in * runs / total if total else None,
+        'latency_p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'latency_p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'latency_p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'samples': len(latencies),
+        'peak_rss_mb': sampler.peak_bytes / 2**20,
+        'rss_growth_mb': (sampler.peak_bytes - sampler.start_bytes) / 2**20,
+    }
+    if bytes_in is not None:
+        result['bytes_in'] = int(bytes_in)
+        result['mb_per_second'] = bytes_in * runs / 2**20 / total if total else None
+    return result
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    # The phases report progress with print(); keep it out of the benchmark output.
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _bench_parser(parse, path, repeats):
+    latencies = []
+    with RssSampler() as sampler:
+        for _ in range(repeats):
+            df, elapsed = _timed(parse, path)
+            latencies.append(elapsed)
+    return df, _phase_result(latencies, len(df), len(df), sampler, os.path.getsize(path), runs=repeats), sampler
+
+
+def _bench_batched(phase, df, batch_size):
+    latencies, outputs = [], []
+    with RssSampler() as sampler:
+        for start in range(0, len(df), batch_size):
+            out, elapsed = _timed(phase, df.iloc[start:start + batch_size])
+            outputs.append(out)
+            latencies.append(elapsed)
+    result = pd.concat(outputs) if outputs else df
+    return result, sampler, latencies
+
+
+def run_benchmark(size: str = "20M", attack_ratio: float = 0.1, repeats: int = 3, batch_size: int = DEFAULT_BATCH_SIZE,
+                  seed: int = 42, data_dir: str = None) -> dict:
+    """
+    Generates a synthetic pcap and IPDR CSV of about `size` each, then times
+    every pipeline phase on them: both parsers (repeated `repeats` times), the
+    regex and ML phases (in batches of `batch_size` rows, so latency
+    percentiles are per batch) and one full hybrid run.
+    """
+    target_bytes = parse_size(size)
+    results = {
+        'meta': _environment(),
+        'config': {'size': size, 'attack_ratio': attack_ratio, 'repeats': repeats, 'batch_size': batch_size, 'seed': seed},
+        'phases': {},
+    }
+    phases = results['phases']
+    with contextlib.redirect_stdout(io.StringIO()):
+        warm_up()
+        rules_version()
+
+    with tempfile.TemporaryDirectory(dir=data_dir) as work_dir:
+        print(f"[*] Generating about {size} of pcap and CSV traffic...")
+        pcap_path, csv_path = os.path.join(work_dir, "synthetic.pcap"), os.path.join(work_dir, "synthetic.csv")
+        for file_format, path, writer in (("pcap", pcap_path, write_pcap), ("csv", csv_path, write_ipdr_csv)):
+            count = transactions_for_size(target_bytes, file_format)
+            with RssSampler() as sampler:
+                started = time.perf_counter()
+                summary = writer(path, generate_transactions(count, attack_ratio, seed))
+                elapsed = time.perf_counter() - started
+            phases[f"generate_{file_format}"] = _phase_result([elapsed], count, summary['transactions'], sampler, summary['bytes'])
+
+        print("[*] Benchmarking parsers...")
+        pcap_df, phases['parse_pcap'], _ = _bench_parser(parse_pcap_to_df, pcap_path, repeats)
+        csv_df, phases['parse_csv'], _ = _bench_parser(pair_transactions_from_csv, csv_path, repeats)
+
+    print("[*] Benchmarking detection phases...")
+    df = pcap_df.reset_index(drop=True)
+    regex_df, sampler, latencies = _bench_batched(run_regex_phase, df, batch_size)
+    phases['regex'] = _phase_result(latencies, len(df), int(regex_df['attack_type'].notna().sum()), sampler)
+    ml_df, sampler, latencies = _bench_batched(run_ml_phase, regex_df, batch_size)
+    phases['ml'] = _phase_result(latencies, int(regex_df['attack_type'].isna().sum()), int(ml_df['attack_type'].str.contains("ML", na=False).sum()), sampler)
+
+    with RssSampler() as sampler:
+        hybrid_df, elapsed = _timed(run_hybrid_detection, df.copy())
+    phases['hybrid'] = _phase_result([elapsed], len(df), int(hybrid_df['attack_type'].notna().sum()), sampler)
+
+    for name, phase in phases.items():
+        rate = f"{phase['rows_per_second']:,.0f} rows/s" if phase['rows_per_second'] else "n/a"
+        print(f"[+] {name:<14} {rate:>18}  p50 {phase['latency_p50_ms']:9.1f} ms  p95 {phase['latency_p95_ms']:9.1f} ms  "
+              f"peak RSS {phase['peak_rss_mb']:7.1f} MB")
+    return results
+
+
+def save_results(results: dict, output_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    meta = results['meta']
+    stamp = meta['started'].replace(":", "").replace("-", "")
+    path = os.path.join(output_dir, f"benchmark-{stamp}-{meta['git_commit'][:8] if meta['git_commit'] else 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n[💾] Benchmark results saved to: {path}")
+    return path
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Prints throughput changes per phase and returns the phases that slowed down by more than `threshold`."""
+    regressions = []
+    print(f"\n[*] Compared with {baseline['meta'].get('git_commit') or 'baseline'} ({baseline['meta']['started']}):")
+    for name, phase in current['phases'].items():
+        old = baseline['phases'].get(name)
+        if not old or not old.get('rows_per_second') or not phase.get('rows_per_second'):
+            continue
+        change = phase['rows_per_second'] / old['rows_per_second'] - 1
+        marker = "[!]" if change < -threshold else "[+]"
+        print(f"{marker} {name:<14} {old['rows_per_second']:>12,.0f} -> {phase['rows_per_second']:>12,.0f} rows/s ({change:+.1%})")
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'started': datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'git_commit': commit,
+        'rules_version': rules_version(),
+        'model_version': model_version(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parsing and detection pipeline on synthetic traffic.")
+    parser.add_argument("--size", default="20M", help="approximate size of each generated file, e.g. 5M, 200M")
+    parser.add_argument("--attack-ratio", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=3, help="runs per parser")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per detection batch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="where to put the generated files (default: system temp dir)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.size, args.attack_ratio, args.repeats, args.batch_size, args.seed, args.data_dir)
+    save_results(results, args.output_dir)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(results, json.load(f))
+        if regressions:
+            print(f"[!] Throughput regressions in: {', '.join(regressions)}")
+            sys.exit(1)
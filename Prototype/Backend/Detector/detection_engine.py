@@ -1,20 +1,157 @@
+import numpy as np
 import pandas as pd
 import os
 
+from ..Monitoring.instrumentation import phase
+from ..Parser.transaction_schema import compact_labels, concat_transactions
+
 # Use relative imports to find the sibling detector files
 from .regex_detector import run_regex_phase
 from .ml_detector import run_ml_phase
+from .url_normalizer import UrlVocabulary
+
+DEFAULT_BATCH_SIZE = 50_000
 
 # --- Main Orchestrator ---
-def run_hybrid_detection(df: pd.DataFrame) -> pd.DataFrame:
-    """Manages the full, multi-phase detection workflow."""
+def run_hybrid_detection(df: pd.DataFrame, cache=None) -> pd.DataFrame:
+    """
+    Manages the full, multi-phase detection workflow.
+    URLs are normalized once per batch and both phases share the result.
+    With a VerdictCache, URLs seen before skip both phases entirely.
+    """
     print("--- Starting Hybrid Detection Engine ---")
     
-    # Phase 1: Use regex for known patterns
-    df_after_regex = run_regex_phase(df)
-    
-    # Phase 2: Use ML for everything the regex didn't catch
-    final_results_df = run_ml_phase(df_after_regex)
+    with phase("hybrid", rows_in=len(df)) as metrics:
+        if cache is not None:
+            final_results_df = _run_with_cache(df, cache)
+        else:
+            final_results_df = _run_phases(df)
+        metrics.update(rows_out=len(final_results_df), attacks=int(final_results_df['attack_type'].notna().sum()))
     
     print("\n--- Hybrid Detection Complete ---")
-    return final_results_df
\ No newline at end of file
+    return final_results_df
+
+def _run_with_cache(df: pd.DataFrame, cache) -> pd.DataFrame:
+    with phase("cache_lookup", rows_in=len(df)) as metrics:
+        cacheable = (df['attack_type'].isna() & df['url'].notna()).to_numpy()
+        # Keyed by the canonical form the rules match on, so differently encoded
+        # copies of one payload (%27 and ', + and %20, double encoding) share an entry.
+        vocabulary = UrlVocabulary(df['url'][cacheable])
+        key_codes, unique_keys = pd.factorize(pd.Series(vocabulary.canonical, dtype=object))
+        codes = key_codes[vocabulary.codes]
+        cached = cache.get_many(unique_keys)
+        unique_hit = np.fromiter((key in cached for key in unique_keys), dtype=bool, count=len(unique_keys))
+
+        cacheable_pos = np.flatnonzero(cacheable)
+        hit_pos = cacheable_pos[unique_hit[codes]]
+        is_hit = np.zeros(len(df), dtype=bool)
+        is_hit[hit_pos] = True
+        miss_pos = np.flatnonzero(~is_hit)
+        metrics.update(rows_out=len(hit_pos), cache_hits=len(hit_pos), cache_misses=len(miss_pos))
+    print(f"[+] Verdict cache answered {len(hit_pos)} of {len(df)} rows.")
+
+    result = df.copy()
+    result['attack_type'] = result['attack_type'].astype(object)
+    result['matched_rule'] = result['matched_rule'].astype(object) if 'matched_rule' in result.columns else None
+
+    if len(hit_pos):
+        verdicts = [cached.get(key, (None, None)) for key in unique_keys]
+        hit_codes = codes[unique_hit[codes]]
+        result.iloc[hit_pos, result.columns.get_loc('attack_type')] = np.array([v[0] for v in verdicts], dtype=object)[hit_codes]
+        result.iloc[hit_pos, result.columns.get_loc('matched_rule')] = np.array([v[1] for v in verdicts], dtype=object)[hit_codes]
+
+    if len(miss_pos):
+        detected = _run_phases(df.iloc[miss_pos])
+        result.iloc[miss_pos, result.columns.get_loc('attack_type')] = detected['attack_type'].to_numpy()
+        result.iloc[miss_pos, result.columns.get_loc('matched_rule')] = detected['matched_rule'].to_numpy()
+
+        row_keys = np.empty(len(df), dtype=object)
+        row_keys[cacheable_pos] = np.asarray(unique_keys, dtype=object)[codes]
+        new_verdicts = {}
+        missed_cacheable = cacheable[miss_pos]
+        for key, attack_type, matched_rule in zip(row_keys[miss_pos][missed_cacheable], detected['attack_type'][missed_cacheable], detected['matched_rule'][missed_cacheable]):
+            new_verdicts.setdefault(key, (None if pd.isna(attack_type) else attack_type, None if pd.isna(matched_rule) else matched_rule))
+        cache.put_many(new_verdicts)
+    return compact_labels(result)
+
+# --- Streaming Orchestrator ---
+def iter_hybrid_detection(batches, batch_size: int = DEFAULT_BATCH_SIZE, cache=None):
+    """
+    Runs regex then ML on an iterator of record batches (DataFrames or lists of
+    record dicts, e.g. a chunked read_csv) and yields each labeled batch.
+    Input is re-cut into batches of at most `batch_size` rows, so peak memory
+    depends on the batch size rather than on the size of the input.
+    """
+    for batch in rebatch(batches, batch_size):
+        yield detect_batch(batch, cache)
+
+def detect_batch(batch: pd.DataFrame, cache=None) -> pd.DataFrame:
+    """Runs both phases on one batch that the caller owns."""
+    if 'attack_type' not in batch.columns:
+        batch['attack_type'] = None
+    batch['attack_type'] = batch['attack_type'].astype(object)
+    if cache is not None:
+        return _run_with_cache(batch, cache)
+    return _run_phases(batch)
+
+def _run_phases(df: pd.DataFrame) -> pd.DataFrame:
+    vocabulary = UrlVocabulary(df['url'])
+
+    # Phase 1: Use regex for known patterns
+    df_after_regex = run_regex_phase(df, vocabulary=vocabulary)
+
+    # Phase 2: Use ML for everything the regex didn't catch
+    return compact_labels(run_ml_phase(df_after_regex, vocabulary=vocabulary))
+
+def run_streaming_detection(batches, sink, batch_size: int = DEFAULT_BATCH_SIZE, cache=None, aggregator=None) -> dict:
+    """
+    Feeds every labeled batch to `sink` (any callable taking a DataFrame) and returns totals.
+    A StreamAggregator, if given, is updated with every batch as well.
+    """
+    totals = {'batches': 0, 'rows': 0, 'attacks': 0}
+    for labeled in iter_hybrid_detection(batches, batch_size, cache):
+        sink(labeled)
+        if aggregator is not None:
+            aggregator.update(labeled)
+        totals['batches'] += 1
+        totals['rows'] += len(labeled)
+        totals['attacks'] += int(labeled['attack_type'].notna().sum())
+    print(f"\n[+] Streaming detection complete. {totals['rows']} rows in {totals['batches']} batches, {totals['attacks']} attacks.")
+    if cache is not None:
+        totals['cache'] = cache.report()
+    if aggregator is not None:
+        totals['sources'] = aggregator.snapshot()
+    return totals
+
+class CsvResultSink:
+    """
+    Appends labeled batches to one CSV file, writing the header only once.
+    With `append=True` an existing non-empty file is continued instead of replaced.
+    """
+
+    def __init__(self, output_path: str, append: bool = False):
+        self.output_path = output_path
+        self._started = append and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+
+    def __call__(self, df: pd.DataFrame):
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        df.to_csv(self.output_path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+def rebatch(batches, batch_size: int):
+    """Re-cuts an iterator of DataFrames or record lists into DataFrames of `batch_size` rows."""
+    pending, pending_rows = [], 0
+    for batch in batches:
+        if not isinstance(batch, pd.DataFrame):
+            batch = pd.DataFrame(batch)
+        if batch.empty:
+            continue
+        pending.append(batch)
+        pending_rows += len(batch)
+        while pending_rows >= batch_size:
+            combined = concat_transactions(pending) if len(pending) > 1 else pending[0].reset_index(drop=True)
+            yield combined.iloc[:batch_size].copy()
+            rest = combined.iloc[batch_size:]
+            pending, pending_rows = ([rest] if len(rest) else []), len(rest)
+    if pending_rows:
+        yield concat_transactions(pending) if len(pending) > 1 else pending[0].reset_index(drop=True)
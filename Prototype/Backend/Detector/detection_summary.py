@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from ..Storage.result_store import epoch_timestamps
+
+ML_LABEL_MARKER = "ML"
+BENIGN_LABEL = "Benign"
+
+
+def summarize_detections(df: pd.DataFrame) -> dict:
+    """
+    Aggregates a labelled frame once, so dashboards can draw their metrics and
+    charts without rescanning it: totals, the regex/ML split, counts per attack
+    type and the time range of the traffic.
+    """
+    labels = df['attack_type'] if 'attack_type' in df.columns else pd.Series(index=df.index, dtype=object)
+    attack_counts = labels.value_counts(dropna=True)
+    is_ml = attack_counts.index.astype(str).str.contains(ML_LABEL_MARKER)
+    seconds = event_seconds(df)
+    known = seconds[~np.isnan(seconds)]
+    return {
+        'total': len(df),
+        'attacks': int(attack_counts.sum()),
+        'regex': int(attack_counts[~is_ml].sum()),
+        'ml': int(attack_counts[is_ml].sum()),
+        'attack_counts': {str(label): int(count) for label, count in attack_counts.items()},
+        'time_range': (float(known.min()), float(known.max())) if len(known) else None,
+    }
+
+
+def event_seconds(df: pd.DataFrame) -> np.ndarray:
+    """Epoch seconds of every row (NaN where unknown), from numeric or ISO timestamps."""
+    if 'timestamp' not in df.columns:
+        return np.full(len(df), np.nan)
+    return epoch_timestamps(df['timestamp']).to_numpy()
+
+
+def filter_transactions(df: pd.DataFrame, seconds: np.ndarray = None, attack_types=None, src_ip: str = None,
+                        start: float = None, end: float = None) -> np.ndarray:
+    """
+    Returns the positions of the rows matching every given filter. `attack_types`
+    may include BENIGN_LABEL for unlabelled rows; `src_ip` matches as a prefix;
+    `start`/`end` bound `seconds` (from event_seconds) inclusively.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if attack_types is not None:
+        labels = df['attack_type']
+        selected = labels.isin([label for label in attack_types if label != BENIGN_LABEL]).to_numpy()
+        if BENIGN_LABEL in attack_types:
+            selected = selected | labels.isna().to_numpy()
+        mask &= selected
+    if src_ip:
+        mask &= df['src_ip'].astype(str).str.startswith(src_ip).to_numpy()
+    if seconds is not None and (start is not None or end is not None):
+        with np.errstate(invalid='ignore'):
+            if start is not None:
+                mask &= seconds >= start
+            if end is not None:
+                mask &= seconds <= end
+    return np.flatnonzero(mask)
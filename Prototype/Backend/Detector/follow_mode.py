@@ -0,0 +1,134 @@
+import argparse
+import hashlib
+import os
+import pickle
+import time
+
+from ..Parser.capture_follower import open_follower
+from .detection_engine import CsvResultSink, detect_batch
+from .stream_aggregator import StreamAggregator, format_top_attackers
+
+BUCKET_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bucket"))
+CHECKPOINT_DIR = os.path.join(BUCKET_DIR, "checkpoints")
+CHECKPOINT_VERSION = 3
+DEFAULT_POLL_INTERVAL = 2.0
+RECENT_WINDOW = 300  # seconds of traffic summarised after each batch
+
+
+def default_paths(capture_path: str):
+    """Returns the (checkpoint, output) paths used for a capture when none are given."""
+    name = os.path.basename(capture_path)
+    # The hash keeps two captures with the same file name in different folders apart.
+    tag = hashlib.sha1(os.path.abspath(capture_path).encode()).hexdigest()[:8]
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{name}.{tag}.ckpt")
+    output_path = os.path.join(BUCKET_DIR, f"follow_{os.path.splitext(name)[0]}_{tag}.csv")
+    return checkpoint_path, output_path
+
+
+def load_checkpoint(checkpoint_path: str):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "rb") as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        print(f"[!] Ignoring checkpoint {checkpoint_path} written by an incompatible version.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path: str, follower, output_path: str):
+    """Writes the checkpoint atomically, so a crash leaves either the old or the new one."""
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'capture': follower.state(),
+        'output_size': os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+    }
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, checkpoint_path)
+
+
+def follow_capture(capture_path: str, output_path: str = None, checkpoint_path: str = None,
+                   poll_interval: float = DEFAULT_POLL_INTERVAL, once: bool = False, cache=None, aggregator=None) -> dict:
+    """
+    Follows a growing pcap/pcapng/CSV capture: every poll parses only newly
+    appended data, runs the hybrid detector on it and appends the labeled rows
+    to `output_path`. Progress is checkpointed after each batch, and a restart
+    resumes from the checkpoint. Results written after the last checkpoint are
+    cut off on resume, so a crash never duplicates output rows.
+
+    With `once=True` it returns as soon as it has caught up with the file.
+    Every labeled batch also updates `aggregator` (a new StreamAggregator by
+    default), whose per-source statistics are reported as it goes; they
+    cover this run only and are not checkpointed.
+    """
+    default_checkpoint, default_output = default_paths(capture_path)
+    checkpoint_path = checkpoint_path or default_checkpoint
+    output_path = output_path or default_output
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None:
+        follower = open_follower(capture_path, checkpoint['capture'])
+        if os.path.exists(output_path) and os.path.getsize(output_path) > checkpoint['output_size']:
+            with open(output_path, "r+b") as f:
+                f.truncate(checkpoint['output_size'])
+        print(f"[*] Resuming {capture_path} from byte {follower.offset}.")
+    else:
+        follower = open_follower(capture_path)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        print(f"[*] Following {capture_path} from the start.")
+
+    sink = CsvResultSink(output_path, append=True)
+    aggregator = aggregator if aggregator is not None else StreamAggregator()
+    totals = {'batches': 0, 'rows': 0, 'attacks': 0}
+    saved_offset = None
+    try:
+        while True:
+            new_rows = follower.poll()
+            if not new_rows.empty:
+                labeled = detect_batch(new_rows, cache)
+                sink(labeled)
+                aggregator.update(labeled)
+                totals['batches'] += 1
+                totals['rows'] += len(labeled)
+                totals['attacks'] += int(labeled['attack_type'].notna().sum())
+                print(f"[+] {len(labeled)} new transactions up to byte {follower.offset}, {totals['attacks']} attacks so far.")
+                print(f"[+] {format_top_attackers(aggregator.snapshot(RECENT_WINDOW, top=3))}")
+            if follower.offset != saved_offset:
+                save_checkpoint(checkpoint_path, follower, output_path)
+                saved_offset = follower.offset
+            if new_rows.empty:
+                if once:
+                    break
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n[*] Stopped following.")
+
+    print(f"\n[💾] {totals['rows']} transactions appended to: {output_path}")
+    totals['sources'] = aggregator.snapshot()
+    print(f"[+] {format_top_attackers(totals['sources'])}")
+    if cache is not None:
+        totals['cache'] = cache.report()
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow a growing capture file and run hybrid detection on new traffic.")
+    parser.add_argument("capture", help="pcap, pcapng or IPDR CSV file that is being appended to")
+    parser.add_argument("--output", help="CSV file the labeled transactions are appended to")
+    parser.add_argument("--checkpoint", help="where the resume state is kept")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between polls once caught up")
+    parser.add_argument("--once", action="store_true", help="exit after catching up instead of waiting for more data")
+    parser.add_argument("--cache", action="store_true", help="reuse verdicts through the persistent verdict cache")
+    args = parser.parse_args()
+
+    verdict_cache = None
+    if args.cache:
+        from .verdict_cache import VerdictCache
+        verdict_cache = VerdictCache()
+    follow_capture(args.capture, args.output, args.checkpoint, args.interval, args.once, verdict_cache)
@@ -1,11 +1,17 @@
+import numpy as np
 import pandas as pd
-import os
-import joblib
 from scipy.sparse import hstack
 from collections import Counter
 import math
 
+from ..Monitoring.instrumentation import phase
+from .feature_extractor import extract_lexical_features
+from .model_registry import get_optional_artifact, load_model_and_vectorizer, model_type, teacher_version
+from .prefilter import tiered_predict
+from .url_normalizer import UrlVocabulary, url_vocabulary
+
 # --- Feature Engineering Functions ---
+# Scalar reference definitions; extract_lexical_features computes the same values in batch.
 def count_special_chars(url):
     url = str(url)
     special_chars = ['/', '?', '.', '=', '-', '&', '%', '#']
@@ -20,48 +26,68 @@ def calculate_entropy(text):
         entropy += - p_x * math.log2(p_x)
     return entropy
 
+def build_feature_matrix(urls: pd.Series, vectorizer):
+    """The model's input: url_length, special_char_count and entropy followed by the TF-IDF columns."""
+    lexical_features = extract_lexical_features(urls)
+    tfidf_features = vectorizer.transform(urls.astype(str))
+    return hstack([lexical_features.astype(float), tfidf_features], format='csr')
+
 # --- ML Phase Implementation ---
-def run_ml_phase(df: pd.DataFrame) -> pd.DataFrame:
+def run_ml_phase(df: pd.DataFrame, use_prefilter: bool = True, band: tuple = None, vocabulary: UrlVocabulary = None) -> pd.DataFrame:
     """
     PHASE 2: Uses the trained ML model to classify URLs not caught by regex.
+    Each distinct URL is featurized and scored once, reusing the regex
+    phase's vocabulary when given. The model sees the raw URL text it was
+    trained on, not the canonical form.
+    When Models/ holds a prefilter fitted against the loaded model, a linear
+    model settles the clear cases first and only rows scoring inside `band`
+    (default: the prefilter's own) reach the main model.
     """
     print("\n[*] Starting ML Detection Phase...")
     
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(script_dir, "..", "Models", "rf_model.joblib")
-    vectorizer_path = os.path.join(script_dir, "..", "Models", "tfidf_vectorizer.joblib")
-
-    try:
-        model = joblib.load(model_path)
-        vectorizer = joblib.load(vectorizer_path)
-    except FileNotFoundError:
-        print("[!] Error: Model or vectorizer file not found. Make sure they are in the 'Models' folder.")
-        return df
+    with phase("ml", rows_in=len(df)) as metrics:
+        metrics['rows_out'] = len(df)
+        try:
+            model, vectorizer = load_model_and_vectorizer()
+        except FileNotFoundError:
+            print("[!] Error: Model or vectorizer file not found. Make sure they are in the 'Models' folder.")
+            return df
 
-    unlabeled_df = df[df['attack_type'].isna()].copy()
+        vocabulary = url_vocabulary(df, vocabulary)
+        # Rows without a URL have nothing to score and stay unlabeled.
+        unlabeled_mask = df['attack_type'].isna().to_numpy() & (vocabulary.codes >= 0)
 
-    if unlabeled_df.empty:
-        print("[+] No new data for ML phase to analyze.")
-        return df
+        if not unlabeled_mask.any():
+            print("[+] No new data for ML phase to analyze.")
+            return df
 
-    print(f"[+] Analyzing {len(unlabeled_df)} samples with the ML model...")
-    urls_to_analyze = unlabeled_df['url']
+        print(f"[+] Analyzing {unlabeled_mask.sum()} samples with the ML model...")
+        metrics['rows_analyzed'] = int(unlabeled_mask.sum())
+        distinct_codes, inverse = np.unique(vocabulary.codes[unlabeled_mask], return_inverse=True)
+        urls_to_analyze = pd.Series(vocabulary.urls[distinct_codes], dtype=object)
+        metrics['distinct_urls'] = len(urls_to_analyze)
 
-    lexical_features = pd.DataFrame(index=urls_to_analyze.index)
-    lexical_features['url_length'] = urls_to_analyze.str.len()
-    lexical_features['special_char_count'] = urls_to_analyze.apply(count_special_chars)
-    lexical_features['entropy'] = urls_to_analyze.apply(calculate_entropy)
+        X_new = build_feature_matrix(urls_to_analyze, vectorizer)
 
-    tfidf_features = vectorizer.transform(urls_to_analyze.astype(str))
-    X_new = hstack([lexical_features.astype(float), tfidf_features])
-    
-    predictions = model.predict(X_new)
-    
-    ml_detected_indices = unlabeled_df.index[predictions == 1]
-    unlabeled_df.loc[ml_detected_indices, 'attack_type'] = "ML Detected Malicious"
+        prefilter = get_optional_artifact("prefilter") if use_prefilter else None
+        if prefilter is not None and prefilter.obj.get('teacher_version') != teacher_version():
+            print(f"[!] Prefilter was fitted against model {prefilter.obj.get('teacher_version')}, not the loaded {teacher_version()}; "
+                  "skipping it. Refit it with `python -m Prototype.Backend.Detector.prefilter fit`.")
+            prefilter = None
+        if prefilter is not None:
+            predictions, tiers = tiered_predict(X_new, model, prefilter.obj, band)
+            print(f"[+] Prefilter settled {tiers['prefilter_rows']} distinct URLs; the {model_type()} model scored {tiers['model_rows']}.")
+        else:
+            predictions, tiers = model.predict(X_new), {'prefilter_rows': 0, 'model_rows': X_new.shape[0]}
+        metrics.update(tiers)
+        predictions = predictions[inverse]
     
-    df.update(unlabeled_df)
+        # Label in place instead of copying the unlabeled rows and merging them back.
+        ml_detected = np.zeros(len(df), dtype=bool)
+        ml_detected[np.flatnonzero(unlabeled_mask)[predictions == 1]] = True
+        df.loc[ml_detected, 'attack_type'] = "ML Detected Malicious"
     
-    detected_count = len(ml_detected_indices)
-    print(f"[+] ML Phase complete. Found {detected_count} new potential attacks.")
-    return df
\ No newline at end of file
+        detected_count = int(ml_detected.sum())
+        metrics['attacks'] = detected_count
+        print(f"[+] ML Phase complete. Found {detected_count} new potential attacks.")
+        return df
\ No newline at end of file
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+import joblib
+
+MODELS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Models"))
+
+ARTIFACTS = {
+    "model": "url_model.joblib",
+    "vectorizer": "tfidf_vectorizer.joblib",
+    "prefilter": "prefilter_linear.joblib",
+}
+# Artifacts the detector can run without.
+OPTIONAL_ARTIFACTS = {"prefilter"}
+# Earlier names, used when a directory has no file under the current one. The
+# shipped RandomForest keeps its original name for scripts that load it directly.
+LEGACY_ARTIFACTS = {"model": "rf_model.joblib"}
+# Names the installed version directory; without it the artifacts in Models/ itself are used.
+ACTIVE_FILE = "active.json"
+METADATA_FILE = "metadata.json"
+# What the shipped model, which predates metadata.json, is.
+DEFAULT_MODEL_TYPE = "RandomForest"
+
+Artifact = namedtuple("Artifact", ["name", "path", "obj", "checksum", "signature"])
+
+_registry = {}
+_lock = threading.Lock()
+
+
+def active_dir() -> str:
+    """
+    The directory the artifacts are loaded from: the version directory named
+    by Models/active.json, or Models/ when no version is installed.
+    """
+    try:
+        with open(os.path.join(MODELS_DIR, ACTIVE_FILE)) as f:
+            directory = json.load(f)['directory']
+    except FileNotFoundError:
+        return MODELS_DIR
+    return os.path.normpath(os.path.join(MODELS_DIR, directory))
+
+
+def artifact_path(name: str, directory: str = None) -> str:
+    directory = directory or active_dir()
+    path = os.path.join(directory, ARTIFACTS[name])
+    if name in LEGACY_ARTIFACTS and not os.path.exists(path):
+        legacy_path = os.path.join(directory, LEGACY_ARTIFACTS[name])
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return path
+
+
+def model_metadata(directory: str = None) -> dict:
+    """The metadata.json written next to the artifacts by training, or {} for the shipped model."""
+    try:
+        with open(os.path.join(directory or active_dir(), METADATA_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def model_type() -> str:
+    """Short name of the active classifier, for log lines."""
+    return model_metadata().get('model_type', DEFAULT_MODEL_TYPE)
+
+
+def get_artifact(name: str, directory: str = None) -> Artifact:
+    """
+    Returns the loaded artifact, deserializing it at most once per process.
+
+    The file is re-stat'ed on every call; if its path, size or mtime changed
+    the new version is loaded in full before it replaces the cached one, so
+    callers never observe a half-loaded model.
+    """
+    path = artifact_path(name, directory)
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+
+    entry = _registry.get(name)
+    if entry is not None and entry.signature == signature:
+        return entry
+
+    with _lock:
+        entry = _registry.get(name)
+        if entry is not None and entry.signature == signature:
+            return entry
+        # mmap_mode only maps plain numpy arrays, such as the vectorizer's idf_.
+        # The forest's trees copy their node arrays into process memory when
+        # unpickled, so each process that loads the model holds its own copy;
+        # workers forked after warm_up() share it copy-on-write instead.
+        obj = joblib.load(path, mmap_mode="r")
+        entry = Artifact(name, path, obj, _file_checksum(path), signature)
+        _registry[name] = entry
+        print(f"[+] Loaded {os.path.basename(path)} (sha256 {entry.checksum[:12]}).")
+    return entry
+
+
+def get_optional_artifact(name: str, directory: str = None):
+    """Like get_artifact, but returns None when the file does not exist."""
+    try:
+        return get_artifact(name, directory)
+    except FileNotFoundError:
+        return None
+
+
+def load_model_and_vectorizer():
+    """
+    Returns the (model, vectorizer) pair used by the ML phase. Both come from
+    the same directory, resolved once, so an install that flips active.json
+    in between cannot hand out a model with another version's vectorizer.
+    """
+    directory = active_dir()
+    return get_artifact("model", directory).obj, get_artifact("vectorizer", directory).obj
+
+
+def teacher_version() -> str:
+    """
+    Identifier of the model and vectorizer alone. A prefilter records it when
+    fitted, so it can be checked against the pair it is put in front of; its
+    own checksum must not be part of it.
+    """
+    directory = active_dir()
+    digest = hashlib.sha256()
+    for name in sorted(ARTIFACTS):
+        if name not in OPTIONAL_ARTIFACTS:
+            digest.update(get_artifact(name, directory).checksum.encode())
+    return digest.hexdigest()[:16]
+
+
+def model_version() -> str:
+    """Short identifier that changes whenever any model artifact changes."""
+    directory = active_dir()
+    digest = hashlib.sha256()
+    for name in sorted(ARTIFACTS):
+        artifact = get_optional_artifact(name, directory) if name in OPTIONAL_ARTIFACTS else get_artifact(name, directory)
+        if artifact is not None:
+            digest.update(f"{name}:{artifact.checksum}".encode() if name in OPTIONAL_ARTIFACTS else artifact.checksum.encode())
+    return digest.hexdigest()[:16]
+
+
+def warm_up():
+    """Loads every artifact up front, e.g. at server start or before forking workers."""
+    directory = active_dir()
+    for name in ARTIFACTS:
+        if name in OPTIONAL_ARTIFACTS:
+            get_optional_artifact(name, directory)
+        else:
+            get_artifact(name, directory)
+    return model_version()
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
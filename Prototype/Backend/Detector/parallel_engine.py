@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .detection_engine import DEFAULT_BATCH_SIZE, detect_batch, iter_hybrid_detection, rebatch
+from .model_registry import warm_up
+from .rule_engine import load_rule_engine
+
+# Below this many rows the pool start-up costs more than it saves.
+MIN_ROWS_FOR_POOL = 20_000
+DEFAULT_SHARD_SIZE = 10_000
+
+
+def _init_worker():
+    # With the fork start method the parent has already loaded everything and
+    # these calls are cache hits; otherwise each worker loads once here.
+    warm_up()
+    load_rule_engine()
+
+
+def worker_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    A process pool whose workers have the models and rule pack loaded, for
+    running detection jobs. Use it as a context manager.
+    """
+    # Load models and rules before forking so workers share those pages
+    # copy-on-write instead of each deserializing a private copy.
+    _init_worker()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker)
+
+
+def run_parallel_detection(df: pd.DataFrame, workers: int = None, shard_size: int = DEFAULT_SHARD_SIZE, min_rows_for_pool: int = MIN_ROWS_FOR_POOL) -> pd.DataFrame:
+    """
+    Shards the input across a pool of worker processes, runs the hybrid engine
+    on every shard and merges the labeled shards back in their original order.
+    Small inputs (or a single worker) run in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(df) < min_rows_for_pool:
+        # Same entry point as the pooled shards, so both paths accept unlabelled frames and return the same dtypes.
+        return detect_batch(df.copy())
+
+    shards = [df.iloc[start:start + shard_size] for start in range(0, len(df), shard_size)]
+    print(f"[*] Running detection on {len(df)} rows in {len(shards)} shards across {workers} workers...")
+    with worker_pool(workers) as pool:
+        # map() returns results in submission order, whatever order they finish in.
+        labeled = list(pool.map(detect_batch, shards))
+    return pd.concat(labeled)
+
+
+def iter_parallel_detection(batches, workers: int = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Streaming counterpart of run_parallel_detection: batches are labeled in
+    the pool and yielded in input order, with at most two batches per worker
+    in flight so memory stays bounded. A single worker runs in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        yield from iter_hybrid_detection(batches, batch_size)
+        return
+    with worker_pool(workers) as pool:
+        in_flight = deque()
+        for batch in rebatch(batches, batch_size):
+            in_flight.append(pool.submit(detect_batch, batch))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
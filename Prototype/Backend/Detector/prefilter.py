@@ -0,0 +1,140 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MaxAbsScaler
+
+from .model_registry import artifact_path, load_model_and_vectorizer, model_type, teacher_version
+
+# Rows whose prefilter probability lies inside [low, high] go on to the main model.
+DEFAULT_BAND = (0.05, 0.95)
+MALICIOUS = 1
+
+
+def tiered_predict(X, model, prefilter: dict, band: tuple = None):
+    """
+    Two-tier prediction over a feature matrix: the prefilter's linear model
+    decides rows it is confident about, the main `model` the rest.
+    Returns (predictions, {'prefilter_rows': n, 'model_rows': m}).
+    """
+    low, high = band or prefilter.get('band', DEFAULT_BAND)
+    scores = prefilter['model'].predict_proba(X)[:, 1]
+    predictions = (scores > high).astype(np.int64)
+    uncertain = np.flatnonzero((scores >= low) & (scores <= high))
+    if len(uncertain):
+        predictions[uncertain] = model.predict(X[uncertain])
+    return predictions, {'prefilter_rows': len(scores) - len(uncertain), 'model_rows': len(uncertain)}
+
+
+def fit_prefilter(urls: pd.Series, labels=None, band: tuple = DEFAULT_BAND) -> dict:
+    """
+    Fits the linear tier on the same features as the main model. Without
+    `labels` the model's own predictions are the targets, so the
+    prefilter learns to agree with the model it stands in front of.
+    """
+    from .ml_detector import build_feature_matrix
+
+    model, vectorizer = load_model_and_vectorizer()
+    X = build_feature_matrix(urls.reset_index(drop=True), vectorizer)
+    targets = model.predict(X) if labels is None else np.asarray(labels)
+    # Lexical columns are counts in the hundreds next to TF-IDF weights below 1;
+    # MaxAbsScaler evens them out without densifying the sparse matrix.
+    linear = make_pipeline(MaxAbsScaler(), LogisticRegression(C=10.0, max_iter=2000, class_weight='balanced'))
+    linear.fit(X, targets)
+    return {
+        'model': linear,
+        'band': tuple(band),
+        # The model/vectorizer pair the prefilter was fitted against; run_ml_phase
+        # skips the prefilter when the loaded pair differs.
+        'teacher_version': teacher_version(),
+        'distilled': labels is None,
+        'trained_rows': int(X.shape[0]),
+        'positive_rows': int(np.sum(targets == MALICIOUS)),
+        'trained_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def save_prefilter(prefilter: dict, path: str = None) -> str:
+    path = path or artifact_path("prefilter")
+    temp_path = path + ".tmp"
+    joblib.dump(prefilter, temp_path)
+    # The registry reloads on mtime/size changes; the rename makes the swap atomic.
+    os.replace(temp_path, path)
+    print(f"[💾] Prefilter saved to: {path}")
+    return path
+
+
+def training_urls(count: int = 50_000, attack_ratio: float = 0.3, seed: int = 7) -> pd.Series:
+    """URLs from the bundled datasets plus synthetic traffic, for fitting and evaluating the prefilter."""
+    from ..Benchmark.traffic_generator import generate_transactions
+    from ..Service.load_generator import sample_urls
+
+    urls = sample_urls() + [f"http://{txn.host}{txn.target}" for txn in generate_transactions(count, attack_ratio, seed)]
+    return pd.Series(urls, dtype=object)
+
+
+def compare_tiers(urls: pd.Series, bands: list, prefilter: dict) -> pd.DataFrame:
+    """
+    Scores `urls` with the main model alone and with each band, reporting the
+    rows each tier handled, the agreement with the model-only verdicts
+    and the classification time of both setups.
+    """
+    from .ml_detector import build_feature_matrix
+
+    model, vectorizer = load_model_and_vectorizer()
+    X = build_feature_matrix(urls.reset_index(drop=True), vectorizer)
+    started = time.perf_counter()
+    reference = model.predict(X)
+    model_seconds = time.perf_counter() - started
+
+    rows = []
+    for band in bands:
+        started = time.perf_counter()
+        predictions, tiers = tiered_predict(X, model, prefilter, band)
+        seconds = time.perf_counter() - started
+        rows.append({
+            'band': f"{band[0]:.3f}-{band[1]:.3f}",
+            'prefilter_rows': tiers['prefilter_rows'],
+            'model_rows': tiers['model_rows'],
+            'agreement': float(np.mean(predictions == reference)),
+            'missed_attacks': int(np.sum((reference == MALICIOUS) & (predictions != MALICIOUS))),
+            'extra_attacks': int(np.sum((reference != MALICIOUS) & (predictions == MALICIOUS))),
+            'seconds': seconds,
+            'speedup': model_seconds / seconds if seconds else None,
+        })
+    print(f"[+] {model_type()} alone: {len(reference)} rows in {model_seconds:.2f}s, {int(np.sum(reference == MALICIOUS))} attacks.")
+    return pd.DataFrame(rows)
+
+
+def _parse_band(text: str) -> tuple:
+    low, high = (float(value) for value in text.split(","))
+    if not 0 <= low <= high <= 1:
+        raise argparse.ArgumentTypeError("band must be low,high with 0 <= low <= high <= 1")
+    return low, high
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit or evaluate the linear prefilter in front of the main model.")
+    parser.add_argument("command", choices=["fit", "report"])
+    parser.add_argument("--urls", type=int, default=50_000, help="synthetic URLs to add to the dataset URLs")
+    parser.add_argument("--seed", type=int, default=7, help="use a different seed for report than for fit")
+    parser.add_argument("--band", type=_parse_band, default=DEFAULT_BAND, help="uncertainty band low,high (fit: stored default)")
+    parser.add_argument("--compare", type=_parse_band, nargs="*", default=[(0.01, 0.99), (0.02, 0.98), (0.05, 0.95), (0.1, 0.9), (0.2, 0.8)],
+                        help="bands to evaluate in report")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        urls = training_urls(args.urls, seed=args.seed)
+    if args.command == "fit":
+        save_prefilter(fit_prefilter(urls, band=args.band))
+    else:
+        from .model_registry import get_artifact
+        report = compare_tiers(urls, args.compare, get_artifact("prefilter").obj)
+        print(report.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
@@ -1,41 +1,33 @@
 import pandas as pd
-import re
-from urllib.parse import unquote
 
-def run_regex_phase(df: pd.DataFrame) -> pd.DataFrame:
+from ..Monitoring.instrumentation import phase
+from .rule_engine import load_rule_engine
+from .url_normalizer import UrlVocabulary, url_vocabulary
+
+def run_regex_phase(df: pd.DataFrame, rules_path: str = None, vocabulary: UrlVocabulary = None) -> pd.DataFrame:
     """
-    PHASE 1: Decodes URLs and applies regex to label known attacks.
+    PHASE 1: Applies the compiled rule pack to the canonical form of each
+    distinct URL (see url_normalizer) to label known attacks. A vocabulary
+    already built for `df` is reused. The id of the rule that fired is kept
+    in the 'matched_rule' column.
     """
     print("[*] Starting Regex Detection Phase...")
-    
-    attack_patterns = {
-        "XSS": re.compile(
-            r"(?:<script.*>)|(?:</script>)|(?:onerror\s*=)|(?:onload\s*=)|(?:javascript:)|(?:%3Cscript)|(?:script%3E)",
-            re.IGNORECASE
-        ),
-        "SQL Injection": re.compile(
-            r"(?:\%27)|(?:\')|(?:\-\-)|(?:\%23)|(?:#)|(?:union\s*select)|(?:insert\s*into)|(?:select\s*from)",
-            re.IGNORECASE
-        ),
-        "Command Injection": re.compile(
-            r"(?:\|\|)|(?:\%7C\%7C)|(?:\;)|(?:whoami)|(?:net\s*user)|(?:ls\s*-l)|(?:uname\s*-a)",
-            re.IGNORECASE
-        ),
-        "File Inclusion": re.compile(
-            r"(?:\.\./)|(?:\.\.\\)|(?:etc/passwd)|(?:php://input)",
-            re.IGNORECASE
-        )
-    }
 
-    df_copy = df.copy()
-    df_copy['decoded_url'] = df_copy['url'].fillna('').apply(unquote).apply(unquote)
+    with phase("regex", rows_in=len(df)) as metrics:
+        engine = load_rule_engine(rules_path) if rules_path else load_rule_engine()
+        vocabulary = url_vocabulary(df, vocabulary)
+
+        df_copy = df.copy()
+        df_copy['attack_type'] = df_copy['attack_type'].astype(object)
+        attack_types, rule_ids = engine.classify(pd.Series(vocabulary.canonical, dtype=object))
+        attack_types = vocabulary.rows(attack_types.to_numpy(), index=df_copy.index)
+        rule_ids = vocabulary.rows(rule_ids.to_numpy(), index=df_copy.index)
+        hits = rule_ids.notna() & df_copy['attack_type'].isna()
+        df_copy.loc[hits, 'attack_type'] = attack_types[hits]
+        df_copy['matched_rule'] = df_copy['matched_rule'].astype(object) if 'matched_rule' in df_copy.columns else None
+        df_copy.loc[hits, 'matched_rule'] = rule_ids[hits]
 
-    for attack_name, pattern in attack_patterns.items():
-        matches = df_copy['decoded_url'].str.contains(pattern, regex=True, na=False)
-        df_copy.loc[matches & df_copy['attack_type'].isna(), 'attack_type'] = attack_name
-        
-    df_copy = df_copy.drop(columns=['decoded_url'])
-    
-    detected_count = df_copy['attack_type'].notna().sum()
-    print(f"[+] Regex Phase complete. Found {detected_count} potential attacks.")
-    return df_copy
\ No newline at end of file
+        detected_count = df_copy['attack_type'].notna().sum()
+        print(f"[+] Regex Phase complete. Found {detected_count} potential attacks.")
+        metrics.update(rows_out=len(df_copy), attacks=int(hits.sum()), distinct_urls=len(vocabulary.urls))
+    return df_copy
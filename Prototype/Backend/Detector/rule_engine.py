@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+RULES_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Rules"))
+DEFAULT_RULES_PATH = os.path.join(RULES_DIR, "core_rules.json")
+
+Rule = namedtuple("Rule", ["id", "attack_type", "pattern", "literals"])
+
+_engines = {}
+_lock = threading.Lock()
+
+
+class LiteralPrefilter:
+    """
+    Finds which rules could possibly match a lower-cased text by locating every
+    occurrence of their required literals in one pass. Uses pyahocorasick when
+    installed and otherwise a single lookahead scan that reports the longest
+    literal starting at each position.
+    """
+
+    def __init__(self, literal_rules: dict):
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for literal, rule_ids in literal_rules.items():
+                self._automaton.add_word(literal, frozenset(rule_ids))
+            self._automaton.make_automaton()
+            return
+
+        self._automaton = None
+        literals = sorted(literal_rules, key=len, reverse=True)
+        # A literal found at a position implies every shorter literal that is a
+        # prefix of it occurs there too, so it inherits their rules.
+        self._rules_for = {
+            literal: frozenset().union(*(literal_rules[other] for other in literals if literal.startswith(other)))
+            for literal in literals
+        }
+        alternation = "|".join(re.escape(literal) for literal in literals)
+        self._any_literal = re.compile(alternation, re.DOTALL)
+        self._scanner = re.compile("(?=(" + alternation + "))", re.DOTALL)
+
+    def candidates(self, text: str) -> set:
+        found = set()
+        if self._automaton is not None:
+            for _, rule_ids in self._automaton.iter(text):
+                found |= rule_ids
+            return found
+        # Most benign URLs contain no literal at all; reject those with one search.
+        first = self._any_literal.search(text)
+        if first is None:
+            return found
+        for match in self._scanner.finditer(text, first.start()):
+            found |= self._rules_for[match.group(1)]
+        return found
+
+
+class RuleEngine:
+    """
+    Compiles a rule pack once. A literal prefilter picks the few rules that can
+    possibly match a URL, and texts the prefilter cannot screen are scanned with
+    one fused regex that has a named group per rule. A URL is labeled with the
+    first rule in file order that matches it.
+    """
+
+    def __init__(self, rules: list, name: str, version: str, checksum: str):
+        self.rules = rules
+        self.name = name
+        self.version = f"{name}@{version}+{checksum[:12]}"
+        self._patterns = [re.compile(rule.pattern, re.IGNORECASE) for rule in rules]
+        self._fused = re.compile("|".join(f"(?P<r{index}>{rule.pattern})" for index, rule in enumerate(rules)), re.IGNORECASE)
+
+        literal_rules = {}
+        self._unfiltered = set()
+        for index, rule in enumerate(rules):
+            if not rule.literals:
+                self._unfiltered.add(index)
+            for literal in rule.literals:
+                literal_rules.setdefault(literal.lower(), set()).add(index)
+        self._prefilter = LiteralPrefilter(literal_rules) if literal_rules else None
+
+    def match(self, text: str):
+        """Returns the index of the highest-priority rule matching `text`, or None."""
+        if self._prefilter is not None and text.isascii():
+            # Only rules whose literals occur can match; try them in priority order.
+            for index in sorted(self._prefilter.candidates(text.lower()) | self._unfiltered):
+                if self._patterns[index].search(text):
+                    return index
+            return None
+
+        # Non-ASCII case folding can differ from str.lower(), so scan every rule.
+        best = None
+        for match in self._fused.finditer(text):
+            index = match.lastindex - 1
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    return best
+        if best is None:
+            return None
+        # The fused scan reports non-overlapping matches, so a higher-priority
+        # rule can hide inside a lower-priority match. Re-check only those.
+        for index in range(best):
+            if self._patterns[index].search(text):
+                return index
+        return best
+
+    def classify(self, texts: pd.Series):
+        """Returns (attack_type, rule_id) Series aligned to `texts`; each distinct text is scanned once."""
+        codes, uniques = pd.factorize(texts, use_na_sentinel=True)
+        matched = [self.match(text) if isinstance(text, str) else None for text in uniques]
+        attack_types = pd.Series([None if index is None else self.rules[index].attack_type for index in matched] + [None], dtype=object)
+        rule_ids = pd.Series([None if index is None else self.rules[index].id for index in matched] + [None], dtype=object)
+        # The appended None serves rows that were NaN (code -1).
+        return (
+            pd.Series(attack_types.to_numpy()[codes], index=texts.index, dtype=object),
+            pd.Series(rule_ids.to_numpy()[codes], index=texts.index, dtype=object),
+        )
+
+
+def load_rule_engine(path: str = DEFAULT_RULES_PATH) -> RuleEngine:
+    """Loads and compiles a rule pack once per process, recompiling only when the file changes."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _engines.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        cached = _engines.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, "rb") as f:
+            raw = f.read()
+        pack = json.loads(raw)
+        rules = []
+        for entry in pack["rules"]:
+            if re.compile(entry["pattern"]).groups:
+                raise ValueError(f"Rule {entry['id']} uses a capturing group; use (?:...) instead.")
+            rules.append(Rule(entry["id"], entry["attack_type"], entry["pattern"], tuple(entry.get("literals", ()))))
+        engine = RuleEngine(rules, pack["name"], pack["version"], hashlib.sha256(raw).hexdigest())
+        _engines[path] = (signature, engine)
+        print(f"[+] Compiled {len(rules)} rules from {engine.version}.")
+    return engine
+
+
+def rules_version(path: str = DEFAULT_RULES_PATH) -> str:
+    return load_rule_engine(path).version
@@ -0,0 +1,269 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .detection_summary import ML_LABEL_MARKER, event_seconds
+
+DEFAULT_BUCKET_SECONDS = 60
+DEFAULT_BUCKETS = 60
+DEFAULT_CMS_WIDTH = 2048
+DEFAULT_CMS_DEPTH = 4
+DEFAULT_HLL_PRECISION = 11
+DEFAULT_CANDIDATES = 64
+DEFAULT_TOP = 10
+
+
+# --- Sketches ---
+def hash_keys(keys) -> np.ndarray:
+    """64-bit hashes of any array of keys (strings or numbers), stable across processes."""
+    return pd.util.hash_array(np.asarray(keys, dtype=object))
+
+
+class CountMinSketch:
+    """
+    Approximate counts in `depth` x `width` counters. Estimates never undercount
+    and overcount by at most about 2/width of the total with high probability.
+    Sketches of the same shape add up, which is how windows are merged.
+    """
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        # Double hashing: row i uses h1 + i * h2, all from one 64-bit hash.
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes: np.ndarray, counts: np.ndarray = None):
+        counts = np.ones(len(hashes), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other: "CountMinSketch"):
+        self.table += other.table
+        return self
+
+    def clear(self):
+        self.table[:] = 0
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**precision one-byte registers (about 1.04/sqrt(2**precision) relative error)."""
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Bit length in two exact halves; float64 holds 32-bit integers exactly.
+        high, low = (rest >> np.uint64(32)).astype(np.float64), (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bit_length = np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+        rank = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def clear(self):
+        self.registers[:] = 0
+
+
+# --- Aggregation ---
+class _Bucket:
+    """Everything counted for one time slice; its memory does not depend on the traffic volume."""
+
+    def __init__(self, cms_width: int, cms_depth: int, hll_precision: int):
+        self.start = None
+        self.total = 0
+        self.attacks = 0
+        self.ml = 0
+        self.attack_counts = {}
+        self.attacker_counts = CountMinSketch(cms_width, cms_depth)
+        self.sources = HyperLogLog(hll_precision)
+        self.attackers = HyperLogLog(hll_precision)
+        self.candidates = {}
+
+    def reset(self, start: float):
+        self.start = start
+        self.total = self.attacks = self.ml = 0
+        self.attack_counts = {}
+        self.attacker_counts.clear()
+        self.sources.clear()
+        self.attackers.clear()
+        self.candidates = {}
+
+
+class StreamAggregator:
+    """
+    Incremental dashboard statistics, updated from each labelled batch as the
+    detector produces it. Keeps lifetime totals plus a ring of `buckets` time
+    slices of `bucket_seconds` each, so any window up to their product can be
+    summarised without revisiting rows:
+
+    - totals, attacks and counts per attack type,
+    - distinct source IPs and distinct attacking IPs (HyperLogLog),
+    - the top attacking source IPs (count-min sketch, with at most
+      `candidates` tracked IPs per slice).
+
+    Windows end at the newest event time seen, so replayed captures get the
+    same windows as live traffic. Memory is fixed by the constructor
+    arguments. It is callable, so it can be used as a streaming sink, and
+    thread-safe.
+    """
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS, buckets: int = DEFAULT_BUCKETS,
+                 cms_width: int = DEFAULT_CMS_WIDTH, cms_depth: int = DEFAULT_CMS_DEPTH,
+                 hll_precision: int = DEFAULT_HLL_PRECISION, candidates: int = DEFAULT_CANDIDATES):
+        self.bucket_seconds = bucket_seconds
+        self.candidates = candidates
+        self._shape = (cms_width, cms_depth, hll_precision)
+        self._lifetime = _Bucket(*self._shape)
+        self._ring = [_Bucket(*self._shape) for _ in range(buckets)]
+        self.latest = None
+        self.late_rows = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, df: pd.DataFrame):
+        self.update(df)
+
+    def update(self, df: pd.DataFrame):
+        """Counts one labelled batch (needs `attack_type`; uses `src_ip` and `timestamp` when present)."""
+        if df.empty:
+            return
+        seconds = event_seconds(df)
+        labels = df['attack_type'] if 'attack_type' in df.columns else pd.Series(None, index=df.index, dtype=object)
+        sources = df['src_ip'].astype(str).to_numpy() if 'src_ip' in df.columns else np.full(len(df), "unknown", dtype=object)
+        with self._lock:
+            known = seconds[~np.isnan(seconds)]
+            if len(known):
+                self.latest = float(known.max()) if self.latest is None else max(self.latest, float(known.max()))
+            # Rows without a timestamp count as arriving now.
+            now = self.latest if self.latest is not None else time.time()
+            slots = np.floor(np.where(np.isnan(seconds), now, seconds) / self.bucket_seconds).astype(np.int64)
+            newest_slot = int(np.floor(now / self.bucket_seconds))
+            in_range = slots > newest_slot - len(self._ring)
+            self.late_rows += int((~in_range).sum())
+
+            self._count(self._lifetime, labels.to_numpy(), sources)
+            for slot in np.unique(slots[in_range]):
+                rows = np.flatnonzero(slots == slot)
+                bucket = self._ring[int(slot) % len(self._ring)]
+                start = float(slot * self.bucket_seconds)
+                if bucket.start != start:
+                    if bucket.start is not None and bucket.start > start:
+                        # The slot already holds a newer window; count the rows as late like the out-of-range ones.
+                        self.late_rows += len(rows)
+                        continue
+                    bucket.reset(start)
+                self._count(bucket, labels.to_numpy()[rows], sources[rows])
+
+    def _count(self, bucket: _Bucket, labels: np.ndarray, sources: np.ndarray):
+        is_attack = pd.notna(labels)
+        bucket.total += len(labels)
+        bucket.attacks += int(is_attack.sum())
+        source_hashes = hash_keys(sources)
+        bucket.sources.add(source_hashes)
+        if not is_attack.any():
+            return
+        attack_labels = pd.Series(labels[is_attack]).astype(str)
+        for label, count in attack_labels.value_counts().items():
+            bucket.attack_counts[label] = bucket.attack_counts.get(label, 0) + int(count)
+        bucket.ml += int(attack_labels.str.contains(ML_LABEL_MARKER).sum())
+
+        attackers, counts = np.unique(sources[is_attack], return_counts=True)
+        attacker_hashes = hash_keys(attackers)
+        bucket.attacker_counts.add(attacker_hashes, counts)
+        bucket.attackers.add(attacker_hashes)
+        # Heavy hitters: keep the `candidates` IPs with the largest estimates.
+        candidates = dict(bucket.candidates)
+        candidates.update(zip(attackers.tolist(), bucket.attacker_counts.estimate(attacker_hashes).tolist()))
+        if len(candidates) > self.candidates:
+            candidates = dict(sorted(candidates.items(), key=lambda item: -item[1])[:self.candidates])
+        bucket.candidates = candidates
+
+    def snapshot(self, window_seconds: float = None, top: int = DEFAULT_TOP) -> dict:
+        """
+        Statistics for the last `window_seconds` of event time (all traffic when
+        None), rounded up to whole slices. Counts per attacker are count-min estimates, the distinct
+        counts are HyperLogLog estimates; everything else is exact.
+        """
+        with self._lock:
+            if window_seconds is None:
+                merged = self._lifetime
+            else:
+                newest_slot = int(np.floor((self.latest if self.latest is not None else time.time()) / self.bucket_seconds))
+                first_slot = newest_slot - min(int(np.ceil(window_seconds / self.bucket_seconds)), len(self._ring)) + 1
+                merged = _Bucket(*self._shape)
+                for bucket in self._ring:
+                    if bucket.start is not None and first_slot * self.bucket_seconds <= bucket.start <= newest_slot * self.bucket_seconds:
+                        merged.total += bucket.total
+                        merged.attacks += bucket.attacks
+                        merged.ml += bucket.ml
+                        for label, count in bucket.attack_counts.items():
+                            merged.attack_counts[label] = merged.attack_counts.get(label, 0) + count
+                        merged.attacker_counts.merge(bucket.attacker_counts)
+                        merged.sources.merge(bucket.sources)
+                        merged.attackers.merge(bucket.attackers)
+                        merged.candidates.update(bucket.candidates)
+
+            names = list(merged.candidates)
+            estimates = merged.attacker_counts.estimate(hash_keys(names)).tolist() if names else []
+            top_attackers = sorted(zip(names, estimates), key=lambda item: (-item[1], item[0]))[:top]
+            return {
+                'window_seconds': window_seconds,
+                'end': self.latest,
+                'total': merged.total,
+                'attacks': merged.attacks,
+                'regex': merged.attacks - merged.ml,
+                'ml': merged.ml,
+                'attack_ratio': merged.attacks / merged.total * 100 if merged.total else 0.0,
+                'attack_counts': dict(sorted(merged.attack_counts.items(), key=lambda item: -item[1])),
+                'distinct_sources': merged.sources.count() if merged.total else 0,
+                'distinct_attackers': merged.attackers.count() if merged.attacks else 0,
+                'top_attackers': [(name, int(count)) for name, count in top_attackers],
+            }
+
+    @property
+    def window_limit(self) -> int:
+        """The longest window, in seconds, that snapshot() can cover exactly."""
+        return self.bucket_seconds * len(self._ring)
+
+    def memory_bytes(self) -> int:
+        """Size of the sketch arrays; the per-slice dicts add at most `candidates` entries plus the attack types."""
+        bucket = self._lifetime
+        per_bucket = bucket.attacker_counts.table.nbytes + bucket.sources.registers.nbytes + bucket.attackers.registers.nbytes
+        return per_bucket * (len(self._ring) + 1)
+
+
+def format_top_attackers(snapshot: dict) -> str:
+    """One line for console reports: the window, distinct sources and the top attackers."""
+    window = "all traffic" if snapshot['window_seconds'] is None else f"last {snapshot['window_seconds'] / 60:g} min"
+    attackers = ", ".join(f"{name} ({count})" for name, count in snapshot['top_attackers']) or "none"
+    return (f"{window}: {snapshot['attacks']} attacks from ~{snapshot['distinct_attackers']} of "
+            f"~{snapshot['distinct_sources']} sources; top attackers {attackers}")
@@ -0,0 +1,74 @@
+import html
+import re
+from urllib.parse import unquote, unquote_plus
+
+import numpy as np
+import pandas as pd
+
+from ..Monitoring.instrumentation import phase
+
+MAX_DECODE_ROUNDS = 4
+# Only well-formed entities (with their semicolon), so "&copy=1" in a query string stays a parameter.
+HTML_ENTITY = re.compile(r"&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});")
+
+
+def canonicalize(text: str) -> str:
+    """
+    The form URLs are matched in: percent-decoded repeatedly (at most
+    MAX_DECODE_ROUNDS times, until nothing changes), with the literal '+' of
+    the first round read as a space, HTML entities resolved and case folded.
+    Multiply encoded payloads thus look the same as plain ones.
+    """
+    for round_number in range(MAX_DECODE_ROUNDS):
+        if "%" not in text and "&" not in text and not (round_number == 0 and "+" in text):
+            break
+        decoded = unquote_plus(text) if round_number == 0 else unquote(text)
+        decoded = HTML_ENTITY.sub(lambda match: html.unescape(match.group(0)), decoded)
+        if decoded == text:
+            break
+        text = decoded
+    return text.casefold()
+
+
+class UrlVocabulary:
+    """
+    The distinct URLs of one batch, each normalized once. `codes` maps every
+    row to its entry in `urls` (-1 for rows without a URL), so phases can
+    work per distinct URL and broadcast the results back to the rows.
+    The canonical forms are computed on first use.
+    """
+
+    def __init__(self, urls: pd.Series):
+        self.source = urls
+        self.codes, uniques = pd.factorize(urls, use_na_sentinel=True)
+        self.urls = np.asarray(uniques, dtype=object)
+        self._canonical = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def built_from(self, urls: pd.Series) -> bool:
+        """Whether `urls` are the rows this vocabulary was built from: the same Series, or equal values on an equal index."""
+        return urls is self.source or self.source.equals(urls)
+
+    @property
+    def canonical(self) -> np.ndarray:
+        """Canonical form of every distinct URL (non-strings are left as they are)."""
+        if self._canonical is None:
+            with phase("normalize", rows_in=len(self.codes)) as metrics:
+                self._canonical = np.array([canonicalize(url) if isinstance(url, str) else url for url in self.urls], dtype=object)
+                metrics.update(rows_out=len(self._canonical), distinct_urls=len(self._canonical))
+        return self._canonical
+
+    def rows(self, values: np.ndarray, index=None, fill=None) -> pd.Series:
+        """Broadcasts one value per distinct URL back to the rows."""
+        values = np.append(np.asarray(values, dtype=object), fill)
+        return pd.Series(values[self.codes], index=index, dtype=object)
+
+
+def url_vocabulary(df: pd.DataFrame, vocabulary: UrlVocabulary = None) -> UrlVocabulary:
+    """`vocabulary` if it was built for `df` by an earlier phase, otherwise a new one."""
+    urls = df['url'] if 'url' in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    if vocabulary is not None and vocabulary.built_from(urls):
+        return vocabulary
+    return UrlVocabulary(urls)
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .model_registry import model_version
+from .rule_engine import rules_version
+
+BUCKET_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bucket"))
+DEFAULT_CACHE_PATH = os.path.join(BUCKET_DIR, "verdict_cache.sqlite3")
+DEFAULT_MEMORY_ENTRIES = 100_000
+SQLITE_MAX_PARAMS = 500
+# Part of the namespace, so entries keyed by raw URLs in older cache files are purged.
+KEY_FORM = "canonical"
+
+
+class VerdictCache:
+    """
+    Two-tier cache of final verdicts per URL: an in-memory LRU in front of an
+    on-disk SQLite table that survives restarts.
+
+    Entries are keyed by a hash of the canonical URL (url_normalizer.canonicalize,
+    the form the rules match on) together with the rule-pack and model
+    versions, so a new vectorizer, model or rule file never serves an old
+    verdict; entries from older versions are purged from disk on first use.
+    Encodings of the same URL share the verdict of the first one analysed.
+    A verdict is (attack_type, matched_rule), with attack_type None for benign.
+    Feature vectors are not stored: featurizing a batch costs less than
+    looking them up, and a verdict hit skips featurization anyway.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES, persist: bool = True):
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._namespace = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+        self._db = None
+        if persist:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (key BLOB PRIMARY KEY, namespace TEXT NOT NULL, attack_type TEXT, matched_rule TEXT)"
+            )
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _current_namespace(self) -> str:
+        namespace = f"{KEY_FORM}|{rules_version()}|{model_version()}"
+        if namespace != self._namespace:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM verdicts WHERE namespace != ?", (namespace,))
+                self._db.commit()
+            self._namespace = namespace
+        return namespace
+
+    @staticmethod
+    def _key(namespace: str, url: str) -> bytes:
+        return hashlib.blake2b(f"{namespace}\0{url}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get_many(self, urls) -> dict:
+        """Returns {url: (attack_type, matched_rule)} for every canonical URL that is cached."""
+        found = {}
+        with self._lock:
+            namespace = self._current_namespace()
+            keys = {}
+            for url in urls:
+                key = self._key(namespace, url)
+                verdict = self._memory.get(key)
+                if verdict is not None:
+                    self._memory.move_to_end(key)
+                    found[url] = verdict
+                else:
+                    keys[key] = url
+            self.stats['memory_hits'] += len(found)
+
+            disk_hits = 0
+            if keys and self._db is not None:
+                pending = list(keys)
+                for start in range(0, len(pending), SQLITE_MAX_PARAMS):
+                    chunk = pending[start:start + SQLITE_MAX_PARAMS]
+                    rows = self._db.execute(
+                        f"SELECT key, attack_type, matched_rule FROM verdicts WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, attack_type, matched_rule in rows:
+                        verdict = (attack_type, matched_rule)
+                        found[keys[key]] = verdict
+                        self._remember(key, verdict)
+                    disk_hits += len(rows)
+            self.stats['disk_hits'] += disk_hits
+            self.stats['misses'] += len(keys) - disk_hits
+        return found
+
+    def put_many(self, verdicts: dict):
+        """Stores {url: (attack_type, matched_rule)}, keyed by canonical URL, in both tiers."""
+        with self._lock:
+            namespace = self._current_namespace()
+            rows = []
+            for url, verdict in verdicts.items():
+                key = self._key(namespace, url)
+                self._remember(key, verdict)
+                rows.append((key, namespace, verdict[0], verdict[1]))
+            if rows and self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+            self.stats['stores'] += len(rows)
+
+    def _remember(self, key: bytes, verdict: tuple):
+        self._memory[key] = verdict
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def report(self) -> dict:
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hit_rate = (lookups - self.stats['misses']) / lookups if lookups else 0.0
+        print(f"[+] Verdict cache: {self.stats['memory_hits']} memory hits, {self.stats['disk_hits']} disk hits, "
+              f"{self.stats['misses']} misses ({hit_rate:.1%} hit rate), {len(self._memory)} entries in memory.")
+        return dict(self.stats, hit_rate=hit_rate)
@@ -0,0 +1,269 @@
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bucket", "metrics"))
+METRICS_FILE_ENV = "CYBERAURA_METRICS_FILE"
+METRIC_PREFIX = "cyberaura"
+COUNTERS = ['rows_in', 'rows_out', 'bytes_in', 'attacks', 'cache_hits', 'cache_misses']
+
+logger = logging.getLogger("cyberaura.metrics")
+
+# Lists that collect() is currently filling in this thread or task.
+_collectors = contextvars.ContextVar("cyberaura_phase_collectors", default=())
+
+
+class PhaseRegistry:
+    """Process-wide running totals per phase, safe to update from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def observe(self, record: dict):
+        with self._lock:
+            totals = self._phases.setdefault(record['phase'], {'runs': 0, 'failures': 0, 'seconds': 0.0, 'last_seconds': 0.0,
+                                                               **{name: 0 for name in COUNTERS}})
+            totals['runs'] += 1
+            totals['failures'] += 0 if record['ok'] else 1
+            totals['seconds'] += record['seconds']
+            totals['last_seconds'] = record['seconds']
+            for name in COUNTERS:
+                totals[name] += record.get(name) or 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {phase: dict(totals) for phase, totals in self._phases.items()}
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+
+
+registry = PhaseRegistry()
+
+
+@contextmanager
+def phase(name: str, rows_in: int = None, bytes_in: int = None):
+    """
+    Times one pipeline phase and records it. The yielded dict can be filled in
+    by the caller (rows_out, attacks, cache_hits, cache_misses, ...); on exit
+    it gets the wall time and memory figures, is logged as one JSON line on
+    the `cyberaura.metrics` logger and is added to the registry.
+
+    max_rss_bytes is the process's lifetime peak, not the phase's own;
+    rss_peak_growth_bytes is how far the phase raised it (0 when an earlier
+    phase had already peaked higher). While tracemalloc is tracing,
+    traced_peak_bytes is the phase's own peak of Python allocations. The RSS
+    figures are None where the platform does not report them.
+    """
+    record = {'phase': name, 'rows_in': rows_in, 'rows_out': None, 'bytes_in': bytes_in}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    peak_before = max_rss()
+    started_at = time.time()
+    started = time.perf_counter()
+    record['ok'] = False
+    try:
+        yield record
+        record['ok'] = True
+    finally:
+        record['seconds'] = time.perf_counter() - started
+        record['started'] = started_at
+        record['rss_bytes'] = current_rss()
+        record['max_rss_bytes'] = max_rss()
+        record['rss_peak_growth_bytes'] = None if peak_before is None else record['max_rss_bytes'] - peak_before
+        if tracing:
+            record['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        _publish(record)
+
+
+def _publish(record: dict):
+    registry.observe(record)
+    for records in _collectors.get():
+        records.append(record)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record, default=str))
+    metrics_path = os.environ.get(METRICS_FILE_ENV)
+    if metrics_path:
+        write_prometheus(metrics_path)
+
+
+@contextmanager
+def collect():
+    """Yields a list that receives the record of every phase finished inside the block (e.g. for one UI run)."""
+    records = []
+    token = _collectors.set(_collectors.get() + (records,))
+    try:
+        yield records
+    finally:
+        _collectors.reset(token)
+
+
+# --- Memory ---
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No /proc (e.g. macOS): fall back to the lifetime peak.
+        return max_rss()
+
+
+def max_rss() -> int:
+    """The process's lifetime resident set high-water mark in bytes, or None without the resource module."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --- Export ---
+def render_prometheus() -> str:
+    """The registry in the Prometheus text exposition format."""
+    snapshot = registry.snapshot()
+    metrics = [
+        ('runs', 'counter', "Phase executions."),
+        ('failures', 'counter', "Phase executions that raised."),
+        ('seconds', 'counter', "Wall time spent in the phase."),
+        ('last_seconds', 'gauge', "Wall time of the most recent execution."),
+        ('rows_in', 'counter', "Rows handed to the phase."),
+        ('rows_out', 'counter', "Rows the phase produced."),
+        ('bytes_in', 'counter', "Input bytes read by the phase."),
+        ('attacks', 'counter', "Attacks labelled by the phase."),
+        ('cache_hits', 'counter', "Verdict cache hits."),
+        ('cache_misses', 'counter', "Verdict cache misses."),
+    ]
+    lines = []
+    for name, kind, help_text in metrics:
+        metric = f"{METRIC_PREFIX}_phase_{name}" + ("_total" if kind == 'counter' else "")
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for phase_name, totals in sorted(snapshot.items()):
+            lines.append(f'{metric}{{phase="{phase_name}"}} {totals[name]}')
+    peak = max_rss()
+    if peak is not None:
+        lines += [f"# HELP {METRIC_PREFIX}_process_max_rss_bytes Resident set high-water mark of the process.",
+                  f"# TYPE {METRIC_PREFIX}_process_max_rss_bytes gauge",
+                  f"{METRIC_PREFIX}_process_max_rss_bytes {peak}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = os.path.join(METRICS_DIR, "cyberaura.prom")) -> str:
+    """Writes the metrics for node_exporter's textfile collector; the rename keeps scrapes from seeing half a file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(temp_path, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves GET /metrics from a daemon thread; returns the server so the caller can shut it down."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    print(f"[*] Metrics available at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def configure_logging(path: str = None, level: int = logging.INFO):
+    """Sends the structured phase records to `path` (or stderr) as JSON lines."""
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
+
+
+# --- Profiling ---
+@contextmanager
+def profile_run(output_dir: str = METRICS_DIR, cpu: bool = True, memory: bool = False, top: int = 25):
+    """
+    Profiles everything inside the block: with `cpu` a cProfile dump plus a
+    text summary sorted by cumulative time, with `memory` the `top` allocation
+    sites from tracemalloc. Phases finished inside the block also report their
+    traced peak while memory tracing is on.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    profiler = cProfile.Profile() if cpu else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profile_path = os.path.join(output_dir, f"profile-{stamp}.prof")
+            profiler.dump_stats(profile_path)
+            with open(os.path.join(output_dir, f"profile-{stamp}.txt"), "w") as f:
+                pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(top * 2)
+            print(f"[💾] CPU profile saved to: {profile_path}")
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            memory_path = os.path.join(output_dir, f"memory-{stamp}.txt")
+            with open(memory_path, "w") as f:
+                f.write(f"traced current {current} bytes, peak {peak} bytes\n")
+                for stat in snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
+            print(f"[💾] Allocation profile saved to: {memory_path}")
+
+
+def format_phase_table(records: list) -> str:
+    """A short human-readable line per phase record."""
+    lines = []
+    for record in records:
+        rows = f"{record['rows_in']} → {record['rows_out']} rows" if record.get('rows_in') is not None else f"{record.get('rows_out')} rows"
+        extras = []
+        if record.get('bytes_in'):
+            extras.append(f"{record['bytes_in'] / 2**20:.1f} MB read")
+        given_up = (record.get('pairing_expired_requests') or 0) + (record.get('pairing_evicted_requests') or 0)
+        if given_up:
+            extras.append(f"{given_up} unanswered requests given up")
+        if record.get('cache_hits') is not None:
+            extras.append(f"{record['cache_hits']} cache hits")
+        if record.get('traced_peak_bytes') is not None:
+            extras.append(f"traced peak {record['traced_peak_bytes'] / 2**20:.0f} MB")
+        if record.get('max_rss_bytes') is not None:
+            extras.append(f"process peak RSS {record['max_rss_bytes'] / 2**20:.0f} MB (+{record['rss_peak_growth_bytes'] / 2**20:.0f} MB here)")
+        lines.append(", ".join([f"{record['phase']}: {record['seconds']:.2f}s", rows] + extras))
+    return "\n".join(lines)
+
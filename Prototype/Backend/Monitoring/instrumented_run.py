@@ -0,0 +1,36 @@
+import argparse
+import os
+from contextlib import nullcontext
+
+from ..Detector.detection_engine import run_hybrid_detection
+from ..Parser.csv_parser import pair_transactions_from_csv
+from ..Parser.pcap_parser import parse_pcap_to_df
+from .instrumentation import METRICS_DIR, collect, configure_logging, format_phase_table, profile_run, write_prometheus
+
+
+def run_instrumented(capture_path: str):
+    """Parses one capture and runs hybrid detection on it; returns the phase records of the run."""
+    with collect() as phase_records:
+        if capture_path.lower().endswith(".csv"):
+            transactions = pair_transactions_from_csv(capture_path)
+        else:
+            transactions = parse_pcap_to_df(capture_path)
+        run_hybrid_detection(transactions)
+    return phase_records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one capture through the pipeline with per-phase metrics and optional profiling.")
+    parser.add_argument("capture", help=".pcap, .pcapng or IPDR .csv file")
+    parser.add_argument("--metrics-file", default=os.path.join(METRICS_DIR, "cyberaura.prom"), help="Prometheus text file to write")
+    parser.add_argument("--log-file", help="write the JSON phase records here instead of stderr")
+    parser.add_argument("--profile", action="store_true", help="capture a cProfile of the run")
+    parser.add_argument("--trace-memory", action="store_true", help="capture tracemalloc allocation sites (slower)")
+    args = parser.parse_args()
+
+    configure_logging(args.log_file)
+    profiling = profile_run(cpu=args.profile, memory=args.trace_memory) if (args.profile or args.trace_memory) else nullcontext()
+    with profiling:
+        phase_records = run_instrumented(args.capture)
+    print("\n" + format_phase_table(phase_records))
+    print(f"[💾] Metrics written to: {write_prometheus(args.metrics_file)}")
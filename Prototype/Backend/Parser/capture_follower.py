@@ -0,0 +1,192 @@
+import hashlib
+import io
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from .pcap_reader import PcapReader
+from .tcp_reassembly import FlowTable
+from .transaction_pairing import STREAM_KEY, StreamingPairer
+from .transaction_schema import TransactionBuffer, as_transactions
+
+# A changed prefix means the file was rotated or rewritten, not appended to.
+FINGERPRINT_BYTES = 4096
+DEFAULT_MAX_RECORDS = 10_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CaptureFollower(ABC):
+    """
+    Reads a capture file that is still being written, like `tail -f`.
+
+    Each poll() parses only what was appended since the previous poll and
+    returns the newly completed transactions. state() captures the byte offset
+    and the requests still waiting for a response, so a new follower built
+    with that state continues exactly where this one stopped. If the file
+    shrinks or its first bytes change, it is treated as a new capture and
+    read again from the start.
+    """
+
+    kind = None
+
+    def __init__(self, file_path: str, state: dict = None):
+        self.file_path = file_path
+        self._reset()
+        if state is not None:
+            if state.get('kind') != self.kind:
+                raise ValueError(f"Checkpoint is for a {state.get('kind')} capture, not {self.kind}.")
+            self.offset = state['offset']
+            self._fingerprint = state['fingerprint']
+            self._restore(state)
+
+    def _reset(self):
+        self.offset = 0
+        self._fingerprint = None
+
+    def _restore(self, state: dict):
+        pass
+
+    def state(self) -> dict:
+        return {'kind': self.kind, 'file_path': self.file_path, 'offset': self.offset, 'fingerprint': self._fingerprint}
+
+    def poll(self) -> pd.DataFrame:
+        """Returns the transactions completed by data appended since the last poll (possibly none)."""
+        try:
+            size = os.path.getsize(self.file_path)
+        except FileNotFoundError:
+            return pd.DataFrame()
+        if size < self.offset or not self._same_file():
+            print(f"[!] {self.file_path} was truncated or replaced. Starting again from byte 0.")
+            self._reset()
+        if size == self.offset:
+            return pd.DataFrame()
+
+        df = self._read_appended(size)
+        if self.offset and (self._fingerprint is None or self._fingerprint[0] < FINGERPRINT_BYTES):
+            self._fingerprint = _file_fingerprint(self.file_path, min(self.offset, FINGERPRINT_BYTES))
+        return df
+
+    def _same_file(self) -> bool:
+        if self._fingerprint is None:
+            return True
+        return _file_fingerprint(self.file_path, self._fingerprint[0]) == self._fingerprint
+
+    @abstractmethod
+    def _read_appended(self, size: int) -> pd.DataFrame:
+        """Parses the data between self.offset and `size`, advancing self.offset past what it consumed."""
+
+
+class PcapFollower(CaptureFollower):
+    """Follows a pcap/pcapng file; TCP flow state and unanswered requests carry over between polls."""
+
+    kind = "pcap"
+
+    def __init__(self, file_path: str, state: dict = None, max_records: int = DEFAULT_MAX_RECORDS):
+        self.max_records = max_records
+        super().__init__(file_path, state)
+
+    def _reset(self):
+        super()._reset()
+        self._reader_state = None
+        self.flows = FlowTable()
+
+    def _restore(self, state: dict):
+        self._reader_state = state['reader']
+        self.flows = state['flows']
+
+    def state(self) -> dict:
+        return dict(super().state(), reader=self._reader_state, flows=self.flows)
+
+    def _read_appended(self, size: int) -> pd.DataFrame:
+        try:
+            reader = PcapReader(self.file_path)
+        except ValueError as e:
+            # The file header itself may not have been written out yet, or the
+            # writer is mid-flush; either way the next poll tries again.
+            if size >= 64:
+                print(f"[!] Could not read {self.file_path} yet ({e}). Retrying on the next poll.")
+            return pd.DataFrame()
+
+        buffer = TransactionBuffer()
+        with reader:
+            if self._reader_state is not None:
+                reader.restore(self._reader_state)
+            # Stops after a bounded number of transactions; the rest is read on the next poll.
+            for packet in reader.iter_tcp_packets():
+                buffer.extend(self.flows.feed(packet))
+                if len(buffer) >= self.max_records:
+                    break
+            self._reader_state = reader.checkpoint()
+        self.offset = self._reader_state['position']
+        return buffer.to_frame() if len(buffer) else pd.DataFrame()
+
+
+class CsvFollower(CaptureFollower):
+    """
+    Follows an IPDR-style CSV. Only whole lines are consumed; requests without
+    a response yet are kept by a StreamingPairer and paired against the rows
+    appended later, within its TTL and pending limit.
+    """
+
+    kind = "csv"
+
+    def __init__(self, file_path: str, state: dict = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        super().__init__(file_path, state)
+
+    def _reset(self):
+        super()._reset()
+        self._header = None
+        self.pairer = StreamingPairer()
+
+    def _restore(self, state: dict):
+        self._header = state['header']
+        self.pairer = state['pairer']
+
+    def state(self) -> dict:
+        return dict(super().state(), header=self._header, pairer=self.pairer)
+
+    @property
+    def pending_requests(self) -> int:
+        return len(self.pairer)
+
+    def _read_appended(self, size: int) -> pd.DataFrame:
+        with open(self.file_path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, self.max_bytes))
+            if b"\n" not in data and len(data) < size - self.offset:
+                data += f.read(size - self.offset - len(data))  # One line longer than max_bytes.
+        # A line without its newline is still being written.
+        last_newline = data.rfind(b"\n")
+        if last_newline < 0:
+            return pd.DataFrame()
+        data = data[:last_newline + 1]
+        self.offset += len(data)
+
+        if self._header is None:
+            header_end = data.find(b"\n") + 1
+            self._header, data = data[:header_end], data[header_end:]
+        if not data.strip():
+            return pd.DataFrame()
+
+        rows = pd.read_csv(io.BytesIO(self._header + data))
+
+        # Judging "already paired" per chunk is unreliable (a chunk may hold only
+        # responses), so always pair; complete rows pass through unchanged.
+        if not all(col in rows.columns for col in STREAM_KEY):
+            return as_transactions(rows)
+        return as_transactions(self.pairer.feed(rows))
+
+
+def open_follower(file_path: str, state: dict = None) -> CaptureFollower:
+    """Picks the follower for a capture by its extension (.csv, otherwise pcap/pcapng)."""
+    if os.path.splitext(file_path)[1].lower() == ".csv":
+        return CsvFollower(file_path, state)
+    return PcapFollower(file_path, state)
+
+
+def _file_fingerprint(file_path: str, length: int) -> tuple:
+    with open(file_path, "rb") as f:
+        head = f.read(length)
+    return len(head), hashlib.blake2b(head, digest_size=16).hexdigest()
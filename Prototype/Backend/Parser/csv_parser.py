@@ -1,44 +1,87 @@
 import os
 import pandas as pd
 
+from ..Monitoring.instrumentation import phase
+from ..Storage.result_store import pyarrow_available, save_transactions
+from .transaction_pairing import STREAM_KEY, StreamingPairer, record_pairing
+from .transaction_schema import as_transactions, concat_transactions, empty_labels
+
+RECORD_COLUMNS = ['timestamp', 'src_ip', 'src_port', 'dst_ip', 'dst_port', 'highest_protocol', 'length', 'url', 'status_code']
+DEFAULT_CHUNK_ROWS = 100_000
+
 def get_csv_path():
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     csv_path = os.path.join(BASE_DIR, "..", "..", "..", "Dataset", "IPDR Dataset", "command_injection.csv")
     return os.path.normpath(csv_path)
 
-def pair_transactions_from_csv(file_path: str) -> pd.DataFrame:
+def pair_transactions_from_csv(file_path: str, pairer: StreamingPairer = None) -> pd.DataFrame:
     print(f"[*] Loading and pairing transactions from {file_path}...")
     try:
-        df = pd.read_csv(file_path)
+        bytes_in = os.path.getsize(file_path)
+        with phase("read_csv", bytes_in=bytes_in) as metrics:
+            df = pd.read_csv(file_path)
+            metrics['rows_out'] = len(df)
     except FileNotFoundError:
         print(f"[!] Error: File not found at {file_path}")
         return pd.DataFrame()
-    paired_records = []
-    open_requests = {}
-    for index, row in df.iterrows():
-        is_request = pd.notna(row.get('url'))
-        is_response = pd.notna(row.get('status_code'))
-        try:
-            stream_key = (row['src_ip'], row['src_port'], row['dst_ip'], row['dst_port'])
-            if is_request:
-                open_requests[stream_key] = {'timestamp': row.get('timestamp'), 'src_ip': row.get('src_ip'), 'src_port': row.get('src_port'), 'dst_ip': row.get('dst_ip'), 'dst_port': row.get('dst_port'), 'highest_protocol': row.get('highest_protocol'), 'length': row.get('length'), 'url': row.get('url')}
-            elif is_response:
-                response_key = (row['dst_ip'], row['dst_port'], row['src_ip'], row['src_port'])
-                if response_key in open_requests:
-                    record = open_requests[response_key]
-                    record['status_code'] = row['status_code']
-                    record['attack_type'] = None
-                    paired_records.append(record)
-                    del open_requests[response_key]
-        except KeyError:
-            print(f"[*] Warning: Skipping malformed row {index}.")
-            continue
-    result_df = pd.DataFrame(paired_records)
+    with phase("pair_csv", rows_in=len(df)) as metrics:
+        pairer = pairer if pairer is not None else StreamingPairer()
+        paired_df = pairer.feed(df)
+        unpaired = pairer.flush()
+        if len(unpaired):
+            paired_df = pd.concat([paired_df, unpaired], ignore_index=True)
+        record_pairing(pairer.stats, metrics)
+        if paired_df.empty:
+            result_df = pd.DataFrame()
+        else:
+            result_df = as_transactions(paired_df.reindex(columns=RECORD_COLUMNS))
+            result_df['attack_type'] = empty_labels(len(result_df))
+        metrics['rows_out'] = len(result_df)
     print(f"[+] Done. Paired {len(result_df)} complete HTTP transactions.")
     return result_df
 
-def save_df_to_bucket(df: pd.DataFrame):
-    """Saves the DataFrame to a static CSV file named parsed_data.csv."""
+def iter_csv_transactions(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, pairer: StreamingPairer = None):
+    """
+    Reads an IPDR CSV `chunk_rows` lines at a time and yields the transactions
+    paired in each chunk. Requests still waiting for their response are carried
+    into the next chunk by `pairer` (a default StreamingPairer), so the pairs
+    are the same as when pairing the whole file at once unless a response
+    comes later than the pairer's TTL or pending limit allow. Already-paired
+    rows pass through unchanged, and files without the stream columns are
+    yielded as read; either way the known columns get the typed transaction
+    schema.
+    """
+    pairer = pairer if pairer is not None else StreamingPairer()
+    for rows in pd.read_csv(file_path, chunksize=chunk_rows):
+        if not all(col in rows.columns for col in STREAM_KEY + ['url', 'status_code']):
+            yield as_transactions(rows)
+            continue
+        paired = pairer.feed(rows)
+        if len(paired):
+            yield as_transactions(paired)
+    unpaired = pairer.flush()
+    if len(unpaired):
+        yield as_transactions(unpaired)
+
+def read_csv_transactions(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, pairer: StreamingPairer = None) -> pd.DataFrame:
+    """Chunked counterpart of pair_transactions_from_csv that keeps every column of the file."""
+    with phase("read_csv_chunked", bytes_in=os.path.getsize(file_path)) as metrics:
+        pairer = pairer if pairer is not None else StreamingPairer()
+        chunks = list(iter_csv_transactions(file_path, chunk_rows, pairer))
+        df = concat_transactions(chunks)
+        metrics['rows_out'] = len(df)
+        record_pairing(pairer.stats, metrics)
+    return df
+
+def save_df_to_bucket(df: pd.DataFrame, source_file: str = None):
+    """
+    Appends the transactions to the columnar store in Bucket/store, partitioned
+    by capture date and source file. Without pyarrow, falls back to writing
+    Bucket/parsed_data.csv.
+    """
+    if pyarrow_available():
+        save_transactions(df, source_file)
+        return
     output_filename = "parsed_data.csv" 
     script_dir = os.path.dirname(os.path.abspath(__file__))
     bucket_path = os.path.join(script_dir, "..", "Bucket")
@@ -51,4 +94,4 @@ if __name__ == "__main__":
     csv_file = get_csv_path()
     paired_df = pair_transactions_from_csv(csv_file)
 
-    save_df_to_bucket(paired_df)
\ No newline at end of file
+    save_df_to_bucket(paired_df, csv_file)
\ No newline at end of file
@@ -0,0 +1,274 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .pcap_reader import PcapReader
+from .tcp_reassembly import MAX_FLOWS, FlowTable
+from .transaction_pairing import record_pairing
+from .transaction_schema import CATEGORY_COLUMNS, TransactionBuffer, concat_transactions
+
+# Below this size the pool start-up costs more than it saves.
+MIN_BYTES_FOR_POOL = 32 * 1024 * 1024
+
+# Columns of a record index, in PcapReader.iter_records() order.
+TIMESTAMP, LENGTH, LINKTYPE, START, END = range(5)
+
+# Where a transaction lands in the sequential output, within one packet:
+# requests given up by the idle sweep come first, then everything the packet
+# itself gave up or completed, and requests left when the capture ends last.
+EXPIRED, AT_PACKET, AT_END = range(3)
+
+SAMPLES_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Dataset", "IPDR Dataset"))
+
+
+# --- Record Index ---
+def index_records(file_path: str) -> np.ndarray:
+    """
+    Walks only the record headers of a capture and returns an (n, 5) int64
+    array of (timestamp_ns, orig_len, linktype, data_start, data_end), so
+    any run of records can later be decoded on its own.
+    """
+    flat = array('q')
+    with PcapReader(file_path) as reader:
+        for record in reader.iter_records():
+            flat.extend(record)
+    return np.frombuffer(flat, dtype=np.int64).reshape(-1, 5)
+
+
+def _byte_ranges(records: np.ndarray, count: int) -> list:
+    """Splits the index into `count` runs of consecutive records covering about the same number of bytes."""
+    bounds = np.linspace(records[0, START], records[-1, END], count + 1)[1:-1]
+    return np.split(records, np.searchsorted(records[:, START], bounds))
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+# --- Workers ---
+def _flow_buckets(file_path: str, records: np.ndarray, buckets: int) -> np.ndarray:
+    """Stage one: the bucket of every record's connection, -1 for records that are not TCP."""
+    result = []
+    with PcapReader(file_path) as reader:
+        for packet in reader.decode_records(records.tolist()):
+            if packet is None:
+                result.append(-1)
+            else:
+                # XOR is symmetric, so both directions of a connection share a bucket.
+                digest = zlib.crc32(packet.src_ip.encode()) ^ zlib.crc32(packet.dst_ip.encode()) ^ packet.src_port ^ packet.dst_port
+                result.append(digest % buckets)
+    return np.array(result, dtype=np.int32)
+
+
+def _pair_bucket(file_path: str, records: np.ndarray, positions: np.ndarray, clocks: np.ndarray, end_clock: int, end: int, emit_unpaired: bool) -> dict:
+    """
+    Stage two: reassembles and pairs every connection of one bucket. Packets
+    arrive in capture order with the whole capture's clock, so each
+    connection sees exactly what the sequential parse would give it. Every
+    transaction is tagged with where the sequential parse would have emitted
+    it (see _merge).
+    """
+    flows = FlowTable(emit_unpaired=emit_unpaired)
+    buffer = TransactionBuffer()
+    tags = {'position': [], 'kind': [], 'lru': []}
+    activity = {}  # flow key -> (timestamp_ns, position) of its latest packet; only needed to place unpaired rows
+    open_flows = [(0, 0)]  # (position, connections open after it) whenever the count changes
+
+    def tag(transactions, kind, position):
+        for transaction in transactions:
+            if kind == AT_PACKET:
+                tags['position'].append(position)
+                tags['lru'].append(0)
+            else:
+                timestamp_ns, src_ip, src_port, dst_ip, dst_port = transaction[:5]
+                forward, reverse = (src_ip, src_port, dst_ip, dst_port), (dst_ip, dst_port, src_ip, src_port)
+                last_seen, touched = activity[forward if forward < reverse else reverse]
+                # Expired rows are placed by the deadline their connection missed; _merge finds the packet.
+                tags['position'].append(last_seen + flows.idle_ttl_ns if kind == EXPIRED else position)
+                tags['lru'].append(touched)
+            tags['kind'].append(kind)
+        buffer.extend(transactions)
+
+    with PcapReader(file_path) as reader:
+        packets = reader.decode_records(records.tolist())
+        for position, clock_ns, packet in zip(positions.tolist(), clocks.tolist(), packets):
+            expired = flows.stats['expired_requests']
+            completed = flows.feed(packet, clock_ns)
+            if completed:
+                # The idle sweep runs before the packet is processed, so its rows come first.
+                expired = flows.stats['expired_requests'] - expired if emit_unpaired else 0
+                tag(completed[:expired], EXPIRED, position)
+                tag(completed[expired:], AT_PACKET, position)
+            if emit_unpaired:
+                forward = (packet.src_ip, packet.src_port, packet.dst_ip, packet.dst_port)
+                reverse = (packet.dst_ip, packet.dst_port, packet.src_ip, packet.src_port)
+                activity[forward if forward < reverse else reverse] = (packet.timestamp_ns, position)
+            if len(flows) != open_flows[-1][1]:
+                open_flows.append((position, len(flows)))
+
+    tag(flows.advance_clock(end_clock), EXPIRED, end)
+    tag(flows.flush(), AT_END, end)
+    return {'frame': buffer.to_frame(), 'tags': {name: np.array(values, dtype=np.int64) for name, values in tags.items()},
+            'open_flows': np.array(open_flows, dtype=np.int64), 'stats': flows.stats}
+
+
+# --- Merging ---
+def _merge(parts: list, clock: np.ndarray) -> pd.DataFrame:
+    """Orders the rows of every bucket as the sequential parse emits them and interns categories in that order."""
+    frame = concat_transactions([part['frame'] for part in parts])
+    position, kind, lru = (np.concatenate([part['tags'][name] for part in parts]) for name in ('position', 'kind', 'lru'))
+    expired = kind == EXPIRED
+    # The sweep that expires a connection runs at the first packet that moves the clock past its deadline.
+    position[expired] = np.searchsorted(clock, position[expired], side='right')
+    row = np.concatenate([np.arange(len(part['frame'])) for part in parts])
+    # Rows of different buckets never tie on (position, kind, lru): a packet belongs to one bucket and lru is a packet position.
+    frame = frame.take(np.lexsort((row, lru, kind, position))).reset_index(drop=True)
+    return _as_one_buffer(frame)
+
+
+def _as_one_buffer(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gives the merged rows the dtypes one TransactionBuffer would have:
+    categories in order of first appearance (addresses shared by both IP
+    columns) and the url dtype inferred from the values.
+    """
+    frame['url'] = pd.Series(frame['url'].to_numpy(dtype=object))
+    for columns in (['src_ip', 'dst_ip'], ['highest_protocol'], ['status_code']):
+        values, order = [], []
+        for offset, column in enumerate(columns):
+            codes = frame[column].cat.codes.to_numpy()
+            rows = np.flatnonzero(codes >= 0)
+            values.append(frame[column].cat.categories.take(codes[rows]))
+            order.append(rows * len(columns) + offset)
+        categories = values[0].append(values[1:])[np.argsort(np.concatenate(order), kind='stable')].unique()
+        for column in columns:
+            frame[column] = frame[column].cat.set_categories(categories)
+    return frame
+
+
+def _peak_flows(parts: list) -> int:
+    """
+    Most connections open at once across the buckets. A bucket only notices
+    that a connection expired at its own next packet, so with idle expiry
+    this can overcount slightly, never undercount.
+    """
+    changes = [(part['open_flows'][1:, 0], np.diff(part['open_flows'][:, 1])) for part in parts]
+    positions = np.concatenate([position for position, _ in changes])
+    deltas = np.concatenate([delta for _, delta in changes])
+    if not len(deltas):
+        return 0
+    return int(np.cumsum(deltas[np.argsort(positions, kind='stable')]).max())
+
+
+# --- Parsing ---
+def parse_pcap_parallel(file_path: str, workers: int = None, emit_unpaired: bool = False, metrics: dict = None,
+                        min_bytes: int = MIN_BYTES_FOR_POOL) -> pd.DataFrame:
+    """
+    Parses one capture with the native reader across a pool of worker
+    processes, producing exactly the frame the sequential parse would.
+
+    The record headers are indexed first (cheap, nothing is decoded), the
+    file is split into byte ranges whose packets workers decode in parallel
+    to find each one's connection, and the connections are then hashed into
+    one bucket per worker and reassembled there. A connection whose requests
+    and responses straddle a range boundary thus still meets all of its
+    packets in order; the merge puts rows back in sequential emission order.
+
+    Returns None, so the caller parses sequentially, for small captures, a
+    single worker, or when connection limits were hit that only the
+    sequential table can reproduce (eviction beyond MAX_FLOWS, idle expiry in
+    a capture with out-of-order timestamps).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or os.path.getsize(file_path) < min_bytes:
+        return None
+    records = index_records(file_path)
+    if len(records) < workers:
+        return None
+
+    with _process_pool(workers) as pool:
+        ranges = _byte_ranges(records, workers)
+        buckets = np.concatenate(list(pool.map(_flow_buckets, repeat(file_path), ranges, repeat(workers))))
+        tcp = np.flatnonzero(buckets >= 0)
+        if not len(tcp):
+            return None
+        timestamps = records[tcp, TIMESTAMP]
+        clock = np.maximum.accumulate(timestamps)
+        members = [np.flatnonzero(buckets[tcp] == bucket) for bucket in range(workers)]
+        parts = list(pool.map(_pair_bucket, repeat(file_path), [records[tcp[positions]] for positions in members], members,
+                              [clock[positions] for positions in members], repeat(int(clock[-1])), repeat(len(tcp)), repeat(emit_unpaired)))
+
+    stats = {name: sum(part['stats'][name] for part in parts) for name in parts[0]['stats']}
+    stats['peak_flows'] = _peak_flows(parts)
+    if stats['peak_flows'] > MAX_FLOWS or (stats['expired_flows'] and np.any(timestamps < clock)):
+        print("[!] Connection limits were reached in a way only the sequential parse reproduces; parsing sequentially.")
+        return None
+
+    if metrics is not None:
+        metrics.update(workers=workers, records=len(records))
+    record_pairing(stats, metrics)
+    return _merge(parts, clock)
+
+
+# --- Benchmark ---
+def _compare(file_path: str, workers: int, emit_unpaired: bool) -> dict:
+    from .pcap_parser import _parse_with_native_reader
+
+    started = time.perf_counter()
+    expected = _parse_with_native_reader(file_path, emit_unpaired)
+    sequential = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = parse_pcap_parallel(file_path, workers, emit_unpaired, min_bytes=0)
+    parallel = time.perf_counter() - started
+    identical = actual is not None and actual.equals(expected) and all(
+        actual[column].cat.categories.equals(expected[column].cat.categories) for column in CATEGORY_COLUMNS)
+    return {'file': file_path, 'rows': len(expected), 'sequential_s': sequential, 'parallel_s': parallel, 'identical': identical}
+
+
+def run_comparison(paths: list, workers: int = None, emit_unpaired: bool = False, synthetic: str = None, data_dir: str = None) -> list:
+    """Times the sequential and parallel parse of each capture (and optionally a synthetic one of about `synthetic` bytes) and checks they agree."""
+    from ..Benchmark.traffic_generator import generate_transactions, parse_size, transactions_for_size, write_pcap
+
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory(dir=data_dir) as work_dir:
+        if synthetic:
+            synthetic_path = os.path.join(work_dir, "synthetic.pcap")
+            print(f"[*] Generating about {synthetic} of pcap traffic...")
+            write_pcap(synthetic_path, generate_transactions(transactions_for_size(parse_size(synthetic), "pcap")))
+            paths = list(paths) + [synthetic_path]
+        for path in paths:
+            result = _compare(path, workers, emit_unpaired)
+            results.append(result)
+            print(f"[+] {os.path.basename(path)}: {result['rows']} rows, sequential {result['sequential_s']:.2f}s, "
+                  f"parallel {result['parallel_s']:.2f}s on {workers} workers "
+                  f"({result['sequential_s'] / max(result['parallel_s'], 1e-9):.2f}x), "
+                  f"{'identical' if result['identical'] else 'DIFFERENT'}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the parallel pcap parser with the sequential one.")
+    parser.add_argument("paths", nargs="*", help="captures to parse (default: the pcaps in Dataset/IPDR Dataset)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--synthetic", help="also generate and parse a synthetic capture of about this size, e.g. 200M")
+    parser.add_argument("--data-dir", help="where to write the synthetic capture (default: the system temp dir)")
+    parser.add_argument("--emit-unpaired", action="store_true", help="keep requests that never get a response")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(SAMPLES_DIR, "*.pcap")))
+    results = run_comparison(paths, args.workers, args.emit_unpaired, args.synthetic, args.data_dir)
+    if not all(result['identical'] for result in results):
+        raise SystemExit(1)
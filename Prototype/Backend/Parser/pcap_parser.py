@@ -1,23 +1,89 @@
-import pyshark
 import os
 import pandas as pd
 
+from ..Monitoring.instrumentation import phase
+from ..Storage.result_store import pyarrow_available, save_transactions
+from .parallel_pcap import parse_pcap_parallel
+from .pcap_reader import PcapReader
+from .tcp_reassembly import FlowTable
+from .transaction_pairing import StreamingPairer, record_pairing
+from .transaction_schema import TransactionBuffer, as_transactions, concat_transactions
+
 def get_pcap_path():
     """Constructs the full path to the sample pcap file."""
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     pcap_path = os.path.join(BASE_DIR, "..", "..", "..", "Dataset", "Attack Pcaps", "Sql Injection", "sql_injection.pcap")
     return os.path.normpath(pcap_path)
 
-def parse_pcap_to_df(file_path: str) -> pd.DataFrame:
+def parse_pcap_to_df(file_path: str, use_pyshark: bool = False, emit_unpaired: bool = False, workers: int = 1) -> pd.DataFrame:
     """
     Reads a PCAP, pairs HTTP requests with their responses, and extracts
     fields into a Pandas DataFrame.
+
+    The built-in pcap/pcapng reader is used by default. pyshark is only used
+    when requested or when the native reader cannot decode the capture.
+    Requests that never get a response are dropped, or kept without a
+    status_code with `emit_unpaired=True`. Columns follow the typed
+    transaction schema (see transaction_schema).
+    With `workers` other than 1 (None for one per CPU), large captures are
+    decoded and paired across that many processes, with the same result
+    (see parallel_pcap).
     """
     print(f"[*] Parsing {file_path}...")
+    with phase("parse_pcap", bytes_in=os.path.getsize(file_path)) as metrics:
+        df = None
+        if not use_pyshark:
+            try:
+                if workers != 1:
+                    df = parse_pcap_parallel(file_path, workers, emit_unpaired, metrics)
+                if df is None:
+                    df = _parse_with_native_reader(file_path, emit_unpaired, metrics)
+            except ValueError as e:
+                print(f"[!] Native reader could not decode the capture ({e}). Falling back to pyshark.")
+        if df is None:
+            df = _parse_with_pyshark(file_path, emit_unpaired, metrics)
+        metrics['rows_out'] = len(df)
+    print(f"[+] Done. Extracted {len(df)} complete HTTP transactions.")
+    return df
+
+def _parse_with_native_reader(file_path: str, emit_unpaired: bool = False, metrics: dict = None) -> pd.DataFrame:
+    flows = FlowTable(emit_unpaired=emit_unpaired)
+    buffer = TransactionBuffer()
+    with PcapReader(file_path) as reader:
+        for packet in reader.iter_tcp_packets():
+            buffer.extend(flows.feed(packet))
+    buffer.extend(flows.flush())
+    record_pairing(flows.stats, metrics)
+    return buffer.to_frame()
+
+def iter_pcap_batches(file_path: str, batch_size: int = 10_000, flows: FlowTable = None):
+    """
+    Yields paired transactions as typed DataFrames of at most `batch_size` rows, as they complete.
+    Unanswered requests left at the end of the capture are yielded last if `flows` emits them.
+    """
+    flows = flows if flows is not None else FlowTable()
+    buffer = TransactionBuffer(batch_size)
+    with PcapReader(file_path) as reader:
+        for packet in reader.iter_tcp_packets():
+            completed = flows.feed(packet)
+            if completed:
+                buffer.extend(completed)
+                if len(buffer) >= batch_size:
+                    yield buffer.to_frame()
+                    buffer.clear()
+    buffer.extend(flows.flush())
+    if len(buffer):
+        yield buffer.to_frame()
+
+def _parse_with_pyshark(file_path: str, emit_unpaired: bool = False, metrics: dict = None, batch_size: int = 10_000) -> pd.DataFrame:
+    import pyshark
+
     capture = pyshark.FileCapture(file_path, display_filter="http")
 
-    records = []
-    open_requests = {}
+    # Requests and responses become rows for the bounded pairer, which matches
+    # pipelined requests in order instead of letting a reused 4-tuple overwrite them.
+    pairer = StreamingPairer(emit_unpaired=emit_unpaired)
+    paired, events = [], TransactionBuffer(batch_size)
 
     for packet in capture:
         try:
@@ -25,40 +91,39 @@ def parse_pcap_to_df(file_path: str) -> pd.DataFrame:
             tcp_layer = packet.tcp
             http_layer = packet.http
 
-            stream_key = (ip_layer.src, tcp_layer.srcport, ip_layer.dst, tcp_layer.dstport)
-            
+            url, status_code = None, None
             if hasattr(http_layer, 'request_full_uri'):
-                request_data = {
-                    'timestamp': packet.sniff_timestamp,
-                    'src_ip': ip_layer.src,
-                    'src_port': tcp_layer.srcport,
-                    'dst_ip': ip_layer.dst,
-                    'dst_port': tcp_layer.dstport,
-                    'highest_protocol': packet.highest_layer,
-                    'length': packet.length,
-                    'url': http_layer.request_full_uri,
-                }
-                open_requests[stream_key] = request_data
-
+                url = http_layer.request_full_uri
             elif hasattr(http_layer, 'response_code'):
-                response_key = (ip_layer.dst, tcp_layer.dstport, ip_layer.src, tcp_layer.srcport)
-                
-                if response_key in open_requests:
-                    record = open_requests[response_key]
-                    record['status_code'] = http_layer.response_code
-                    record['attack_type'] = None
-                    records.append(record)
-                    del open_requests[response_key]
-
-        except (AttributeError, KeyError):
+                status_code = http_layer.response_code
+            else:
+                continue
+            seconds, _, fraction = packet.sniff_timestamp.partition(".")
+            events.append(int(seconds) * 1_000_000_000 + int(fraction[:9].ljust(9, "0")), ip_layer.src, int(tcp_layer.srcport),
+                          ip_layer.dst, int(tcp_layer.dstport), packet.highest_layer, int(packet.length), url, status_code)
+        except (AttributeError, KeyError, ValueError):
             continue
+        if len(events) >= batch_size:
+            paired.append(pairer.feed(events.to_frame()))
+            events.clear()
 
     capture.close()
-    
-    df = pd.DataFrame(records)
-    print(f"[+] Done. Extracted {len(df)} complete HTTP transactions.")
-    return df
-def save_df_to_bucket(df: pd.DataFrame):
+    if len(events):
+        paired.append(pairer.feed(events.to_frame()))
+    paired.append(pairer.flush())
+    record_pairing(pairer.stats, metrics)
+    # The pairer concatenates pending and new rows, which can leave categories mixed.
+    return as_transactions(concat_transactions([frame for frame in paired if len(frame)] or [TransactionBuffer(0).to_frame()]))
+
+def save_df_to_bucket(df: pd.DataFrame, source_file: str = None):
+    """
+    Appends the transactions to the columnar store in Bucket/store, partitioned
+    by capture date and source file. Without pyarrow, falls back to writing
+    Bucket/parsed_data.csv.
+    """
+    if pyarrow_available():
+        save_transactions(df, source_file)
+        return
     output_filename = "parsed_data.csv" 
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -73,4 +138,4 @@ if __name__ == "__main__":
     pcap_file = get_pcap_path()
     http_transactions_df = parse_pcap_to_df(pcap_file)
 
-    save_df_to_bucket(http_transactions_df)
\ No newline at end of file
+    save_df_to_bucket(http_transactions_df, pcap_file)
\ No newline at end of file
@@ -0,0 +1,361 @@
+import mmap
+import os
+import socket
+import struct
+from collections import namedtuple
+
+# --- Capture File Constants ---
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_TCP = 6
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+
+HTTP_METHODS = (b"GET", b"POST", b"PUT", b"DELETE", b"HEAD", b"OPTIONS", b"PATCH", b"CONNECT", b"TRACE")
+
+# Mirrors the top layer tshark reports for a request body of the given media type.
+BODY_PROTOCOLS = {
+    "application/x-www-form-urlencoded": "URLENCODED-FORM",
+    "multipart/form-data": "MIME_MULTIPART",
+    "application/json": "JSON",
+    "application/xml": "XML",
+    "text/xml": "XML",
+}
+
+TcpPacket = namedtuple("TcpPacket", ["timestamp_ns", "length", "src_ip", "src_port", "dst_ip", "dst_port", "seq", "flags", "payload"])
+
+_U16 = struct.Struct("!H")
+_IPV4_ADDRS = struct.Struct("!4s4s")
+_TCP_HEADER = struct.Struct("!HHIIBB")
+
+
+class PcapReader:
+    """
+    Memory-maps a pcap or pcapng file and walks its record headers directly,
+    so packets are decoded without starting a tshark subprocess.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < 4:
+            self._file.close()
+            raise ValueError(f"{file_path} is too small to be a capture file.")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = size
+
+        magic = self._buf[:4]
+        if struct.unpack("<I", magic)[0] == PCAPNG_SHB:
+            self.format = "pcapng"
+            self.data_offset = 0
+            self.endian = "<"
+            self.interfaces = []
+        else:
+            self.format = "pcap"
+            try:
+                self._read_pcap_header()
+            except ValueError:
+                self.close()
+                raise
+        # Offset just past the last record walked; always a record boundary.
+        self.position = self.data_offset
+
+    def _read_pcap_header(self):
+        if self.size < 24:
+            raise ValueError(f"{self.file_path} has a truncated pcap header.")
+        for endian in ("<", ">"):
+            magic = struct.unpack_from(endian + "I", self._buf, 0)[0]
+            if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+                self.endian = endian
+                self.ts_multiplier = 1000 if magic == PCAP_MAGIC_USEC else 1
+                self.linktype = struct.unpack_from(endian + "I", self._buf, 20)[0] & 0x0FFFFFFF
+                self.data_offset = 24
+                return
+        raise ValueError(f"{self.file_path} is not a pcap or pcapng file.")
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Resuming ---
+    def checkpoint(self) -> dict:
+        """Returns what a later reader of the same (possibly grown) file needs to resume at `position`."""
+        return {'format': self.format, 'position': self.position, 'endian': self.endian, 'interfaces': list(getattr(self, 'interfaces', []))}
+
+    def restore(self, checkpoint: dict):
+        """Continues from a checkpoint() taken on an earlier reader of this file."""
+        if checkpoint['format'] != self.format:
+            raise ValueError(f"{self.file_path} is no longer a {checkpoint['format']} file.")
+        self.data_offset = self.position = checkpoint['position']
+        self.endian = checkpoint['endian']
+        if self.format == "pcapng":
+            self.interfaces = list(checkpoint['interfaces'])
+
+    # --- Record Walking ---
+    def iter_records(self):
+        """Yields (timestamp_ns, orig_len, linktype, data_start, data_end) for every packet record."""
+        if self.format == "pcap":
+            return self._iter_pcap_records()
+        return self._iter_pcapng_records()
+
+    def _iter_pcap_records(self):
+        buf, size = self._buf, self.size
+        header = struct.Struct(self.endian + "IIII")
+        ts_multiplier, linktype = self.ts_multiplier, self.linktype
+        offset = self.data_offset
+        while offset + 16 <= size:
+            ts_sec, ts_frac, incl_len, orig_len = header.unpack_from(buf, offset)
+            start = offset + 16
+            end = start + incl_len
+            if end > size:
+                break  # Truncated final record, e.g. a capture still being written.
+            self.position = end
+            yield ts_sec * 1_000_000_000 + ts_frac * ts_multiplier, orig_len, linktype, start, end
+            offset = end
+
+    def _iter_pcapng_records(self):
+        buf, size = self._buf, self.size
+        offset = self.data_offset
+        while offset + 12 <= size:
+            block_type = struct.unpack_from(self.endian + "I", buf, offset)[0]
+            if block_type == PCAPNG_SHB:
+                self._read_section_header(offset)
+            block_len = struct.unpack_from(self.endian + "I", buf, offset + 4)[0]
+            if block_len < 12 or offset + block_len > size:
+                break
+            body = offset + 8
+            self.position = offset + block_len
+
+            if block_type == 1:  # Interface Description Block
+                self._read_interface(body, offset + block_len - 4)
+            elif block_type == 6:  # Enhanced Packet Block
+                iface, ts_high, ts_low, caplen, orig_len = struct.unpack_from(self.endian + "IIIII", buf, body)
+                record = self._pcapng_record(iface, ts_high, ts_low, orig_len, body + 20, caplen)
+                if record:
+                    yield record
+            elif block_type == 3:  # Simple Packet Block
+                orig_len = struct.unpack_from(self.endian + "I", buf, body)[0]
+                caplen = min(orig_len, block_len - 16)
+                if self.interfaces:
+                    yield 0, orig_len, self.interfaces[0][0], body + 4, body + 4 + caplen
+            elif block_type == 2:  # Obsolete Packet Block
+                iface, _, ts_high, ts_low, caplen, orig_len = struct.unpack_from(self.endian + "HHIIII", buf, body)
+                record = self._pcapng_record(iface, ts_high, ts_low, orig_len, body + 20, caplen)
+                if record:
+                    yield record
+            offset += block_len
+
+    def _read_section_header(self, offset):
+        byte_order = self._buf[offset + 8:offset + 12]
+        if struct.unpack("<I", byte_order)[0] == PCAPNG_BYTE_ORDER_MAGIC:
+            self.endian = "<"
+        elif struct.unpack(">I", byte_order)[0] == PCAPNG_BYTE_ORDER_MAGIC:
+            self.endian = ">"
+        else:
+            raise ValueError(f"{self.file_path} has a corrupt pcapng section header.")
+        self.interfaces = []
+
+    def _read_interface(self, body, body_end):
+        linktype = struct.unpack_from(self.endian + "H", self._buf, body)[0]
+        ts_resolution = 6
+        option = body + 8
+        while option + 4 <= body_end:
+            code, length = struct.unpack_from(self.endian + "HH", self._buf, option)
+            if code == 0:
+                break
+            if code == 9 and length >= 1:
+                ts_resolution = self._buf[option + 4]
+            option += 4 + (length + 3) // 4 * 4
+        self.interfaces.append((linktype, ts_resolution))
+
+    def _pcapng_record(self, iface, ts_high, ts_low, orig_len, start, caplen):
+        if iface >= len(self.interfaces):
+            return None
+        linktype, ts_resolution = self.interfaces[iface]
+        return _pcapng_timestamp_ns((ts_high << 32) | ts_low, ts_resolution), orig_len, linktype, start, start + caplen
+
+    # --- Packet Decoding ---
+    def iter_tcp_packets(self):
+        """Yields a TcpPacket for every IPv4/IPv6 TCP segment in the capture."""
+        buf = self._buf
+        for timestamp_ns, orig_len, linktype, start, end in self.iter_records():
+            packet = decode_tcp(buf, start, end, linktype)
+            if packet is not None:
+                src_ip, src_port, dst_ip, dst_port, seq, flags, payload = packet
+                yield TcpPacket(timestamp_ns, orig_len, src_ip, src_port, dst_ip, dst_port, seq, flags, payload)
+
+    def decode_records(self, records):
+        """
+        Yields a TcpPacket, or None if it is not TCP, for each given
+        (timestamp_ns, orig_len, linktype, data_start, data_end) record, e.g.
+        a slice of an index taken earlier with iter_records().
+        """
+        buf = self._buf
+        for timestamp_ns, orig_len, linktype, start, end in records:
+            packet = decode_tcp(buf, start, end, linktype)
+            yield None if packet is None else TcpPacket(timestamp_ns, orig_len, *packet)
+
+
+def _pcapng_timestamp_ns(value, ts_resolution):
+    exponent = ts_resolution & 0x7F
+    if ts_resolution & 0x80:
+        return (value * 1_000_000_000) >> exponent
+    if exponent <= 9:
+        return value * 10 ** (9 - exponent)
+    return value // 10 ** (exponent - 9)
+
+
+def decode_tcp(buf, start, end, linktype):
+    """
+    Decodes the link, network and transport headers of one packet.
+    Returns (src_ip, src_port, dst_ip, dst_port, seq, flags, payload) or None.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if end - start < 14:
+            return None
+        ethertype = _U16.unpack_from(buf, start + 12)[0]
+        offset = start + 14
+        while ethertype in ETHERTYPE_VLAN and offset + 4 <= end:
+            ethertype = _U16.unpack_from(buf, offset + 2)[0]
+            offset += 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if start >= end:
+            return None
+        version = buf[start] >> 4
+        ethertype = ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6 if version == 6 else None
+        offset = start
+    elif linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if end - start < 5:
+            return None
+        version = buf[start + 4] >> 4
+        ethertype = ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6 if version == 6 else None
+        offset = start + 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if end - start < 16:
+            return None
+        ethertype = _U16.unpack_from(buf, start + 14)[0]
+        offset = start + 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        if end - start < 20:
+            return None
+        ethertype = _U16.unpack_from(buf, start)[0]
+        offset = start + 20
+    else:
+        raise ValueError(f"Unsupported link-layer type {linktype}.")
+
+    if ethertype == ETHERTYPE_IPV4:
+        if offset + 20 > end:
+            return None
+        header_len = (buf[offset] & 0x0F) * 4
+        total_len = _U16.unpack_from(buf, offset + 2)[0]
+        fragment = _U16.unpack_from(buf, offset + 6)[0]
+        if buf[offset + 9] != IPPROTO_TCP or fragment & 0x3FFF:
+            return None
+        src, dst = _IPV4_ADDRS.unpack_from(buf, offset + 12)
+        src_ip = socket.inet_ntop(socket.AF_INET, src)
+        dst_ip = socket.inet_ntop(socket.AF_INET, dst)
+        if total_len:
+            end = min(end, offset + total_len)  # Drop Ethernet padding.
+        offset += header_len
+    elif ethertype == ETHERTYPE_IPV6:
+        if offset + 40 > end:
+            return None
+        payload_len = _U16.unpack_from(buf, offset + 4)[0]
+        next_header = buf[offset + 6]
+        src_ip = socket.inet_ntop(socket.AF_INET6, buf[offset + 8:offset + 24])
+        dst_ip = socket.inet_ntop(socket.AF_INET6, buf[offset + 24:offset + 40])
+        if payload_len:
+            end = min(end, offset + 40 + payload_len)
+        offset += 40
+        while next_header in IPV6_EXTENSION_HEADERS and offset + 8 <= end:
+            next_header, ext_len = buf[offset], buf[offset + 1]
+            offset += (ext_len + 1) * 8
+        if next_header != IPPROTO_TCP:
+            return None
+    else:
+        return None
+
+    if offset + 20 > end:
+        return None
+    src_port, dst_port, seq, _, data_offset, flags = _TCP_HEADER.unpack_from(buf, offset)
+    payload_start = offset + (data_offset >> 4) * 4
+    payload = buf[payload_start:end] if payload_start < end else b""
+    return src_ip, src_port, dst_ip, dst_port, seq, flags, payload
+
+
+# --- HTTP Start-Line Decoding ---
+def parse_http_request(payload: bytes, headers: dict = None):
+    """Returns (url, highest_protocol) if the payload starts an HTTP request, else None."""
+    method_end = payload.find(b" ", 0, 8)
+    if method_end <= 0 or payload[:method_end] not in HTTP_METHODS:
+        return None
+    line_end = payload.find(b"\r\n")
+    if line_end < 0:
+        line_end = len(payload)
+    parts = payload[:line_end].split(b" ")
+    if len(parts) != 3 or not parts[2].startswith(b"HTTP/"):
+        return None
+    target = parts[1].decode("latin-1")
+
+    if headers is None:
+        headers = parse_http_headers(payload, line_end + 2)
+    if target.startswith("/"):
+        host = headers.get("host")
+        url = f"http://{host}{target}" if host else target
+    else:
+        url = target
+
+    protocol = "HTTP"
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in BODY_PROTOCOLS and headers.get("content-length", "0").strip() not in ("", "0"):
+        protocol = BODY_PROTOCOLS[content_type]
+    return url, protocol
+
+
+def parse_http_status(payload: bytes):
+    """Returns the status code string if the payload starts an HTTP response, else None."""
+    if not payload.startswith(b"HTTP/1."):
+        return None
+    code = payload[9:12]
+    if len(code) == 3 and code.isdigit():
+        return code.decode("ascii")
+    return None
+
+
+def parse_http_headers(payload: bytes, start: int) -> dict:
+    """Parses the header block that starts at `start` into a lower-cased name -> value dict."""
+    headers_end = payload.find(b"\r\n\r\n", start)
+    if headers_end < 0:
+        headers_end = len(payload)
+    headers = {}
+    for line in payload[start:headers_end].split(b"\r\n"):
+        name, sep, value = line.partition(b":")
+        if sep:
+            headers[name.strip().lower().decode("latin-1")] = value.strip().decode("latin-1")
+    return headers
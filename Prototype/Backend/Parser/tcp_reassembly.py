@@ -0,0 +1,369 @@
+from collections import OrderedDict, deque
+
+from .pcap_reader import TCP_FIN, TCP_RST, TCP_SYN, HTTP_METHODS, parse_http_headers, parse_http_request, parse_http_status
+
+# --- Memory Budget ---
+MAX_FLOWS = 65536
+MAX_HEADER_BYTES = 64 * 1024
+MAX_OUT_OF_ORDER_BYTES = 256 * 1024
+MAX_PENDING_PER_FLOW = 1024
+FLOW_IDLE_TTL_NS = 300 * 1_000_000_000  # capture time after which a silent connection is given up
+
+SEQ_MOD = 1 << 32
+SEQ_HALF = 1 << 31
+BODY_UNTIL_CLOSE = -1
+
+
+class _HalfStream:
+    """Reassembly and HTTP framing state for one direction of a TCP connection."""
+    __slots__ = ("next_seq", "buffer", "out_of_order", "out_of_order_bytes", "body_remaining", "chunk_state", "current_request", "resync", "closed")
+
+    def __init__(self):
+        self.next_seq = None
+        self.buffer = bytearray()
+        self.out_of_order = {}
+        self.out_of_order_bytes = 0
+        self.body_remaining = 0
+        self.chunk_state = None
+        self.current_request = None
+        self.resync = False
+        self.closed = False
+
+    def release(self):
+        self.buffer = bytearray()
+        self.out_of_order = {}
+        self.out_of_order_bytes = 0
+        self.current_request = None
+
+
+class _Flow:
+    """Both directions of a connection plus the requests still waiting for a response, oldest first."""
+    __slots__ = ("streams", "pending", "last_seen")
+
+    def __init__(self, last_seen: int):
+        self.streams = {}
+        self.pending = deque()
+        self.last_seen = last_seen
+
+
+class FlowTable:
+    """
+    Reassembles TCP payloads in sequence order and frames HTTP/1.x messages,
+    so requests split across segments are parsed once and pipelined requests
+    on a keep-alive connection are answered in order.
+
+    Memory stays bounded on long captures: connections idle for `idle_ttl_ns`
+    of capture time are expired, the least recently active one is evicted
+    beyond `max_flows`, and a connection keeps at most `max_pending_per_flow`
+    unanswered requests. Requests given up on this way, or still unanswered
+    when their connection closes, are dropped, or with `emit_unpaired=True`
+    returned as transactions without a status_code. `stats` keeps the counts.
+    """
+
+    def __init__(self, max_flows: int = MAX_FLOWS, max_header_bytes: int = MAX_HEADER_BYTES, max_out_of_order_bytes: int = MAX_OUT_OF_ORDER_BYTES,
+                 max_pending_per_flow: int = MAX_PENDING_PER_FLOW, idle_ttl_ns: int = FLOW_IDLE_TTL_NS, emit_unpaired: bool = False):
+        self.max_flows = max_flows
+        self.max_header_bytes = max_header_bytes
+        self.max_out_of_order_bytes = max_out_of_order_bytes
+        self.max_pending_per_flow = max_pending_per_flow
+        self.idle_ttl_ns = idle_ttl_ns
+        self.emit_unpaired = emit_unpaired
+        self._flows = OrderedDict()
+        self._unpaired = []
+        self.clock = 0
+        self.stats = {'expired_flows': 0, 'evicted_flows': 0, 'expired_requests': 0, 'evicted_requests': 0,
+                      'unanswered_requests': 0, 'unpaired_emitted': 0, 'peak_flows': 0}
+
+    def __len__(self):
+        return len(self._flows)
+
+    def feed(self, packet, clock_ns: int = None) -> list:
+        """
+        Processes one TcpPacket and returns the transactions it completed, as
+        tuples in TransactionBuffer.append() order (status_code None if unpaired).
+        A table that only sees some of a capture's connections can pass the
+        capture's clock at this packet as `clock_ns`, so idle connections
+        expire as they would with every packet fed.
+        """
+        completed = self._process(packet, packet.timestamp_ns if clock_ns is None else clock_ns)
+        if self._unpaired:
+            completed, self._unpaired = self._unpaired + completed, []
+        return completed
+
+    def advance_clock(self, clock_ns: int) -> list:
+        """Moves capture time forward without a packet; returns what the connections that expired gave up, like feed()."""
+        if clock_ns > self.clock:
+            self.clock = clock_ns
+            self._expire_idle()
+        completed, self._unpaired = self._unpaired, []
+        return completed
+
+    def _process(self, packet, clock_ns) -> list:
+        forward = (packet.src_ip, packet.src_port, packet.dst_ip, packet.dst_port)
+        reverse = (packet.dst_ip, packet.dst_port, packet.src_ip, packet.src_port)
+        flow_key = forward if forward < reverse else reverse
+
+        completed = []
+        if clock_ns > self.clock:
+            self.clock = clock_ns
+            self._expire_idle()
+
+        flow = self._flows.get(flow_key)
+        if flow is None:
+            if packet.flags & TCP_RST or not (packet.payload or packet.flags & TCP_SYN):
+                return completed
+            flow = self._open_flow(flow_key, packet.timestamp_ns)
+        else:
+            self._flows.move_to_end(flow_key)
+            flow.last_seen = max(flow.last_seen, packet.timestamp_ns)
+
+        if packet.flags & TCP_RST:
+            self._close_flow(flow_key)
+            return completed
+
+        stream = flow.streams.get(forward)
+        if stream is None:
+            stream = flow.streams[forward] = _HalfStream()
+        if stream.closed:
+            return completed
+        if packet.flags & TCP_SYN:
+            stream.next_seq = (packet.seq + 1) % SEQ_MOD
+            return completed
+
+        if packet.payload:
+            self._receive(flow, stream, packet, completed)
+
+        if packet.flags & TCP_FIN:
+            stream.closed = True
+            stream.release()
+            if len(flow.streams) == 2 and all(s.closed for s in flow.streams.values()):
+                self._close_flow(flow_key)
+        return completed
+
+    def flush(self) -> list:
+        """Ends the capture: closes every connection and returns its unanswered requests if `emit_unpaired`."""
+        for flow_key in list(self._flows):
+            self._close_flow(flow_key)
+        completed, self._unpaired = self._unpaired, []
+        return completed
+
+    def _open_flow(self, flow_key, timestamp_ns):
+        if len(self._flows) >= self.max_flows:
+            _, evicted = self._flows.popitem(last=False)
+            self.stats['evicted_flows'] += 1
+            self._give_up(evicted.pending, 'evicted_requests')
+            for stream in evicted.streams.values():
+                stream.release()
+        flow = self._flows[flow_key] = _Flow(timestamp_ns)
+        self.stats['peak_flows'] = max(self.stats['peak_flows'], len(self._flows))
+        return flow
+
+    def _close_flow(self, flow_key):
+        flow = self._flows.pop(flow_key, None)
+        if flow is not None:
+            self._give_up(flow.pending, 'unanswered_requests')
+            for stream in flow.streams.values():
+                stream.release()
+
+    def _expire_idle(self):
+        # Flows are kept in order of last activity, so the idle ones are at the front.
+        while self._flows:
+            flow_key, flow = next(iter(self._flows.items()))
+            if flow.last_seen >= self.clock - self.idle_ttl_ns:
+                break
+            self._flows.popitem(last=False)
+            self.stats['expired_flows'] += 1
+            self._give_up(flow.pending, 'expired_requests')
+            for stream in flow.streams.values():
+                stream.release()
+
+    def _give_up(self, pending, counter):
+        """Counts requests that will not get a response; with emit_unpaired they are returned by the next feed()."""
+        if not pending:
+            return
+        self.stats[counter] += len(pending)
+        if self.emit_unpaired:
+            self._unpaired.extend(request + (None,) for _, request in pending)
+            self.stats['unpaired_emitted'] += len(pending)
+        pending.clear()
+
+    # --- Sequence Ordering ---
+    def _receive(self, flow, stream, packet, completed):
+        seq, data = packet.seq, packet.payload
+        if stream.next_seq is None:
+            stream.next_seq = seq
+
+        delta = (seq - stream.next_seq) % SEQ_MOD
+        if delta >= SEQ_HALF:
+            overlap = SEQ_MOD - delta
+            if overlap >= len(data):
+                return  # Pure retransmission.
+            data = data[overlap:]
+            delta = 0
+
+        if delta:
+            if stream.out_of_order_bytes + len(data) <= self.max_out_of_order_bytes:
+                if seq not in stream.out_of_order:
+                    stream.out_of_order[seq] = data
+                    stream.out_of_order_bytes += len(data)
+                return
+            # The gap is not going to be filled within budget: skip past it.
+            self._skip_gap(stream, seq, data)
+            data = stream.out_of_order.pop(stream.next_seq)
+            stream.out_of_order_bytes -= len(data)
+
+        self._advance(flow, stream, data, packet, completed)
+        while stream.out_of_order:
+            ready = [s for s in stream.out_of_order if (s - stream.next_seq) % SEQ_MOD == 0 or (s - stream.next_seq) % SEQ_MOD >= SEQ_HALF]
+            if not ready:
+                break
+            for segment_seq in ready:
+                data = stream.out_of_order.pop(segment_seq)
+                stream.out_of_order_bytes -= len(data)
+                overlap = (stream.next_seq - segment_seq) % SEQ_MOD
+                if overlap < len(data):
+                    self._advance(flow, stream, data[overlap:], packet, completed)
+
+    def _advance(self, flow, stream, data, packet, completed):
+        stream.next_seq = (stream.next_seq + len(data)) % SEQ_MOD
+        self._consume(flow, stream, data, packet, completed)
+
+    def _skip_gap(self, stream, seq, data):
+        stream.out_of_order[seq] = data
+        stream.out_of_order_bytes += len(data)
+        stream.next_seq = min(stream.out_of_order, key=lambda s: (s - stream.next_seq) % SEQ_MOD)
+        self._reset_framing(stream)
+
+    def _reset_framing(self, stream):
+        stream.buffer = bytearray()
+        stream.body_remaining = 0
+        stream.chunk_state = None
+        stream.current_request = None
+        stream.resync = True
+
+    # --- HTTP Framing ---
+    def _consume(self, flow, stream, data, packet, completed):
+        if stream.resync:
+            if not (data.startswith(b"HTTP/1.") or data.split(b" ", 1)[0] in HTTP_METHODS):
+                return
+            stream.resync = False
+
+        if not stream.buffer and stream.body_remaining >= len(data) and not stream.chunk_state:
+            stream.body_remaining -= len(data)
+            if stream.body_remaining == 0:
+                self._finish_message(flow, stream, packet)
+            return
+        if stream.body_remaining == BODY_UNTIL_CLOSE:
+            return
+
+        buffer = stream.buffer
+        buffer += data
+        while buffer:
+            if stream.body_remaining == BODY_UNTIL_CLOSE:
+                buffer.clear()
+                break
+            if stream.body_remaining:
+                skipped = min(len(buffer), stream.body_remaining)
+                del buffer[:skipped]
+                stream.body_remaining -= skipped
+                if stream.body_remaining:
+                    break
+                if not stream.chunk_state:
+                    self._finish_message(flow, stream, packet)
+                continue
+
+            if stream.chunk_state:
+                if not self._consume_chunk_line(flow, stream, packet):
+                    break
+                continue
+
+            head_end = buffer.find(b"\r\n\r\n")
+            if head_end < 0:
+                if len(buffer) > self.max_header_bytes:
+                    self._reset_framing(stream)
+                break
+            head = bytes(buffer[:head_end + 4])
+            del buffer[:head_end + 4]
+            if not self._start_message(flow, stream, head, packet, completed):
+                self._reset_framing(stream)
+                break
+
+    def _consume_chunk_line(self, flow, stream, packet) -> bool:
+        buffer = stream.buffer
+        line_end = buffer.find(b"\r\n")
+        if line_end < 0:
+            if len(buffer) > self.max_header_bytes:
+                self._reset_framing(stream)
+            return False
+        line = bytes(buffer[:line_end])
+        del buffer[:line_end + 2]
+
+        if stream.chunk_state == "trailer":
+            if not line:
+                stream.chunk_state = None
+                self._finish_message(flow, stream, packet)
+            return True
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            self._reset_framing(stream)
+            return False
+        if size == 0:
+            stream.chunk_state = "trailer"
+        else:
+            stream.body_remaining = size + 2  # Chunk data plus its CRLF.
+        return True
+
+    def _start_message(self, flow, stream, head, packet, completed) -> bool:
+        line_end = head.find(b"\r\n")
+        headers = parse_http_headers(head, line_end + 2)
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        try:
+            content_length = int(headers.get("content-length", "0"))
+        except ValueError:
+            content_length = 0
+
+        request = parse_http_request(head, headers)
+        if request is not None:
+            url, protocol = request
+            method = head[:head.find(b" ")]
+            stream.current_request = (method, url, protocol)
+            self._set_body(stream, chunked, content_length)
+            if not stream.body_remaining and not stream.chunk_state:
+                self._finish_message(flow, stream, packet)
+            return True
+
+        status_code = parse_http_status(head)
+        if status_code is None:
+            return False
+        if status_code.startswith("1"):
+            return True  # Interim response; the final one follows on the same stream.
+
+        method = None
+        if flow.pending:
+            method, request = flow.pending.popleft()
+            completed.append(request + (status_code,))
+
+        if method == b"HEAD" or status_code in ("204", "304"):
+            return True
+        if chunked or "content-length" in headers:
+            self._set_body(stream, chunked, content_length)
+        else:
+            stream.body_remaining = BODY_UNTIL_CLOSE
+        return True
+
+    def _set_body(self, stream, chunked, content_length):
+        if chunked:
+            stream.chunk_state = "size"
+        else:
+            stream.body_remaining = max(content_length, 0)
+
+    def _finish_message(self, flow, stream, packet):
+        if stream.current_request is None:
+            return
+        method, url, protocol = stream.current_request
+        stream.current_request = None
+        if len(flow.pending) >= self.max_pending_per_flow:
+            # A client that keeps sending without answers; only the newest requests can still be paired.
+            self._give_up(deque([flow.pending.popleft()]), 'evicted_requests')
+        flow.pending.append((method, (packet.timestamp_ns, packet.src_ip, packet.src_port, packet.dst_ip, packet.dst_port, protocol, packet.length, url)))
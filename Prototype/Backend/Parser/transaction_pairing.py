@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from ..Storage.result_store import epoch_timestamps
+
+STREAM_KEY = ['src_ip', 'src_port', 'dst_ip', 'dst_port']
+REVERSED_STREAM_KEY = ['dst_ip', 'dst_port', 'src_ip', 'src_port']
+
+def pair_transactions(df: pd.DataFrame, return_pending: bool = False):
+    """
+    Pairs request rows with their response rows column-wise.
+
+    A request is a row with a `url` and no `status_code`; a response is the
+    opposite. Responses are joined to requests on the reversed 4-tuple, and
+    within a stream the n-th answered response is matched to the n-th request
+    (FIFO), so pipelined requests are not overwritten. Responses that arrive
+    with no request pending are dropped. Rows that already carry both a `url`
+    and a `status_code` are complete transactions and pass through unchanged.
+    The result keeps the request's columns, in the order responses arrived.
+
+    With `return_pending=True` a (paired, pending) tuple is returned, where
+    `pending` holds the requests still waiting for a response. Prepending them
+    to the rows that follow gives the same pairs as pairing everything at once.
+    """
+    paired, unanswered = _pair(df)
+    if return_pending:
+        return paired, df.iloc[unanswered].reset_index(drop=True)
+    return paired
+
+def _pair(df: pd.DataFrame):
+    """pair_transactions, returning the positions of the unanswered requests in row order."""
+    missing = [col for col in STREAM_KEY + ['url', 'status_code'] if col not in df.columns]
+    if missing:
+        print(f"[!] Warning: Cannot pair transactions, missing columns: {missing}")
+        return pd.DataFrame(), np.empty(0, dtype=np.int64)
+
+    has_url = df['url'].notna().to_numpy()
+    has_status = df['status_code'].notna().to_numpy()
+    request_pos = np.flatnonzero(has_url & ~has_status)
+    response_pos = np.flatnonzero(has_status & ~has_url)
+    complete_pos = np.flatnonzero(has_url & has_status)
+
+    # Label every request and response with the id of the stream it belongs to,
+    # using the client -> server direction for both.
+    directed_keys = pd.concat([
+        df[STREAM_KEY].iloc[request_pos],
+        df[REVERSED_STREAM_KEY].iloc[response_pos].set_axis(STREAM_KEY, axis=1),
+    ], ignore_index=True)
+    stream_ids = directed_keys.groupby(STREAM_KEY, sort=False, dropna=True).ngroup().to_numpy()
+
+    events = pd.DataFrame({
+        'stream': stream_ids,
+        'pos': np.concatenate([request_pos, response_pos]),
+        'is_request': np.concatenate([np.ones(len(request_pos), dtype=np.int64), np.zeros(len(response_pos), dtype=np.int64)]),
+    })
+    events = events[events['stream'] >= 0].sort_values(['stream', 'pos'], kind='stable')
+    events['is_response'] = 1 - events['is_request']
+
+    by_stream = events.groupby('stream', sort=False)
+    requests_seen = by_stream['is_request'].cumsum()
+    responses_seen = by_stream['is_response'].cumsum()
+    # A response finds nothing pending whenever responses overtake requests; the
+    # running maximum of that deficit counts how many responses were dropped.
+    events['dropped'] = (responses_seen - requests_seen).clip(lower=0).groupby(events['stream'], sort=False).cummax()
+    events['rank'] = np.where(events['is_request'] == 1, requests_seen, responses_seen - events['dropped'])
+
+    is_response = events['is_response'] == 1
+    previous_dropped = events.groupby('stream', sort=False)['dropped'].shift(fill_value=0)
+    answered = events[is_response & (events['dropped'] == previous_dropped)]
+    request_events = events[~is_response]
+
+    pairs = answered[['stream', 'rank', 'pos']].merge(
+        request_events[['stream', 'rank', 'pos']], on=['stream', 'rank'], suffixes=('_response', '_request')
+    )
+
+    paired = df.iloc[pairs['pos_request'].to_numpy()].copy()
+    paired['status_code'] = df['status_code'].iloc[pairs['pos_response'].to_numpy()].to_numpy()
+    emit_order = pairs['pos_response'].to_numpy()
+
+    if len(complete_pos):
+        paired = pd.concat([paired, df.iloc[complete_pos]])
+        emit_order = np.concatenate([emit_order, complete_pos])
+
+    paired = paired.iloc[np.argsort(emit_order, kind='stable')].reset_index(drop=True)
+    return paired, np.setdiff1d(request_events['pos'].to_numpy(), pairs['pos_request'].to_numpy())
+
+
+# --- Bounded Streaming Pairing ---
+DEFAULT_PENDING_TTL = 300.0  # seconds of capture time a request may wait for its response
+DEFAULT_MAX_PENDING = 100_000
+
+
+class StreamingPairer:
+    """
+    Pairs a stream of row batches with pair_transactions while keeping the
+    requests that are still unanswered in bounded memory.
+
+    Unanswered requests are carried into the next batch, like
+    pair_transactions(return_pending=True). A pending request expires once the
+    capture clock (the newest timestamp seen so far) is more than `ttl`
+    seconds past its own timestamp, and the oldest ones are evicted whenever
+    more than `max_pending` are waiting; requests without a readable timestamp
+    only leave by eviction. Expired and evicted requests are dropped, or with
+    `emit_unpaired=True` returned as transactions without a status_code so
+    they still reach detection. `stats` keeps the counts.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_PENDING_TTL, max_pending: int = DEFAULT_MAX_PENDING, emit_unpaired: bool = False):
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.emit_unpaired = emit_unpaired
+        self.clock = None
+        self._pending = None
+        self._pending_seconds = np.empty(0)
+        self.stats = {'rows_in': 0, 'transactions': 0, 'expired_requests': 0, 'evicted_requests': 0, 'unanswered_requests': 0,
+                      'unpaired_emitted': 0, 'pending': 0, 'peak_pending': 0}
+
+    def __len__(self):
+        return 0 if self._pending is None else len(self._pending)
+
+    def feed(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Pairs one batch against the pending requests and returns the transactions it completed."""
+        if rows.empty:
+            return rows
+        self.stats['rows_in'] += len(rows)
+        seconds = _row_seconds(rows)
+        if np.isfinite(seconds).any():
+            newest = float(np.nanmax(seconds))
+            self.clock = newest if self.clock is None else max(self.clock, newest)
+
+        if len(self):
+            rows = pd.concat([self._pending, rows], ignore_index=True)
+            seconds = np.concatenate([self._pending_seconds, seconds])
+        paired, unanswered = _pair(rows)
+        # Unanswered positions come sorted, so the oldest requests are first.
+        pending = rows.iloc[unanswered].reset_index(drop=True)
+        pending_seconds = seconds[unanswered]
+
+        keep = np.ones(len(pending), dtype=bool)
+        if self.ttl is not None and self.clock is not None:
+            with np.errstate(invalid='ignore'):
+                expired = pending_seconds < self.clock - self.ttl
+            keep &= ~expired
+            self.stats['expired_requests'] += int(expired.sum())
+        if self.max_pending is not None and keep.sum() > self.max_pending:
+            overflow = np.flatnonzero(keep)[:int(keep.sum()) - self.max_pending]
+            keep[overflow] = False
+            self.stats['evicted_requests'] += len(overflow)
+
+        self._pending = pending[keep].reset_index(drop=True)
+        self._pending_seconds = pending_seconds[keep]
+        self.stats['pending'] = len(self._pending)
+        self.stats['peak_pending'] = max(self.stats['peak_pending'], len(self._pending))
+        self.stats['transactions'] += len(paired)
+        if self.emit_unpaired and not keep.all():
+            return self._with_unpaired(paired, pending[~keep])
+        return paired
+
+    def flush(self) -> pd.DataFrame:
+        """Ends the stream: the requests still pending are counted as unanswered and returned if `emit_unpaired`."""
+        pending = self._pending if self._pending is not None else pd.DataFrame()
+        self.stats['unanswered_requests'] += len(pending)
+        self._pending, self._pending_seconds = None, np.empty(0)
+        self.stats['pending'] = 0
+        if self.emit_unpaired and len(pending):
+            return self._with_unpaired(pd.DataFrame(columns=pending.columns), pending)
+        return pd.DataFrame()
+
+    def _with_unpaired(self, paired: pd.DataFrame, unpaired: pd.DataFrame) -> pd.DataFrame:
+        self.stats['unpaired_emitted'] += len(unpaired)
+        self.stats['transactions'] += len(unpaired)
+        if paired.empty:
+            return unpaired.reset_index(drop=True)
+        return pd.concat([paired, unpaired], ignore_index=True)
+
+
+def _row_seconds(rows: pd.DataFrame) -> np.ndarray:
+    if 'timestamp' not in rows.columns:
+        return np.full(len(rows), np.nan)
+    return epoch_timestamps(rows['timestamp']).to_numpy()
+
+
+def record_pairing(stats: dict, metrics: dict = None):
+    """Adds a pairer's counts to a phase record and reports any requests given up without a response."""
+    if metrics is not None:
+        metrics.update({f"pairing_{name}": value for name, value in stats.items()})
+    given_up = stats['expired_requests'] + stats['evicted_requests']
+    if given_up:
+        print(f"[!] {given_up} requests were given up without a response ({stats['expired_requests']} expired, "
+              f"{stats['evicted_requests']} evicted); {stats.get('unpaired_emitted', 0)} kept as unpaired.")
@@ -0,0 +1,271 @@
+import socket
+
+import numpy as np
+import pandas as pd
+
+# --- Schema ---
+PORT_COLUMNS = ['src_port', 'dst_port']
+CATEGORY_COLUMNS = ['src_ip', 'dst_ip', 'highest_protocol', 'status_code', 'attack_type']
+LABEL_COLUMNS = ['attack_type', 'matched_rule']
+
+TIMESTAMP_DTYPE = 'datetime64[ns, UTC]'
+PORT_DTYPE = 'UInt16'
+LENGTH_DTYPE = 'UInt32'
+
+NS_PER_SECOND = 1_000_000_000
+NAT = np.iinfo(np.int64).min
+INITIAL_CAPACITY = 4096
+EPOCH_PATTERN = r"\s*(\d+)(?:\.(\d{1,9})\d*)?\s*"
+
+
+# --- Column Buffers ---
+class TransactionBuffer:
+    """
+    Typed columns that parsers append transactions to, preallocated and grown
+    by doubling, so a capture is never held as a list of per-row dicts.
+    Timestamps are int64 nanoseconds, ports uint16 and lengths uint32.
+    Protocols and status codes are interned by value, and addresses by their
+    32/128-bit integer value, so spellings of one address share an entry;
+    a repeated value costs a 4-byte code per row. The frame carries
+    addresses as a categorical of their canonical text, not as integer
+    columns: pairing keys, prefix filters, the aggregator and the dashboard
+    all compare IPs as text, and the codes take no more room per row than a
+    uint32 column (a quarter of a 128-bit one). to_frame() returns the typed
+    DataFrame.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._src_ips = np.empty(capacity, dtype=np.int32)
+        self._src_ports = np.empty(capacity, dtype=np.uint16)
+        self._dst_ips = np.empty(capacity, dtype=np.int32)
+        self._dst_ports = np.empty(capacity, dtype=np.uint16)
+        self._protocols = np.empty(capacity, dtype=np.int32)
+        self._lengths = np.empty(capacity, dtype=np.uint32)
+        self._urls = np.empty(capacity, dtype=object)
+        self._statuses = np.empty(capacity, dtype=np.int32)
+        self._addresses = _Interner(address_key)
+        self._protocol_names = _Interner()
+        self._status_codes = _Interner(status_number)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp_ns, src_ip, src_port, dst_ip, dst_port, protocol, length, url, status_code=None):
+        """Adds one transaction; `timestamp_ns` and `status_code` may be None."""
+        if self._size == len(self._timestamps):
+            self._grow()
+        row = self._size
+        self._timestamps[row] = NAT if timestamp_ns is None else timestamp_ns
+        self._src_ips[row] = self._addresses.code(src_ip)
+        self._src_ports[row] = src_port
+        self._dst_ips[row] = self._addresses.code(dst_ip)
+        self._dst_ports[row] = dst_port
+        self._protocols[row] = self._protocol_names.code(protocol)
+        self._lengths[row] = length
+        self._urls[row] = url
+        self._statuses[row] = self._status_codes.code(status_code)
+        self._size = row + 1
+
+    def extend(self, transactions):
+        """Appends transaction tuples in append()'s argument order, e.g. from FlowTable."""
+        for transaction in transactions:
+            self.append(*transaction)
+
+    def clear(self):
+        """Empties the buffer but keeps its capacity and interned values."""
+        self._size = 0
+
+    def _grow(self):
+        for name in ('_timestamps', '_src_ips', '_src_ports', '_dst_ips', '_dst_ports', '_protocols', '_lengths', '_urls', '_statuses'):
+            column = getattr(self, name)
+            grown = np.empty(max(2 * len(column), INITIAL_CAPACITY), dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The buffered rows as a DataFrame with the transaction schema (the buffer can keep growing)."""
+        n = self._size
+        return pd.DataFrame({
+            'timestamp': pd.Series(self._timestamps[:n].view('datetime64[ns]').copy()).dt.tz_localize('UTC'),
+            'src_ip': self._addresses.categorical(self._src_ips[:n]),
+            'src_port': pd.array(self._src_ports[:n].copy(), dtype=PORT_DTYPE),
+            'dst_ip': self._addresses.categorical(self._dst_ips[:n]),
+            'dst_port': pd.array(self._dst_ports[:n].copy(), dtype=PORT_DTYPE),
+            'highest_protocol': self._protocol_names.categorical(self._protocols[:n]),
+            'length': pd.array(self._lengths[:n].copy(), dtype=LENGTH_DTYPE),
+            'url': pd.Series(self._urls[:n].copy()),
+            'status_code': self._status_codes.categorical(self._statuses[:n]),
+            'attack_type': empty_labels(n),
+        })
+
+
+class _Interner:
+    """Gives every distinct value a small code (-1 for missing), in order of first appearance; values with the same key share one."""
+
+    def __init__(self, key=None):
+        self._key = key
+        self._codes = {}
+        self._by_key = {}
+        self.values = []
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            if value is None or value is pd.NA or value != value:
+                return -1
+            key = self._key(value) if self._key is not None else value
+            code = self._by_key.get(key)
+            if code is None:
+                code = self._by_key[key] = len(self.values)
+                self.values.append(_canonical_value(key, value))
+            self._codes[value] = code
+        return code
+
+    def categorical(self, codes: np.ndarray) -> pd.Categorical:
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.values, dtype=_category_dtype(self.values)))
+
+
+# --- Field Conversions ---
+def address_key(text) -> tuple:
+    """An IP address as (version, 32/128-bit integer value); text that is not an address becomes (0, text)."""
+    text = str(text).strip()
+    for version, family in ((4, socket.AF_INET), (6, socket.AF_INET6)):
+        try:
+            return (version, int.from_bytes(socket.inet_pton(family, text), "big"))
+        except OSError:
+            continue
+    return (0, text)
+
+
+def address_text(key: tuple) -> str:
+    """The canonical text of an address_key() (IPv4 dotted quad, compressed IPv6)."""
+    version, value = key
+    if version == 4:
+        return socket.inet_ntop(socket.AF_INET, value.to_bytes(4, "big"))
+    if version == 6:
+        return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, "big"))
+    return value
+
+
+def status_number(value):
+    """HTTP status code as an int ('200', 200 and 200.0 alike); anything else is kept as text."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return int(number) if number.is_integer() else str(value)
+
+
+def _canonical_value(key, value):
+    if isinstance(key, tuple):
+        return address_text(key)
+    return key
+
+
+def _category_dtype(categories: list):
+    if categories and all(isinstance(value, (int, np.integer)) for value in categories):
+        return np.int64
+    return None if categories else object
+
+
+def empty_labels(n: int) -> pd.Categorical:
+    """An all-missing attack_type column."""
+    return pd.Categorical.from_codes(np.full(n, -1, dtype=np.int8), categories=pd.Index([], dtype=object))
+
+
+def to_nanoseconds(values: pd.Series) -> pd.Series:
+    """
+    Timestamps as datetime64[ns, UTC] (int64 nanoseconds since the epoch):
+    epoch seconds, as numbers or text (exact to the nanosecond), and ISO
+    strings, naive ones taken as UTC. Anything else, like the `ip_port` flow
+    ids some IPDR exports put in this column, becomes NaT.
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values.dt.tz_convert('UTC').astype(TIMESTAMP_DTYPE)
+    if pd.api.types.is_datetime64_dtype(values):
+        return values.dt.tz_localize('UTC').astype(TIMESTAMP_DTYPE)
+
+    nanoseconds = np.full(len(values), NAT, dtype=np.int64)
+    if pd.api.types.is_numeric_dtype(values):
+        seconds = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        known = np.isfinite(seconds)
+        nanoseconds[known] = np.round(seconds[known] * NS_PER_SECOND).astype(np.int64)
+    else:
+        positions = np.flatnonzero(values.notna().to_numpy())
+        text = values.iloc[positions].astype(str)
+        epoch = text.str.fullmatch(EPOCH_PATTERN).to_numpy(dtype=bool)
+        if epoch.any():
+            parts = text[epoch].str.extract(EPOCH_PATTERN)
+            whole = parts[0].astype(np.int64).to_numpy()
+            fraction = parts[1].fillna("").str.ljust(9, "0").astype(np.int64).to_numpy()
+            nanoseconds[positions[epoch]] = whole * NS_PER_SECOND + fraction
+        if not epoch.all():
+            parsed = pd.to_datetime(text[~epoch], utc=True, errors='coerce', format='ISO8601').astype(TIMESTAMP_DTYPE)
+            nanoseconds[positions[~epoch]] = parsed.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return pd.Series(nanoseconds.view('datetime64[ns]'), index=values.index).dt.tz_localize('UTC')
+
+
+def _unsigned(values: pd.Series, dtype: str, limit: int) -> pd.Series:
+    numbers = pd.to_numeric(values, errors='coerce').astype('Float64')
+    valid = ((numbers >= 0) & (numbers <= limit) & (numbers % 1 == 0)).fillna(False)
+    return numbers.where(valid).astype(dtype)
+
+
+def _interned(values: pd.Series, key=None) -> pd.Categorical:
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if key is None:
+        return pd.Categorical.from_codes(codes, categories=uniques)
+    interner = _Interner(key)
+    unique_codes = np.array([interner.code(value) for value in uniques] + [-1], dtype=np.int32)
+    return interner.categorical(unique_codes[codes])
+
+
+# --- Frames ---
+def as_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    `df` with its transaction columns converted to the typed schema, e.g.
+    for CSV exports or pyshark fields that arrive as text. Columns that are
+    absent stay absent, other columns are kept as they are, and values that
+    do not fit a column's type become missing.
+    """
+    frame = df.copy()
+    for column in frame.columns:
+        values = frame[column]
+        if column == 'timestamp':
+            frame[column] = to_nanoseconds(values)
+        elif column in PORT_COLUMNS:
+            frame[column] = values if values.dtype == PORT_DTYPE else _unsigned(values, PORT_DTYPE, 0xFFFF)
+        elif column == 'length':
+            frame[column] = values if values.dtype == LENGTH_DTYPE else _unsigned(values, LENGTH_DTYPE, 0xFFFFFFFF)
+        elif column == 'status_code':
+            frame[column] = _interned(values, status_number)
+        elif column in CATEGORY_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype):
+            frame[column] = _interned(values)
+    return frame
+
+
+def concat_transactions(frames) -> pd.DataFrame:
+    """pd.concat for typed frames that keeps categorical columns categorical when their categories differ."""
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    for column in CATEGORY_COLUMNS + LABEL_COLUMNS:
+        parts = [frame[column] for frame in frames if column in frame.columns]
+        if len(parts) < 2 or len(parts) < len(frames) or not all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            continue
+        known = [part.cat.categories for part in parts if len(part.cat.categories)]
+        if not known:
+            continue
+        categories = known[0].append(known[1:]).unique()
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def compact_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Stores the label columns of a labelled frame as categoricals (there are only a handful of distinct labels)."""
+    for column in LABEL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = _interned(df[column])
+    return df
@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ..Detector.detection_engine import detect_batch
+from ..Detector.model_registry import warm_up
+from ..Detector.rule_engine import load_rule_engine
+from ..Detector.stream_aggregator import StreamAggregator, format_top_attackers
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_ROWS = 2_000
+DEFAULT_MAX_BATCH_DELAY = 0.05  # seconds
+DEFAULT_MAX_QUEUED_ROWS = 20_000
+MAX_LINE_BYTES = 1024 * 1024
+LATENCY_WINDOW = 1_000
+REPORT_INTERVAL = 10.0
+RECENT_WINDOW = 300  # seconds of traffic covered by the per-source report
+# Verdict columns a client may send along (IPDR exports end with an empty attack_type);
+# they are dropped so every record is analysed rather than taken as already labelled.
+VERDICT_COLUMNS = ['attack_type', 'matched_rule']
+SAMPLE_CSV = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Dataset", "IPDR Dataset", "sample1_dataset.csv"))
+
+
+class IngestService:
+    """
+    Accepts transaction records over a socket, one per line, either as JSON
+    objects or as CSV rows after a CSV header line. Each record needs a `url`;
+    an `id` field, if present, is echoed back.
+
+    Records from all connections are gathered into micro-batches that close at
+    `max_batch_rows` records or `max_batch_delay` seconds after their first
+    record, whichever comes first. Each batch runs through the regex and ML
+    phases on a worker thread, and one JSON verdict per record is written back
+    in the order the records were received on that connection.
+
+    Backpressure: at most `max_queued_rows` records wait for a batch and at
+    most `workers` batches run at a time. When either limit is reached the
+    service stops reading from the sockets, so clients block in their sends
+    instead of the service buffering without bound.
+
+    Every labelled batch also feeds `aggregator`, whose per-source statistics
+    (top attackers, distinct sources) are part of the periodic report.
+    """
+
+    def __init__(self, max_batch_rows: int = DEFAULT_MAX_BATCH_ROWS, max_batch_delay: float = DEFAULT_MAX_BATCH_DELAY,
+                 max_queued_rows: int = DEFAULT_MAX_QUEUED_ROWS, workers: int = 1, cache=None, aggregator=None):
+        self.max_batch_rows = max_batch_rows
+        self.max_batch_delay = max_batch_delay
+        self.max_queued_rows = max_queued_rows
+        self.workers = workers
+        self.cache = cache
+        self.aggregator = aggregator if aggregator is not None else StreamAggregator()
+        self.stats = {'connections': 0, 'records': 0, 'rejected': 0, 'batches': 0, 'failed_batches': 0}
+        self._batch_latencies = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._queue = None
+        self._slots = None
+        self._executor = None
+
+    # --- Serving ---
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: str = None):
+        server = await self.start(host, port, unix_path)
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                await self.stop()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: str = None):
+        """Starts the batcher and the listening socket; returns the asyncio server."""
+        # Load models and rules before the first connection so no batch pays for it.
+        warm_up()
+        load_rule_engine()
+        self._queue = asyncio.Queue(maxsize=self.max_queued_rows)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="detector")
+        self._tasks = [asyncio.create_task(self._batch_loop()), asyncio.create_task(self._report_loop())]
+        self._running_batches = set()
+
+        if unix_path:
+            server = await asyncio.start_unix_server(self._handle_client, path=unix_path, limit=MAX_LINE_BYTES)
+            print(f"[*] Ingestion service listening on unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE_BYTES)
+            port = server.sockets[0].getsockname()[1]
+            print(f"[*] Ingestion service listening on {host}:{port}")
+        self.port = port
+        return server
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._running_batches, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self.report()
+
+    # --- Connections ---
+    async def _handle_client(self, reader, writer):
+        self.stats['connections'] += 1
+        loop = asyncio.get_running_loop()
+        # Bounded, so a client that stops reading verdicts also stops being read from.
+        outgoing = asyncio.Queue(maxsize=self.max_queued_rows)
+        writer_task = asyncio.create_task(self._write_verdicts(outgoing, writer))
+        header = None
+        seq = 0
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial  # Last line without a newline, or b"" at EOF.
+                    if not line:
+                        break
+                except asyncio.LimitOverrunError:
+                    await _discard_line(reader)
+                    seq += 1
+                    await self._reject(outgoing, seq, f"line longer than {MAX_LINE_BYTES} bytes")
+                    continue
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    record, header = parse_record_line(line, header)
+                except ValueError as e:
+                    seq += 1
+                    await self._reject(outgoing, seq, str(e))
+                    continue
+                if record is None:
+                    continue  # A CSV header line.
+
+                seq += 1
+                future = loop.create_future()
+                self.stats['records'] += 1
+                await self._queue.put((record, future, loop.time()))
+                await outgoing.put((seq, record.get('id'), future))
+        except ConnectionError:
+            pass
+        finally:
+            await outgoing.put(None)
+            await writer_task
+            writer.close()
+
+    async def _reject(self, outgoing, seq: int, message: str):
+        self.stats['rejected'] += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_result({'error': message})
+        await outgoing.put((seq, None, future))
+
+    async def _write_verdicts(self, outgoing, writer):
+        connected = True
+        while True:
+            item = await outgoing.get()
+            if item is None:
+                break
+            seq, record_id, future = item
+            try:
+                verdict = await future
+            except Exception as e:
+                verdict = {'error': f"detection failed: {e}"}
+            if not connected:
+                continue
+            response = {'seq': seq}
+            if record_id is not None:
+                response['id'] = record_id
+            response.update(verdict)
+            try:
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                # Keep consuming so the reader side is never blocked on a dead client.
+                connected = False
+
+    # --- Batching ---
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_batch_delay
+            while len(batch) < self.max_batch_rows:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            # The loop only keeps weak references to tasks.
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            started = loop.time()
+            verdicts = await loop.run_in_executor(self._executor, label_records, [record for record, _, _ in batch],
+                                                 self.cache, self.aggregator)
+            finished = loop.time()
+        except Exception as e:
+            self.stats['failed_batches'] += 1
+            print(f"[!] Batch of {len(batch)} records failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.stats['batches'] += 1
+        # Latency of a batch runs from its oldest record's arrival to its verdicts.
+        self._batch_latencies.append(finished - batch[0][2])
+        self._batch_sizes.append(len(batch))
+        detect_ms = round((finished - started) * 1000, 2)
+        for (_, future, received), (attack_type, matched_rule) in zip(batch, verdicts):
+            if not future.done():
+                future.set_result({
+                    'attack_type': attack_type,
+                    'matched_rule': matched_rule,
+                    'latency_ms': round((finished - received) * 1000, 2),
+                    'detect_ms': detect_ms,
+                })
+
+    # --- Reporting ---
+    async def _report_loop(self):
+        reported = 0
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            if self.stats['batches'] != reported:
+                reported = self.stats['batches']
+                self.report()
+
+    def report(self) -> dict:
+        summary = dict(self.stats)
+        if self._batch_latencies:
+            latencies_ms = np.array(self._batch_latencies) * 1000
+            summary.update({
+                'mean_batch_rows': float(np.mean(self._batch_sizes)),
+                'batch_latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+                'batch_latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+                'batch_latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+            })
+            print(f"[+] {summary['records']} records in {summary['batches']} batches "
+                  f"(mean {summary['mean_batch_rows']:.0f} rows), batch latency p50 {summary['batch_latency_p50_ms']:.1f} ms, "
+                  f"p95 {summary['batch_latency_p95_ms']:.1f} ms, p99 {summary['batch_latency_p99_ms']:.1f} ms.")
+            summary['sources'] = self.aggregator.snapshot(RECENT_WINDOW)
+            print(f"[+] {format_top_attackers(summary['sources'])}")
+        return summary
+
+
+def parse_record_line(line: bytes, header: list):
+    """
+    Parses one input line into (record, header). JSON lines are objects; any
+    other line is CSV, and the first CSV line of a connection is its header,
+    for which record is None.
+    """
+    try:
+        text = line.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("line is not valid UTF-8")
+    if text.startswith(("{", "[")):
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e.msg}")
+        if not isinstance(record, dict):
+            raise ValueError("JSON record must be an object")
+    else:
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            raise ValueError(f"invalid CSV: {e}")
+        if header is None:
+            return None, values
+        if len(values) != len(header):
+            raise ValueError(f"expected {len(header)} CSV fields, got {len(values)}")
+        record = dict(zip(header, values))
+    if not isinstance(record.get('url'), str):
+        raise ValueError("record has no 'url'")
+    return record, header
+
+
+async def _discard_line(reader):
+    """Skips the rest of a line that exceeded the stream limit, including its newline."""
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+        except asyncio.IncompleteReadError:
+            return
+
+
+def label_records(records: list, cache=None, aggregator=None) -> list:
+    """Runs one micro-batch through both phases; returns (attack_type, matched_rule) per record."""
+    batch = pd.DataFrame.from_records(records)
+    labeled = detect_batch(batch.drop(columns=VERDICT_COLUMNS, errors='ignore'), cache)
+    if aggregator is not None:
+        aggregator.update(labeled)
+    attack_types = labeled['attack_type'].astype(object).where(labeled['attack_type'].notna(), None)
+    matched_rules = labeled['matched_rule'].astype(object).where(labeled['matched_rule'].notna(), None)
+    return list(zip(attack_types, matched_rules))
+
+
+def self_check() -> bool:
+    """Feeds the sample IPDR CSV, header line first, through the line parser and labelling, as a client would send it."""
+    with open(SAMPLE_CSV, "rb") as f:
+        lines = f.read().splitlines()
+    records, header = [], None
+    for line in lines:
+        record, header = parse_record_line(line, header)
+        if record is not None:
+            records.append(record)
+    verdicts = label_records(records)
+    attacks = sum(attack_type is not None for attack_type, _ in verdicts)
+    passed = len(verdicts) == len(lines) - 1 and attacks > 0
+    print(f"[{'+' if passed else '!'}] Self-check {'passed' if passed else 'FAILED'}: {attacks} of {len(verdicts)} CSV records labelled as attacks.")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream transaction records into the hybrid detector over a local socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--max-batch-rows", type=int, default=DEFAULT_MAX_BATCH_ROWS)
+    parser.add_argument("--max-batch-delay", type=float, default=DEFAULT_MAX_BATCH_DELAY, help="seconds a batch may wait to fill up")
+    parser.add_argument("--max-queued-rows", type=int, default=DEFAULT_MAX_QUEUED_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="batches analysed at the same time")
+    parser.add_argument("--cache", action="store_true", help="reuse verdicts through the persistent verdict cache")
+    parser.add_argument("--metrics-port", type=int, help="serve per-phase Prometheus metrics on this port")
+    parser.add_argument("--self-check", action="store_true", help="label the sample IPDR CSV line by line and exit")
+    args = parser.parse_args()
+
+    if args.self_check:
+        raise SystemExit(0 if self_check() else 1)
+
+    if args.metrics_port:
+        from ..Monitoring.instrumentation import serve_metrics
+        serve_metrics(args.metrics_port)
+
+    verdict_cache = None
+    if args.cache:
+        from ..Detector.verdict_cache import VerdictCache
+        verdict_cache = VerdictCache()
+    service = IngestService(args.max_batch_rows, args.max_batch_delay, args.max_queued_rows, args.workers, verdict_cache)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\n[*] Ingestion service stopped.")
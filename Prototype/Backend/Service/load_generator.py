@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import csv
+import glob
+import io
+import json
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from .ingest_service import DEFAULT_HOST, DEFAULT_PORT
+
+DATASET_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Dataset"))
+BENIGN_PATHS = ["/", "/index.html", "/products", "/search", "/login", "/static/app.js", "/api/v1/items", "/images/logo.png"]
+BENIGN_PARAMS = ["q", "page", "id", "sort", "lang", "ref"]
+
+
+def sample_urls() -> list:
+    """URLs from the bundled datasets, attacks and benign traffic alike."""
+    urls = []
+    for path in glob.glob(os.path.join(DATASET_DIR, "IPDR Dataset", "**", "*.csv"), recursive=True):
+        try:
+            df = pd.read_csv(path)
+        except (pd.errors.ParserError, UnicodeDecodeError):
+            continue
+        if 'url' in df.columns:
+            urls.extend(df['url'].dropna().astype(str))
+    return urls
+
+
+def generate_records(count: int, attack_ratio: float = 0.2, seed: int = 7) -> list:
+    """
+    Builds `count` transaction records: mostly synthetic benign URLs, with a
+    share of dataset URLs. Every URL gets a random parameter so that repeated
+    runs are not answered from a verdict cache alone.
+    """
+    rng = random.Random(seed)
+    known = sample_urls() or ["http://testphp.vulnweb.com/listproducts.php?cat=1' OR '1'='1"]
+    records = []
+    for index in range(count):
+        if rng.random() < attack_ratio:
+            url = rng.choice(known)
+            url += ("&" if "?" in url else "?") + f"r={rng.randrange(1_000_000)}"
+        else:
+            url = f"http://shop.example.com{rng.choice(BENIGN_PATHS)}?{rng.choice(BENIGN_PARAMS)}={rng.randrange(1_000_000)}"
+        records.append({
+            'id': index,
+            'timestamp': f"{time.time():.6f}",
+            'src_ip': f"10.0.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'src_port': rng.randrange(1024, 65535),
+            'dst_ip': "10.1.0.10",
+            'dst_port': 80,
+            'url': url,
+            'status_code': rng.choice([200, 200, 200, 302, 404, 500]),
+        })
+    return records
+
+
+async def _run_connection(records, host, port, unix_path, rate, use_csv, latencies, results):
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path, limit=1024 * 1024)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=1024 * 1024)
+    sent_at = {}
+
+    async def send():
+        started = time.perf_counter()
+        if use_csv:
+            writer.write(_csv_line(records[0].keys()))
+        for seq, record in enumerate(records, 1):
+            line = _csv_line(record.values()) if use_csv else (json.dumps(record) + "\n").encode()
+            sent_at[seq] = time.perf_counter()
+            writer.write(line)
+            # drain() blocks while the service applies backpressure.
+            await writer.drain()
+            if rate:
+                delay = started + seq / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        writer.write_eof()
+
+    async def receive():
+        async for line in reader:
+            response = json.loads(line)
+            latencies.append(time.perf_counter() - sent_at.pop(response['seq']))
+            if 'error' in response:
+                results['errors'] += 1
+            elif response.get('attack_type'):
+                results['attacks'] += 1
+
+    await asyncio.gather(send(), receive())
+    writer.close()
+
+
+def _csv_line(values) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode()
+
+
+async def run_load(records: list, connections: int = 4, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                   unix_path: str = None, rate: float = None, use_csv: bool = False) -> dict:
+    """
+    Sends `records` to a running ingestion service over `connections` parallel
+    connections (optionally paced to `rate` records/s in total) and measures
+    the time from sending each record to receiving its verdict.
+    """
+    shares = [records[index::connections] for index in range(connections)]
+    latencies = []
+    results = {'errors': 0, 'attacks': 0}
+    per_connection_rate = rate / connections if rate else None
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _run_connection(share, host, port, unix_path, per_connection_rate, use_csv, latencies, results)
+        for share in shares if share
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    summary = {
+        'records': len(latencies),
+        'seconds': elapsed,
+        'records_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+        'latency_p95_ms': float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else None,
+        'latency_p99_ms': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+        **results,
+    }
+    print(f"[+] {summary['records']} verdicts in {elapsed:.2f}s ({summary['records_per_second']:.0f} records/s), "
+          f"latency p50 {summary['latency_p50_ms']:.1f} ms, p95 {summary['latency_p95_ms']:.1f} ms, "
+          f"p99 {summary['latency_p99_ms']:.1f} ms, {summary['attacks']} attacks, {summary['errors']} errors.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a running ingestion service with synthetic traffic.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="total records per second (default: as fast as possible)")
+    parser.add_argument("--csv", action="store_true", help="send CSV lines instead of JSON")
+    args = parser.parse_args()
+
+    asyncio.run(run_load(generate_records(args.records), args.connections, args.host, args.port, args.unix, args.rate, args.csv))
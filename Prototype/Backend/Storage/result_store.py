@@ -0,0 +1,248 @@
+import glob
+import json
+import os
+import re
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+from ..Parser.transaction_schema import to_nanoseconds
+
+STORE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bucket", "store"))
+TRANSACTIONS = "transactions"
+DETECTIONS = "detections"
+COMMITS_DIR = "_commits"
+ROW_GROUP_ROWS = 64_000
+
+# Low-cardinality text columns are dictionary-encoded, both in Arrow and on disk.
+DICTIONARY_COLUMNS = ['src_ip', 'dst_ip', 'highest_protocol', 'status_code', 'attack_type', 'matched_rule']
+INTEGER_COLUMNS = ['src_port', 'dst_port', 'length']
+PARTITION_COLUMNS = ['capture_date', 'source']
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+class ResultStore:
+    """
+    Append-only columnar store for parsed transactions and detection results.
+
+    Every table is a set of Parquet files laid out as
+    `<table>/capture_date=YYYY-MM-DD/source=<file>/part-<commit>-<n>.parquet`
+    and sorted by timestamp, so row-group statistics let readers skip data
+    outside a time window. An append writes all its files first and then
+    publishes them with a single manifest in `<table>/_commits/`; readers only
+    see files listed in a manifest, so a crashed or concurrent writer never
+    exposes half an append.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        if pa is None:
+            raise ImportError("The result store needs pyarrow (pip install pyarrow).")
+        self.root = root
+
+    # --- Writing ---
+    def append(self, df: pd.DataFrame, table: str, source_file: str) -> str:
+        """Adds the rows of `df` to `table` in one atomic commit and returns the commit id."""
+        if df.empty:
+            return None
+        commit_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        table_dir = os.path.join(self.root, table)
+        frame = _prepare(df)
+        frame['capture_date'] = _capture_dates(frame['timestamp'])
+        source = _partition_value(os.path.basename(source_file or "unknown"))
+
+        files = []
+        for capture_date, part in frame.groupby('capture_date', sort=True):
+            part_dir = os.path.join(table_dir, f"capture_date={capture_date}", f"source={source}")
+            os.makedirs(part_dir, exist_ok=True)
+            name = f"part-{commit_id}-{len(files)}.parquet"
+            arrow_table = _to_arrow(part.drop(columns=['capture_date']).sort_values('timestamp', kind='stable'))
+            _write_atomically(arrow_table, os.path.join(part_dir, name))
+            files.append({'path': os.path.relpath(os.path.join(part_dir, name), table_dir), 'rows': len(part)})
+
+        manifest = {'commit': commit_id, 'source_file': source_file, 'rows': len(frame), 'files': files, 'created': time.time()}
+        commits_dir = os.path.join(table_dir, COMMITS_DIR)
+        os.makedirs(commits_dir, exist_ok=True)
+        temp_path = os.path.join(commits_dir, f".{commit_id}.json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # The rename is the commit point.
+        os.replace(temp_path, os.path.join(commits_dir, f"{commit_id}.json"))
+        print(f"[💾] Committed {len(frame)} rows to {table} ({len(files)} files, commit {commit_id}).")
+        return commit_id
+
+    def sink(self, table: str, source_file: str):
+        """Returns a callable that appends each batch it is given, e.g. for run_streaming_detection."""
+        return lambda df: self.append(df, table, source_file)
+
+    # --- Reading ---
+    def committed_files(self, table: str) -> list:
+        table_dir = os.path.join(self.root, table)
+        files = []
+        for manifest_path in sorted(glob.glob(os.path.join(table_dir, COMMITS_DIR, "*.json"))):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            files.extend(os.path.join(table_dir, entry['path']) for entry in manifest['files'])
+        return files
+
+    def dataset(self, table: str):
+        """Returns a pyarrow Dataset over every committed file of `table`, or None if it is empty."""
+        files = self.committed_files(table)
+        if not files:
+            return None
+        table_dir = os.path.join(self.root, table)
+        schemas = [pq.read_schema(path) for path in files]
+        partitioning = ds.partitioning(pa.schema([('capture_date', pa.string()), ('source', pa.string())]), flavor="hive")
+        return ds.dataset(files, schema=_with_partitions(pa.unify_schemas(schemas)), format="parquet",
+                          partitioning=partitioning, partition_base_dir=table_dir)
+
+    def read(self, table: str, start=None, end=None, attack_types=None, sources=None, columns=None, categorical: bool = False) -> pd.DataFrame:
+        """
+        Loads the rows of `table` with `start <= timestamp < end` (epoch seconds
+        or anything pd.Timestamp accepts, taken as UTC), optionally restricted
+        to some attack types or source files. Filters are pushed down: whole
+        date/source partitions are skipped and row groups are pruned by their
+        timestamp statistics. Dictionary columns come back as plain objects
+        unless `categorical` is set.
+        """
+        dataset = self.dataset(table)
+        if dataset is None:
+            return pd.DataFrame(columns=columns)
+
+        start, end = _epoch_seconds(start), _epoch_seconds(end)
+        conditions = []
+        if start is not None:
+            conditions += [ds.field('capture_date') >= _date_of(start), ds.field('timestamp') >= start]
+        if end is not None:
+            conditions += [ds.field('capture_date') <= _date_of(end), ds.field('timestamp') < end]
+        if attack_types is not None:
+            conditions.append(ds.field('attack_type').isin(list(attack_types)))
+        if sources is not None:
+            conditions.append(ds.field('source').isin([_partition_value(os.path.basename(s)) for s in sources]))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        if not categorical:
+            for column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    df[column] = df[column].astype(object).where(df[column].notna(), None)
+        return df
+
+    def vacuum(self, table: str, min_age_seconds: float = 3600) -> int:
+        """Deletes data files no commit refers to (left by crashed writers) once they are old enough."""
+        table_dir = os.path.join(self.root, table)
+        committed = {os.path.normpath(path) for path in self.committed_files(table)}
+        removed = 0
+        cutoff = time.time() - min_age_seconds
+        for path in glob.glob(os.path.join(table_dir, "capture_date=*", "source=*", "*.parquet")):
+            if os.path.normpath(path) not in committed and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def save_transactions(df: pd.DataFrame, source_file: str, root: str = STORE_DIR) -> str:
+    return ResultStore(root).append(df, TRANSACTIONS, source_file)
+
+
+def save_detections(df: pd.DataFrame, source_file: str, root: str = STORE_DIR) -> str:
+    return ResultStore(root).append(df, DETECTIONS, source_file)
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    frame = df.reset_index(drop=True).copy()
+    frame = frame.drop(columns=[c for c in PARTITION_COLUMNS if c in frame.columns])
+    frame['timestamp'] = epoch_timestamps(frame['timestamp']) if 'timestamp' in frame.columns else np.nan
+    for column in INTEGER_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('Int64')
+    for column in frame.columns:
+        if column in ('timestamp', *INTEGER_COLUMNS):
+            continue
+        # Everything else is text; parsers hand over ports and codes as either str or numbers.
+        values = frame[column]
+        if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            values = values.map(_as_text, na_action='ignore')
+        frame[column] = values.astype(object).where(values.notna(), None)
+    return frame
+
+
+def epoch_timestamps(values: pd.Series) -> pd.Series:
+    """Epoch seconds from typed timestamps, pcap-style numeric ones or IPDR-style ISO strings (see to_nanoseconds)."""
+    return (to_nanoseconds(values) - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+
+
+def _as_text(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_arrow(frame: pd.DataFrame):
+    fields = []
+    for column in frame.columns:
+        if column == 'timestamp':
+            fields.append(pa.field(column, pa.float64()))
+        elif column in INTEGER_COLUMNS:
+            fields.append(pa.field(column, pa.int64()))
+        elif column in DICTIONARY_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.Table.from_pandas(frame, schema=pa.schema(fields), preserve_index=False)
+
+
+def _with_partitions(schema):
+    for name in PARTITION_COLUMNS:
+        if schema.get_field_index(name) < 0:
+            schema = schema.append(pa.field(name, pa.string()))
+    return schema
+
+
+def _write_atomically(table, path: str):
+    # Dot-files are ignored by dataset discovery, so a partial write is never picked up.
+    temp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    pq.write_table(table, temp_path, compression="zstd", use_dictionary=[c for c in DICTIONARY_COLUMNS if c in table.column_names],
+                   row_group_size=ROW_GROUP_ROWS, write_statistics=True)
+    with open(temp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _capture_dates(timestamps: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(timestamps, unit='s', utc=True, errors='coerce').dt.strftime('%Y-%m-%d')
+    return dates.fillna("unknown")
+
+
+def _partition_value(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value) or "unknown"
+
+
+def _epoch_seconds(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return stamp.timestamp()
+
+
+def _date_of(seconds: float) -> str:
+    return pd.Timestamp(seconds, unit='s', tz='UTC').strftime('%Y-%m-%d')
@@ -0,0 +1,243 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MaxAbsScaler
+
+from ..Detector.feature_extractor import LEXICAL_COLUMNS, extract_lexical_features
+from ..Detector.ml_detector import build_feature_matrix
+from ..Detector.model_registry import ACTIVE_FILE, ARTIFACTS, METADATA_FILE, MODELS_DIR, OPTIONAL_ARTIFACTS
+
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+MODEL_TYPE = "SGD logistic regression"
+DEFAULT_CHUNK_ROWS = 100_000
+# Same analyzer as the shipped tfidf_vectorizer.joblib; the detector featurizes with whatever vectorizer is installed.
+TFIDF_PARAMS = {'analyzer': 'char', 'ngram_range': (2, 3), 'lowercase': True}
+BENIGN_LABELS = {"", "0", "benign", "normal", "false", "none", "nan"}
+
+
+# --- Labelled Sources ---
+def iter_csv_chunks(paths: list, label_column: str = 'attack_type', chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    Yields (urls, labels) per chunk from CSV files or directories of them
+    (searched recursively). Rows without a URL, such as IPDR response rows,
+    are skipped; files without a URL or label column are ignored.
+    """
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)) if os.path.isdir(path) else [path])
+    for file_path in files:
+        header = pd.read_csv(file_path, nrows=0).columns
+        if 'url' not in header or label_column not in header:
+            print(f"[!] Skipping {file_path}: needs 'url' and '{label_column}' columns.")
+            continue
+        for chunk in pd.read_csv(file_path, usecols=['url', label_column], chunksize=chunk_rows, dtype={'url': object}):
+            chunk = chunk[chunk['url'].notna()]
+            if len(chunk):
+                yield chunk['url'].astype(str).reset_index(drop=True), malicious_labels(chunk[label_column])
+
+
+def iter_store_chunks(root: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yields (urls, labels) from the detections table of the result store, labelled by its attack_type."""
+    from ..Storage.result_store import DETECTIONS, STORE_DIR, ResultStore
+
+    dataset = ResultStore(root or STORE_DIR).dataset(DETECTIONS)
+    if dataset is None:
+        return
+    for batch in dataset.to_batches(columns=['url', 'attack_type'], batch_size=chunk_rows):
+        chunk = batch.to_pandas()
+        chunk = chunk[chunk['url'].notna()]
+        if len(chunk):
+            yield chunk['url'].astype(str).reset_index(drop=True), malicious_labels(chunk['attack_type'].astype(object))
+
+
+def malicious_labels(values: pd.Series) -> np.ndarray:
+    """1 for rows labelled as an attack (a positive number or any non-benign text), else 0."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return (values.fillna(0).to_numpy() > 0).astype(np.int64)
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip().str.lower()
+    return (~text.isin(BENIGN_LABELS)).to_numpy().astype(np.int64)
+
+
+# --- Training ---
+def scan_corpus(chunks) -> dict:
+    """
+    First pass: document frequencies of every character n-gram, the largest
+    value of each lexical feature and the class counts. Memory grows with the
+    number of distinct n-grams, not with the number of rows.
+    """
+    counter = CountVectorizer(binary=True, **TFIDF_PARAMS)
+    document_frequency = {}
+    lexical_max = np.zeros(len(LEXICAL_COLUMNS))
+    rows = positives = 0
+    for urls, labels in chunks:
+        counts = counter.fit_transform(urls)
+        frequencies = np.asarray(counts.sum(axis=0)).ravel()
+        for ngram, column in counter.vocabulary_.items():
+            document_frequency[ngram] = document_frequency.get(ngram, 0) + int(frequencies[column])
+        lexical = extract_lexical_features(urls)[LEXICAL_COLUMNS].abs().max().fillna(0).to_numpy()
+        lexical_max = np.maximum(lexical_max, lexical)
+        rows += len(urls)
+        positives += int(labels.sum())
+    return {'document_frequency': document_frequency, 'lexical_max': lexical_max, 'rows': rows, 'positives': positives}
+
+
+def build_vectorizer(document_frequency: dict, rows: int, min_df: int = 1, max_features: int = None) -> TfidfVectorizer:
+    """A fitted TfidfVectorizer equivalent to fitting on the whole corpus at once (smooth idf), from streamed counts."""
+    terms = [(ngram, df) for ngram, df in document_frequency.items() if df >= min_df]
+    if max_features:
+        terms = sorted(terms, key=lambda item: (-item[1], item[0]))[:max_features]
+    terms.sort()
+    vectorizer = TfidfVectorizer(vocabulary={ngram: index for index, (ngram, _) in enumerate(terms)}, **TFIDF_PARAMS)
+    vectorizer.fit([""])
+    frequencies = np.array([df for _, df in terms], dtype=float)
+    vectorizer.idf_ = np.log((1 + rows) / (1 + frequencies)) + 1
+    return vectorizer
+
+
+def train_classifier(chunks_factory, vectorizer, lexical_max: np.ndarray, class_counts: tuple, epochs: int = 3, seed: int = 42):
+    """
+    Later passes: featurizes each chunk exactly as the ML phase does and
+    updates an SGD logistic regression with partial_fit. The last epoch scores
+    every chunk before learning from it (progressive validation), which gives
+    held-out style metrics without keeping any rows.
+    """
+    n_features = len(LEXICAL_COLUMNS) + len(vectorizer.vocabulary_)
+    # TF-IDF weights are already within [0, 1]; only the lexical columns need scaling.
+    scaler = MaxAbsScaler().fit(sp.csr_matrix(np.concatenate([np.maximum(lexical_max, 1e-12), np.ones(n_features - len(LEXICAL_COLUMNS))])[None, :]))
+    negatives, positives = class_counts
+    weights = {0: (negatives + positives) / (2 * max(negatives, 1)), 1: (negatives + positives) / (2 * max(positives, 1))}
+    classifier = SGDClassifier(loss='log_loss', alpha=1e-5, class_weight=weights, random_state=seed)
+    rng = np.random.default_rng(seed)
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        for urls, labels in chunks_factory():
+            X = scaler.transform(build_feature_matrix(urls, vectorizer))
+            if epoch == epochs - 1 and hasattr(classifier, 'coef_'):
+                np.add.at(confusion, (labels, classifier.predict(X)), 1)
+            order = rng.permutation(len(labels))
+            classifier.partial_fit(X[order], labels[order], classes=np.array([0, 1]))
+        print(f"[+] Epoch {epoch + 1}/{epochs} done in {time.perf_counter() - started:.1f}s.")
+    return make_pipeline(scaler, classifier), confusion
+
+
+def _metrics(confusion: np.ndarray) -> dict:
+    (tn, fp), (fn, tp) = confusion
+    total = confusion.sum()
+    return {
+        'progressive_rows': int(total),
+        'accuracy': float((tp + tn) / total) if total else None,
+        'precision': float(tp / (tp + fp)) if tp + fp else None,
+        'recall': float(tp / (tp + fn)) if tp + fn else None,
+    }
+
+
+def train(chunks_factory, output_root: str = VERSIONS_DIR, epochs: int = 3, min_df: int = 1, max_features: int = None,
+          sources: list = None, seed: int = 42) -> str:
+    """
+    Trains a vectorizer and classifier from `chunks_factory()`, a callable that
+    returns a fresh iterator of (urls, labels) chunks for every pass, and
+    writes them with metadata to a new directory under `output_root`.
+    Returns that directory.
+    """
+    started = time.perf_counter()
+    print("[*] Pass 1: scanning the corpus...")
+    corpus = scan_corpus(chunks_factory())
+    if corpus['rows'] == 0:
+        raise ValueError("No labelled URLs found in the training sources.")
+    if corpus['positives'] in (0, corpus['rows']):
+        raise ValueError("Training needs both malicious and benign URLs.")
+    print(f"[+] {corpus['rows']} URLs, {corpus['positives']} malicious, {len(corpus['document_frequency'])} distinct n-grams.")
+
+    vectorizer = build_vectorizer(corpus['document_frequency'], corpus['rows'], min_df, max_features)
+    del corpus['document_frequency']
+    print(f"[*] Training on {len(vectorizer.vocabulary_)} n-grams for {epochs} epochs...")
+    model, confusion = train_classifier(chunks_factory, vectorizer, corpus['lexical_max'],
+                                        (corpus['rows'] - corpus['positives'], corpus['positives']), epochs, seed)
+
+    digest = hashlib.sha256()
+    for obj in (vectorizer.vocabulary_, vectorizer.idf_.tolist(), model[-1].coef_.tolist()):
+        digest.update(repr(obj).encode())
+    version = time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + digest.hexdigest()[:8]
+    metadata = {
+        'version': version,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'sources': sources or [],
+        'rows': corpus['rows'],
+        'malicious_rows': corpus['positives'],
+        'vocabulary_size': len(vectorizer.vocabulary_),
+        'features': LEXICAL_COLUMNS + ['tfidf'],
+        'tfidf': {key: list(value) if isinstance(value, tuple) else value for key, value in TFIDF_PARAMS.items()},
+        'model_type': MODEL_TYPE,
+        'classifier': f"MaxAbsScaler + SGDClassifier(log_loss), {epochs} epochs",
+        'metrics': _metrics(confusion),
+        'training_seconds': round(time.perf_counter() - started, 2),
+        'sklearn': sklearn.__version__,
+    }
+
+    version_dir = os.path.join(output_root, version)
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(version_dir, ARTIFACTS['model']))
+    joblib.dump(vectorizer, os.path.join(version_dir, ARTIFACTS['vectorizer']))
+    with open(os.path.join(version_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"[💾] Model version {version} saved to: {version_dir}")
+    print(f"[+] Progressive validation: {metadata['metrics']}")
+    return version_dir
+
+
+def install(version_dir: str, models_dir: str = MODELS_DIR):
+    """
+    Makes a trained version the one the detector loads by pointing
+    active.json at its directory. The pointer is swapped in a single rename
+    and the registry loads the model and vectorizer from the directory it
+    names, so a process gets either the old pair or the new one, never a mix.
+    The new version has no prefilter until one is fitted for it.
+    """
+    for name in OPTIONAL_ARTIFACTS:
+        if not os.path.exists(os.path.join(version_dir, ARTIFACTS[name])):
+            print(f"[!] No {ARTIFACTS[name]} in this version; refit it for the new model.")
+    pointer = os.path.join(models_dir, ACTIVE_FILE)
+    temp_path = pointer + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump({'directory': os.path.relpath(os.path.abspath(version_dir), os.path.abspath(models_dir))}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, pointer)
+    print(f"[+] Installed model version {os.path.basename(os.path.normpath(version_dir))}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the URL classifier out of core from labelled CSVs or the result store.")
+    parser.add_argument("inputs", nargs="*", help="labelled CSV files or directories")
+    parser.add_argument("--store", action="store_true", help="train on the detections table of the result store instead")
+    parser.add_argument("--label-column", default="attack_type", help="column marking malicious rows (any non-benign value)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--min-df", type=int, default=1, help="drop n-grams seen in fewer URLs")
+    parser.add_argument("--max-features", type=int, help="keep only the most common n-grams")
+    parser.add_argument("--output-dir", default=VERSIONS_DIR)
+    parser.add_argument("--install", action="store_true", help="make the new version the one the detector loads")
+    args = parser.parse_args()
+    if not args.inputs and not args.store:
+        parser.error("give labelled CSV files or directories, or --store")
+
+    if args.store:
+        chunks_factory, sources = (lambda: iter_store_chunks(chunk_rows=args.chunk_rows)), ["result store: detections"]
+    else:
+        chunks_factory, sources = (lambda: iter_csv_chunks(args.inputs, args.label_column, args.chunk_rows)), args.inputs
+    version_dir = train(chunks_factory, args.output_dir, args.epochs, args.min_df, args.max_features, sources)
+    if args.install:
+        install(version_dir)
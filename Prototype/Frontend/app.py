@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
+import glob
+import hashlib
 import os
+import shutil
+import tempfile
+import weakref
 import sys
-from io import StringIO
 import plotly.express as px
 import time
+import math
+from datetime import timedelta
 
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if base_dir not in sys.path:
@@ -12,8 +18,15 @@ if base_dir not in sys.path:
 
 try:  
     from Prototype.Backend.Parser.pcap_parser import parse_pcap_to_df
+    from Prototype.Backend.Parser.csv_parser import read_csv_transactions
     from Prototype.Backend.Detector.regex_detector import run_regex_phase
     from Prototype.Backend.Detector.ml_detector import run_ml_phase
+    from Prototype.Backend.Detector.detection_summary import BENIGN_LABEL, event_seconds, filter_transactions, summarize_detections
+    from Prototype.Backend.Detector.model_registry import model_version, warm_up
+    from Prototype.Backend.Detector.rule_engine import load_rule_engine, rules_version
+    from Prototype.Backend.Detector.stream_aggregator import StreamAggregator
+    from Prototype.Backend.Detector.url_normalizer import UrlVocabulary
+    from Prototype.Backend.Monitoring.instrumentation import collect, format_phase_table
 except ImportError as e:
     st.error(f"Fatal Error: Could not import backend modules: {e}. Please ensure the folder structure is correct.")
     st.stop()
@@ -51,26 +64,6 @@ def find_test_files():
                 
     return test_files
 
-def pair_transactions_from_csv(df: pd.DataFrame) -> pd.DataFrame:
-    """Pairs requests and responses from a raw log CSV."""
-    paired_records, open_requests = [], {}
-    for _, row in df.iterrows():
-        try:
-            is_request = pd.notna(row.get('url')) and pd.isna(row.get('status_code'))
-            is_response = pd.notna(row.get('status_code'))
-            if is_request:
-                stream_key = (row['src_ip'], row['src_port'], row['dst_ip'], row['dst_port'])
-                open_requests[stream_key] = row.to_dict()
-            elif is_response:
-                response_key = (row['dst_ip'], row['dst_port'], row['src_ip'], row['src_port'])
-                if response_key in open_requests:
-                    record = open_requests.pop(response_key)
-                    record['status_code'] = row['status_code']
-                    paired_records.append(record)
-        except (KeyError, IndexError, TypeError):
-            continue
-    return pd.DataFrame(paired_records)
-
 def get_threat_level(ratio):
     """Returns a color and descriptive text based on the attack percentage."""
     if ratio > 80: return "#d32f2f", "CRITICAL ACTIVITY"
@@ -116,37 +109,161 @@ def display_team_info():
             st.markdown("**UMAR FAROOQ .V .H**<br>*Machine Learning & Model Training*", unsafe_allow_html=True)
             st.markdown("**VIGNESH S**<br>*Project Lead & System Architect*", unsafe_allow_html=True)
 
+# --- Cached Backend ---
+CACHE_ENTRIES = 8  # parsed files / result frames kept per server process
+# Streamlit bounds its caches by entry count only; frames of inputs larger than this are
+# recomputed on every run instead of cached, so one big capture cannot pin gigabytes.
+CACHE_MAX_INPUT_BYTES = 32 * 1024 * 1024
+
+@st.cache_resource(show_spinner="Loading detection models...")
+def load_detection_backend():
+    """Loads the ML artifacts and compiles the rule pack once per server process."""
+    warm_up()
+    load_rule_engine()
+    return True
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def hash_sample_file(path, size, mtime_ns):
+    """Content hash of a file on disk, recomputed only when its size or mtime changes."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def parse_input_file(file_path, file_extension):
+    """Parses a pcap or IPDR CSV (paired or not) from disk into one transaction per row."""
+    if file_extension == '.pcap':
+        parsed_df = parse_pcap_to_df(file_path)
+    else: # .csv, read and paired in chunks
+        parsed_df = read_csv_transactions(file_path)
+
+    if 'url' in parsed_df.columns:
+        if 'attack_type' not in parsed_df.columns: parsed_df['attack_type'] = None
+        parsed_df['attack_type'] = parsed_df['attack_type'].astype(object)
+    return parsed_df
+
+# --- Uploads ---
+UPLOAD_CHUNK_BYTES = 8 << 20
+UPLOAD_DIR_PREFIX = "cyberaura-upload-"
+STALE_UPLOAD_SECONDS = 24 * 3600
+
+class UploadSpool:
+    """
+    A private temp directory per browser session that uploads are streamed
+    into, so the parsers can read them from disk. Only the latest upload is
+    kept; the directory is removed when the session's state is discarded or
+    the server exits.
+    """
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix=UPLOAD_DIR_PREFIX)
+        self._current = None  # (file_id, path, content hash)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def spool(self, uploaded_file):
+        """Writes the upload to disk in chunks, hashing it on the way; returns (path, content hash)."""
+        file_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+        if self._current and self._current[0] == file_id and os.path.exists(self._current[1]):
+            return self._current[1:]
+        self.clear()
+        suffix = os.path.splitext(uploaded_file.name)[1].lower()
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.path)
+        digest = hashlib.blake2b(digest_size=16)
+        uploaded_file.seek(0)
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: uploaded_file.read(UPLOAD_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        self._current = (file_id, path, digest.hexdigest())
+        return self._current[1:]
+
+    def clear(self):
+        if self._current and os.path.exists(self._current[1]):
+            os.remove(self._current[1])
+        self._current = None
+
+    def close(self):
+        self._finalizer()
+
+@st.cache_resource
+def remove_stale_uploads():
+    """Once per server process, deletes upload directories left behind by a crashed server."""
+    cutoff = time.time() - STALE_UPLOAD_SECONDS
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), UPLOAD_DIR_PREFIX + "*")):
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+    return True
+
+def get_upload_spool():
+    if 'upload_spool' not in st.session_state:
+        remove_stale_uploads()
+        st.session_state['upload_spool'] = UploadSpool()
+    return st.session_state['upload_spool']
+
+def resolve_input(file_input, is_uploaded_file):
+    """Returns (path on disk, content hash) for an upload or a sample file."""
+    if is_uploaded_file:
+        return get_upload_spool().spool(file_input)
+    stat = os.stat(file_input)
+    return file_input, hash_sample_file(file_input, stat.st_size, stat.st_mtime_ns)
+
+# Arguments starting with "_" are not hashed by Streamlit; the content hash and versions are the key.
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def parse_input_cached(file_hash, file_extension, _file_path):
+    return parse_input_file(_file_path, file_extension)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def run_regex_cached(file_hash, rules_version, _parsed_df, _vocabulary):
+    return run_regex_phase(_parsed_df, vocabulary=_vocabulary)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def run_ml_cached(file_hash, rules_version, model_version, _df_after_regex, _vocabulary):
+    return run_ml_phase(_df_after_regex, vocabulary=_vocabulary)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def summarize_cached(file_hash, rules_version, model_version, _results_df):
+    summary = summarize_detections(_results_df)
+    summary['sources'] = summarize_sources(_results_df)
+    return summary, event_seconds(_results_df)
+
+SOURCE_WINDOWS = {"Whole capture": None, "Last hour": 3600, "Last 5 minutes": 300}
+SOURCE_BATCH_ROWS = 50_000
+
+def summarize_sources(results_df):
+    """Per-source statistics for each dashboard window, streamed through the same aggregator the live services use."""
+    aggregator = StreamAggregator()
+    for start in range(0, len(results_df), SOURCE_BATCH_ROWS):
+        aggregator.update(results_df.iloc[start:start + SOURCE_BATCH_ROWS])
+    return {label: aggregator.snapshot(window) for label, window in SOURCE_WINDOWS.items()}
+
+def run_step(cached_call, phase_records, use_cache, *args):
+    """Runs one cached pipeline step; returns its result, wall time and whether it was served from the cache."""
+    recorded = len(phase_records)
+    started = time.perf_counter()
+    result = (cached_call if use_cache else cached_call.__wrapped__)(*args)
+    return result, time.perf_counter() - started, len(phase_records) == recorded
+
+def step_note(elapsed, from_cache):
+    return "(from cache)" if from_cache else f"({elapsed:.2f}s)"
+
 def run_analysis_pipeline(file_input, is_uploaded_file=True):
     """Handles the entire backend analysis process with UI updates."""
-    with st.status("Executing Hybrid Detection Pipeline...", expanded=True) as status:
-        time.sleep(1)
-        status.update(label="Phase 1: Parsing Input File...")
-        st.write("➡️ **Step 1: Parsing Input File...**")
-
+    load_detection_backend()
+    with st.status("Executing Hybrid Detection Pipeline...", expanded=True) as status, collect() as phase_records:
+        progress = st.progress(0.0, text="Reading input...")
         file_name = file_input.name if is_uploaded_file else os.path.basename(file_input)
         file_extension = os.path.splitext(file_name)[1]
-        parsed_df = None
-        try:
-            if file_extension == '.pcap':
-                if is_uploaded_file:
-                    temp_dir = "temp_uploads"
-                    os.makedirs(temp_dir, exist_ok=True)
-                    pcap_path = os.path.join(temp_dir, file_name)
-                    with open(pcap_path, "wb") as f: f.write(file_input.getbuffer())
-                    parsed_df = parse_pcap_to_df(pcap_path)
-                else:
-                    parsed_df = parse_pcap_to_df(file_input)
-            else: # .csv
-                if is_uploaded_file:
-                    stringio = StringIO(file_input.getvalue().decode("utf-8"))
-                    temp_df = pd.read_csv(stringio)
-                else:
-                    temp_df = pd.read_csv(file_input)
+        file_path, file_hash = resolve_input(file_input, is_uploaded_file)
+        versions = (rules_version(), model_version())
+        use_cache = os.path.getsize(file_path) <= CACHE_MAX_INPUT_BYTES
 
-                if all(col in temp_df.columns for col in ['url', 'status_code']):
-                    parsed_df = temp_df
-                else:
-                    parsed_df = pair_transactions_from_csv(temp_df)
+        status.update(label="Phase 1: Parsing Input File...")
+        st.write("➡️ **Step 1: Parsing Input File...**")
+        if not use_cache:
+            st.write(f"ℹ️ Input is over {CACHE_MAX_INPUT_BYTES // (1024 * 1024)} MB; its results will not be cached.")
+        try:
+            parsed_df, elapsed, from_cache = run_step(parse_input_cached, phase_records, use_cache, file_hash, file_extension, file_path)
         except Exception as e:
             status.update(label="Parsing Failed!", state="error", expanded=True)
             st.error(f"Could not parse the input file. Error: {e}")
@@ -156,36 +273,40 @@ def run_analysis_pipeline(file_input, is_uploaded_file=True):
             status.update(label="Parsing Failed!", state="error", expanded=True)
             st.error("The parsed file is empty or missing the required 'url' column. Please check the file format.")
             return None
-        
-        if 'attack_type' not in parsed_df.columns: parsed_df['attack_type'] = None
-        parsed_df['attack_type'] = parsed_df['attack_type'].astype(object)
 
-        st.write(f"✅ **Parsing Complete:** Found {len(parsed_df)} total transactions.")
-        time.sleep(1.5)
+        st.write(f"✅ **Parsing Complete:** Found {len(parsed_df)} total transactions {step_note(elapsed, from_cache)}.")
+        # One vocabulary for both phases, so each distinct URL is normalized once per file.
+        vocabulary = UrlVocabulary(parsed_df['url'])
+        progress.progress(1 / 3, text="Regex detection...")
         status.update(label="Phase 2: Regex Detection...")
         st.write("➡️ **Step 2: Running Regex Detector...**")
-        df_after_regex = run_regex_phase(parsed_df.copy())
+        df_after_regex, elapsed, from_cache = run_step(run_regex_cached, phase_records, use_cache, file_hash, versions[0], parsed_df, vocabulary)
         regex_hits = df_after_regex['attack_type'].notna().sum()
-        st.write(f"✅ **Regex Analysis Complete:** Identified {regex_hits} known attack patterns.")
-        time.sleep(1.5)
+        st.write(f"✅ **Regex Analysis Complete:** Identified {regex_hits} known attack patterns {step_note(elapsed, from_cache)}.")
+        progress.progress(2 / 3, text="ML detection...")
         status.update(label="Phase 3: ML Detection...")
         st.write("➡️ **Step 3: Running Machine Learning Model...**")
-        final_results_df = run_ml_phase(df_after_regex)
-        ml_hits = final_results_df['attack_type'].str.contains("ML", na=False).sum()
-        st.write(f"✅ **ML Analysis Complete:** Found {ml_hits} new, complex threats.")
-        time.sleep(1)
+        final_results_df, elapsed, from_cache = run_step(run_ml_cached, phase_records, use_cache, file_hash, *versions, df_after_regex, vocabulary)
+        (summary, seconds), _, _ = run_step(summarize_cached, phase_records, use_cache, file_hash, *versions, final_results_df)
+        st.write(f"✅ **ML Analysis Complete:** Found {summary['ml']} new, complex threats {step_note(elapsed, from_cache)}.")
+        progress.progress(1.0, text="Done.")
+        if phase_records:
+            st.write("⏱️ **Phase Timings:**")
+            st.code(format_phase_table(phase_records), language=None)
+        else:
+            st.write("⚡ **Results served from cache** for this file and engine version.")
         
         status.update(label="Hybrid Analysis Complete!", state="complete", expanded=False)
-        return final_results_df
+        return {'results': final_results_df, 'summary': summary, 'event_seconds': seconds}
 
-def display_results_dashboard(results_df):
+def display_results_dashboard(results_df, summary, seconds):
     """Renders the entire results dashboard."""
     
     with st.container():
         st.markdown("### 📊 Executive Summary")
         with st.container(border=True):
-            total_requests = len(results_df)
-            attacks_detected = results_df['attack_type'].notna().sum()
+            total_requests = summary['total']
+            attacks_detected = summary['attacks']
             attack_ratio = (attacks_detected / total_requests * 100) if total_requests > 0 else 0
             threat_color, threat_desc = get_threat_level(attack_ratio)
             
@@ -217,9 +338,7 @@ def display_results_dashboard(results_df):
             with st.container(border=True):
                 st.subheader("Detections by Engine")
                 st.caption("This proves our hybrid methodology...")
-                regex_df = results_df[results_df['attack_type'].notna() & ~results_df['attack_type'].str.contains("ML", na=False)]
-                ml_df = results_df[results_df['attack_type'].str.contains("ML", na=False)]
-                detection_data = pd.DataFrame({'Method': ['🔍 Regex', '🤖 ML'], 'Count': [len(regex_df), len(ml_df)]})
+                detection_data = pd.DataFrame({'Method': ['🔍 Regex', '🤖 ML'], 'Count': [summary['regex'], summary['ml']]})
                 fig_donut = px.pie(detection_data, names='Method', values='Count', hole=0.6, color_discrete_map={'🔍 Regex':'#d32f2f', '🤖 ML':'#1976d2'})
                 fig_donut.update_layout(showlegend=True, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(yanchor="top", y=0.85, xanchor="left", x=0.25))
                 st.plotly_chart(fig_donut, use_container_width=True)
@@ -228,7 +347,7 @@ def display_results_dashboard(results_df):
                 st.subheader("Top Attack Types")
                 st.caption("This shows the most frequent types...")
                 if attacks_detected > 0:
-                    attack_counts = results_df['attack_type'].value_counts()
+                    attack_counts = pd.Series(summary['attack_counts'])
                     fig_bar = px.bar(attack_counts, x=attack_counts.index, y=attack_counts.values, labels={'x':'Attack Type', 'y':'Count'}, color=attack_counts.index, color_discrete_map={'XSS':'#ff6f00', 'SQL Injection':'#c62828', 'File Inclusion':'#ad1457', 'ML Detected Malicious':'#1565c0'})
                     fig_bar.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', showlegend=False)
                     st.plotly_chart(fig_bar, use_container_width=True)
@@ -236,23 +355,84 @@ def display_results_dashboard(results_df):
                     st.info("No attacks detected to visualize.")
 
     with st.container():
-        st.markdown("### 📜 Full Transaction Log Explorer")
-        st.info("Rows highlighted in RED were found by the Regex engine. Rows in BLUE were found by the Machine Learning model.", icon="ℹ️")
-        
-        def highlight_attacks(row):
-            style = [''] * len(row)
-            if pd.notna(row.attack_type):
-                color = '#2a1a1a' if "ML" not in str(row.attack_type) else '#1a222a'
-                border = '2px solid #d32f2f' if "ML" not in str(row.attack_type) else '2px solid #1976d2'
-                style = [f'background-color: {color}; border-left: {border};' for _ in row]
-            return style
-        st.dataframe(results_df.style.apply(highlight_attacks, axis=1), use_container_width=True)
+        display_top_attackers(summary['sources'])
+
+    with st.container():
+        display_log_explorer(results_df, summary, seconds)
     
     display_prototype_info()
     st.markdown("---")
     display_team_info()
 
 
+def display_top_attackers(sources):
+    """Top attacking source IPs and distinct-source counts for the selected window of the capture."""
+    st.markdown("### 🎯 Attack Sources")
+    with st.container(border=True):
+        window = st.radio("Window", list(sources), horizontal=True, label_visibility="collapsed")
+        snapshot = sources[window]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Transactions in Window", snapshot['total'])
+        col2.metric("Distinct Source IPs", f"~{snapshot['distinct_sources']}")
+        col3.metric("Attacking Source IPs", f"~{snapshot['distinct_attackers']}")
+        if snapshot['top_attackers']:
+            top = pd.DataFrame(snapshot['top_attackers'], columns=['Source IP', 'Attacks'])
+            fig_top = px.bar(top, x='Attacks', y='Source IP', orientation='h', color_discrete_sequence=['#d32f2f'])
+            fig_top.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', yaxis={'categoryorder': 'total ascending'})
+            st.plotly_chart(fig_top, use_container_width=True)
+            st.caption("Counts are count-min sketch estimates and may slightly overcount; distinct IPs are HyperLogLog estimates.")
+        else:
+            st.info("No attacking sources in this window.")
+
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+def highlight_attacks(row):
+    style = [''] * len(row)
+    if pd.notna(row.attack_type):
+        color = '#2a1a1a' if "ML" not in str(row.attack_type) else '#1a222a'
+        border = '2px solid #d32f2f' if "ML" not in str(row.attack_type) else '2px solid #1976d2'
+        style = [f'background-color: {color}; border-left: {border};' for _ in row]
+    return style
+
+def time_range_filter(column, time_range):
+    """Renders a UTC time slider over the capture's span; returns (start, end) epoch seconds, or Nones when untouched."""
+    if time_range is None or time_range[1] - time_range[0] < 1:
+        return None, None
+    low = pd.Timestamp(math.floor(time_range[0]), unit='s', tz='UTC').to_pydatetime()
+    high = pd.Timestamp(math.ceil(time_range[1]), unit='s', tz='UTC').to_pydatetime()
+    step = max(timedelta(seconds=1), timedelta(seconds=round((high - low).total_seconds() / 200)))
+    chosen = column.slider("Time range (UTC)", min_value=low, max_value=high, value=(low, high), step=step, format="YYYY-MM-DD HH:mm:ss")
+    if chosen == (low, high):
+        return None, None
+    return chosen[0].timestamp(), chosen[1].timestamp()
+
+def display_log_explorer(results_df, summary, seconds):
+    """Filters and pages the results on the server; only the visible page is styled and sent to the browser."""
+    st.markdown("### 📜 Full Transaction Log Explorer")
+    st.info("Rows highlighted in RED were found by the Regex engine. Rows in BLUE were found by the Machine Learning model.", icon="ℹ️")
+
+    col_type, col_ip, col_time = st.columns([0.35, 0.25, 0.4])
+    selected_types = col_type.multiselect("Attack type", list(summary['attack_counts']) + [BENIGN_LABEL], placeholder="All transactions")
+    src_ip = col_ip.text_input("Source IP starts with", placeholder="e.g. 192.168.") if 'src_ip' in results_df.columns else ""
+    start, end = time_range_filter(col_time, summary['time_range'])
+
+    positions = filter_transactions(results_df, seconds, selected_types or None, src_ip.strip() or None, start, end)
+
+    col_size, col_page, col_count = st.columns([0.2, 0.2, 0.6])
+    page_size = col_size.selectbox("Rows per page", PAGE_SIZES, index=1)
+    pages = max(1, math.ceil(len(positions) / page_size))
+    # Filters can shrink the result below the page the user was on.
+    if st.session_state.get('explorer_page', 1) > pages:
+        st.session_state['explorer_page'] = pages
+    page = col_page.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key='explorer_page')
+
+    first = (page - 1) * page_size
+    page_df = results_df.iloc[positions[first:first + page_size]]
+    col_count.caption(f"Showing rows {first + 1 if len(positions) else 0}–{first + len(page_df)} of {len(positions)} matching transactions ({summary['total']} in total).")
+    st.dataframe(page_df.style.apply(highlight_attacks, axis=1), use_container_width=True)
+
+
 def main():
     st.set_page_config(page_title="CyberAura", page_icon="🛡️", layout="wide")
 
@@ -302,14 +482,15 @@ def main():
             st.sidebar.info(f"Analyzing sample file: `{os.path.basename(file_to_process)}`")
         
         if file_to_process:
-            results = run_analysis_pipeline(file_to_process, is_uploaded_file=is_upload)
-            if results is not None:
-                st.session_state['results'] = results
+            analysis = run_analysis_pipeline(file_to_process, is_uploaded_file=is_upload)
+            if analysis is not None:
+                st.session_state.update(analysis)
+                st.session_state['explorer_page'] = 1
         else:
             st.sidebar.warning("Please upload a file or select a sample to analyze.")
 
     if 'results' in st.session_state:
-        display_results_dashboard(st.session_state['results'])
+        display_results_dashboard(st.session_state['results'], st.session_state['summary'], st.session_state['event_seconds'])
     else:
         st.info("Upload a file or select a sample from the sidebar and click 'Analyze Traffic' to begin.", icon="👈")
         display_prototype_info()